@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Conferência dos fluxos de lotes .zip.
+
+Gera o mesmo lote sintético como pasta (layout 'aits') e como .zip e
+renomeia o .zip pelo fluxo em passada única (ZIP_STREAM_INGEST), pelo fluxo
+tradicional (extração completa seguida da renomeação no disco) e como um novo
+.zip (--zip-output, ZipLotRepacker; extraído para a comparação, sem os
+md5sum.txt, que o novo .zip mantém como no original). Os lotes
+resultantes precisam ser idênticos ao da pasta renomeada: mesmos caminhos e
+mesmo conteúdo em todos os arquivos, inclusive um .txt em um subdiretório
+mais profundo (NESTED_TEXT). O código de saída é 1 se houver diferença.
+
+Uso:
+    python benchmarks/check_zip_flows.py --records 200
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'config'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from paths import setup_environment  # noqa: E402
+setup_environment()
+
+from lot_generator import generate_lot  # noqa: E402
+from config import MD5SUM_FILENAME  # noqa: E402
+
+NEW_LOT_NAME = 'L00126'
+NESTED_TEXT = 'extra/registros.txt'  # Cópia do .txt do lote, dentro do subdiretório numérico
+
+
+def tree_digests(root: str) -> Dict[str, str]:
+    """MD5 de cada arquivo sob root, por caminho relativo."""
+    digests = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as file:
+                digests[os.path.relpath(path, root).replace(os.sep, '/')] = hashlib.md5(file.read()).hexdigest()
+    return digests
+
+
+def rename_lot(root: str, args: argparse.Namespace, layout: str, stream: bool = False,
+               repack: bool = False) -> Dict[str, str]:
+    """Gera o lote em root, renomeia e devolve os MD5 do lote renomeado."""
+    from lot_pipeline import LotPipeline
+    lot = generate_lot(root, 'L00125', args.records, layout, args.image_size, seed=args.seed)
+    add_nested_text(os.path.join(root, lot.name))
+    pipeline = LotPipeline(root)
+    pipeline.stream_zip = stream
+    pipeline.zip_output = repack
+    pipeline.journal_enabled = False
+    result = pipeline.run(lot.name, NEW_LOT_NAME, '2024', True, None)
+    if not result.success:
+        raise RuntimeError(result.error)
+    lot_directory = os.path.join(root, NEW_LOT_NAME)
+    if not repack:
+        return tree_digests(lot_directory)
+    with zipfile.ZipFile(result.output_path) as zip_file:
+        zip_file.extractall(lot_directory)
+    return {path: digest for path, digest in tree_digests(lot_directory).items()
+            if os.path.basename(path).lower() != MD5SUM_FILENAME}
+
+
+def add_nested_text(lot_path: str) -> None:
+    """Copia o .txt de registros do lote para NESTED_TEXT (pasta ou .zip)."""
+    if os.path.isdir(lot_path):
+        for directory, _, files in os.walk(lot_path):
+            texts = [name for name in files if name.endswith('.txt') and name != MD5SUM_FILENAME]
+            if texts:
+                target = os.path.join(directory, *NESTED_TEXT.split('/'))
+                os.makedirs(os.path.dirname(target))
+                shutil.copyfile(os.path.join(directory, texts[0]), target)
+                return
+        return
+    with zipfile.ZipFile(lot_path, 'a') as zip_file:
+        for name in zip_file.namelist():
+            if name.endswith('.txt') and os.path.basename(name) != MD5SUM_FILENAME:
+                zip_file.writestr(f"{os.path.dirname(name)}/{NESTED_TEXT}", zip_file.read(name))
+                return
+
+
+def compare(expected: Dict[str, str], actual: Dict[str, str]) -> List[str]:
+    """Caminhos ausentes, a mais ou com conteúdo diferente."""
+    return [path for path in sorted(set(expected) | set(actual)) if expected.get(path) != actual.get(path)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Confere se os fluxos de lotes .zip geram o mesmo lote")
+    parser.add_argument('--records', type=int, default=200, help="Registros por lote (2 imagens cada)")
+    parser.add_argument('--image-size', type=int, default=256, help="Bytes por imagem (padrão: 256)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from log_manager import setup_logging
+    setup_logging(level='WARNING', console_stream='stderr', log_to_file=False)
+
+    work_dir = tempfile.mkdtemp(prefix='operalote-zipcheck-')
+    try:
+        expected = rename_lot(os.path.join(work_dir, 'pasta'), args, 'aits')
+        flows = {
+            'extração': rename_lot(os.path.join(work_dir, 'extracao'), args, 'zip', stream=False),
+            'passada única': rename_lot(os.path.join(work_dir, 'passada'), args, 'zip', stream=True),
+            'novo .zip': rename_lot(os.path.join(work_dir, 'novo_zip'), args, 'zip', repack=True),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    failed = False
+    for name, actual in flows.items():
+        if name == 'novo .zip':
+            expected_files = {path: digest for path, digest in expected.items()
+                              if os.path.basename(path).lower() != MD5SUM_FILENAME}
+        else:
+            expected_files = expected
+        differences = compare(expected_files, actual)
+        for path in differences[:20]:
+            print(f"  diferente: {path}", file=sys.stderr)
+        print(f"{name} x pasta: {len(expected_files)} arquivo(s), {len(differences)} diferença(s)", file=sys.stderr)
+        failed = failed or bool(differences)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
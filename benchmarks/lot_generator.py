@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Gerador de lotes sintéticos para os benchmarks.
+
+Monta lotes com a mesma estrutura dos lotes reais:
+
+    L00125/                       diretório do lote (prefixo L)
+        0000125/                  subdiretório numérico de 7 dígitos
+            L00125.txt            registros de infração separados por ';'
+            md5sum.txt            MD5 de todos os arquivos do subdiretório
+            AITs/                 imagens (layout 'aits')
+                000012525000001a.jpg
+
+Os nomes das imagens repetem os dois últimos dígitos do lote logo após o
+número (0000125 + 25 + 000001a), padrão tratado por
+JpgFilenameProcessor._check_and_fix_duplication; com duplicated=False o
+nome é apenas número + sequência.
+
+Layouts:
+    aits        imagens em AITs/ (padrão)
+    flat        imagens direto no subdiretório numérico
+    zip         lote compactado em L00125.zip
+    rar         lote compactado em L00125.rar (exige o executável 'rar')
+    nested_zip  pasta do lote com as imagens em AITs/imagens.zip
+
+Uso:
+    python benchmarks/lot_generator.py DESTINO --records 5000 --layout zip
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import zipfile
+from typing import Any, Dict, List, Optional
+
+LAYOUTS = ('aits', 'flat', 'zip', 'rar', 'nested_zip')
+INFRACTION_CODES = ('5673', '6050', '7455', '5185', '6599', '7366')
+LOCATIONS = ('Av Getulio Vargas', 'Rua XV de Novembro', 'Av Brasil', 'Rod BR-277 km 12')
+EQUIPMENTS = ('BRI1306', 'BRI1132', 'BRI0877', 'BRI2210')
+
+
+class GeneratedLot:
+    """Lote gerado e seus totais (usados nas taxas do benchmark)."""
+
+    def __init__(self, root: str, name: str, layout: str):
+        self.root = root
+        self.name = name            # Nome no diretório (com .zip/.rar nos layouts compactados)
+        self.layout = layout
+        self.files = 0              # Arquivos do lote (descompactado)
+        self.images = 0
+        self.text_files = 0
+        self.lines = 0
+        self.bytes = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'layout': self.layout,
+            'files': self.files,
+            'images': self.images,
+            'text_files': self.text_files,
+            'lines': self.lines,
+            'bytes': self.bytes,
+        }
+
+
+def jpg_name(number: str, sequence: int, side: str, duplicated: bool = True) -> str:
+    """
+    Nome de uma imagem do lote.
+
+    Args:
+        number (str): Número do lote com 7 dígitos (ex.: '0000125')
+        sequence (int): Sequência do AIT
+        side (str): 'a' ou 'b' (duas imagens por AIT)
+        duplicated (bool): Repete os dois últimos dígitos do lote após o número
+
+    Returns:
+        str: Ex.: '000012525000001a.jpg'
+    """
+    duplicate = number.lstrip('0')[-2:] if duplicated else ''
+    return f"{number}{duplicate}{sequence:06d}{side}.jpg"
+
+
+def record_line(number: str, sequence: int, images: List[str], rng: random.Random, year: Optional[str]) -> str:
+    """Registro de infração no formato dos arquivos .txt do lote."""
+    equipment = rng.choice(EQUIPMENTS)
+    if year:
+        equipment += '/' + year
+    fields = [
+        number,
+        equipment,
+        f"2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+        str(rng.randint(1, 4)),
+        '000',
+        f"{rng.randint(0, 999):03d},{rng.randint(0, 9)}",
+        *images,
+        f"{sequence:06d}",
+        rng.choice(LOCATIONS),
+        rng.choice(INFRACTION_CODES),
+    ]
+    return ';'.join(fields) + '\n'
+
+
+def generate_lot(
+    root: str,
+    lot_name: str = 'L00125',
+    records: int = 1000,
+    layout: str = 'aits',
+    image_size: int = 4096,
+    duplicated: bool = True,
+    year: Optional[str] = '2023',
+    text_files: int = 1,
+    seed: int = 0
+) -> GeneratedLot:
+    """
+    Gera um lote em root.
+
+    Args:
+        root (str): Diretório onde o lote é criado
+        lot_name (str): Nome do lote (L + número)
+        records (int): Registros de infração (duas imagens por registro)
+        layout (str): Um de LAYOUTS
+        image_size (int): Tamanho de cada imagem em bytes
+        duplicated (bool): Nomes de imagem com os dígitos duplicados
+        year (str): Sufixo de ano dos equipamentos (None: sem sufixo)
+        text_files (int): Arquivos .txt entre os quais os registros são divididos
+        seed (int): Semente (mesmos parâmetros geram o mesmo lote)
+
+    Returns:
+        GeneratedLot: Caminho e totais do lote
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Layout desconhecido: {layout}")
+    if layout == 'rar' and shutil.which('rar') is None:
+        raise RuntimeError("O layout 'rar' exige o executável 'rar' no PATH")
+
+    rng = random.Random(seed)
+    number = lot_name[1:].rjust(7, '0')
+    lot = GeneratedLot(root, lot_name, layout)
+    lot_directory = os.path.join(root, lot_name)
+    number_directory = os.path.join(lot_directory, number)
+    image_directory = os.path.join(number_directory, 'AITs') if layout != 'flat' else number_directory
+    os.makedirs(image_directory, exist_ok=True)
+
+    nested_images = {}
+    image_names = []
+    for sequence in range(1, records + 1):
+        for side in 'ab':
+            name = jpg_name(number, sequence, side, duplicated)
+            image_names.append(name)
+            data = rng.getrandbits(8 * image_size).to_bytes(image_size, 'little') if image_size else b''
+            if layout == 'nested_zip':
+                nested_images[name] = data
+            else:
+                with open(os.path.join(image_directory, name), 'wb') as file:
+                    file.write(data)
+    lot.images = len(image_names)
+
+    # Registros divididos entre os arquivos de texto (o primeiro leva o nome do lote)
+    text_names = [f"{lot_name}.txt"] + [f"{lot_name}_{index}.txt" for index in range(1, text_files)]
+    per_file = -(-records // max(len(text_names), 1))
+    for index, text_name in enumerate(text_names):
+        first = index * per_file + 1
+        last = min(first + per_file, records + 1)
+        lines = [record_line(number, sequence, [image_names[2 * (sequence - 1)], image_names[2 * sequence - 1]],
+                             rng, year) for sequence in range(first, last)]
+        with open(os.path.join(number_directory, text_name), 'w', encoding='utf-8') as file:
+            file.writelines(lines)
+        lot.lines += len(lines)
+    lot.text_files = len(text_names)
+
+    if layout == 'nested_zip':
+        # Imagens dentro de um .zip em AITs/ (extraído na renomeação). O nome não leva o
+        # número do lote: um .zip que casa com o lote é renomeado antes da extração
+        with zipfile.ZipFile(os.path.join(image_directory, 'imagens.zip'), 'w', zipfile.ZIP_STORED) as archive:
+            for name, data in nested_images.items():
+                archive.writestr(name, data)
+
+    _write_md5sum(number_directory)
+
+    for directory, _, names in os.walk(lot_directory):
+        for name in names:
+            lot.files += 1
+            lot.bytes += os.path.getsize(os.path.join(directory, name))
+    if layout == 'nested_zip':
+        lot.files += len(nested_images)  # Extraídas na renomeação
+
+    if layout in ('zip', 'rar'):
+        lot.name = _compress(root, lot_name, layout)
+        shutil.rmtree(lot_directory)
+    return lot
+
+
+def _write_md5sum(directory: str) -> None:
+    """md5sum.txt (formato GNU) com todos os arquivos abaixo de directory."""
+    lines = []
+    for current, subdirectories, names in os.walk(directory):
+        subdirectories.sort()
+        for name in sorted(names):
+            path = os.path.join(current, name)
+            with open(path, 'rb') as file:
+                digest = hashlib.md5(file.read()).hexdigest()
+            lines.append(f"{digest} *{os.path.relpath(path, directory).replace(os.sep, '/')}\n")
+    with open(os.path.join(directory, 'md5sum.txt'), 'w', encoding='utf-8', newline='') as file:
+        file.writelines(lines)
+
+
+def _compress(root: str, lot_name: str, layout: str) -> str:
+    """Compacta a pasta do lote (conteúdo na raiz do arquivo, como os lotes recebidos)."""
+    lot_directory = os.path.join(root, lot_name)
+    if layout == 'zip':
+        archive_name = lot_name + '.zip'
+        with zipfile.ZipFile(os.path.join(root, archive_name), 'w', zipfile.ZIP_DEFLATED) as archive:
+            for directory, subdirectories, names in os.walk(lot_directory):
+                subdirectories.sort()
+                for name in sorted(names):
+                    path = os.path.join(directory, name)
+                    archive.write(path, os.path.relpath(path, lot_directory))
+        return archive_name
+    archive_name = lot_name + '.rar'
+    subprocess.run(['rar', 'a', '-r', '-inul', '-ep1', os.path.join(root, archive_name),
+                    os.path.join(lot_directory, '*')], check=True)
+    return archive_name
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera lotes sintéticos para benchmarks")
+    parser.add_argument('root', help="Diretório de destino")
+    parser.add_argument('--lot', default='L00125', help="Nome do lote (padrão: L00125)")
+    parser.add_argument('--lots', type=int, default=1, help="Quantidade de lotes (números consecutivos)")
+    parser.add_argument('--records', type=int, default=1000, help="Registros por lote (2 imagens cada)")
+    parser.add_argument('--layout', choices=LAYOUTS, default='aits')
+    parser.add_argument('--image-size', type=int, default=4096, help="Bytes por imagem (padrão: 4096)")
+    parser.add_argument('--text-files', type=int, default=1, help="Arquivos .txt por lote")
+    parser.add_argument('--no-duplicated', action='store_true',
+                        help="Nomes de imagem sem os dígitos duplicados do lote")
+    parser.add_argument('--no-year', action='store_true', help="Equipamentos sem sufixo de ano")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.root, exist_ok=True)
+    first = int(args.lot[1:])
+    lots = []
+    for index in range(args.lots):
+        lot_name = f"L{first + index:0{len(args.lot) - 1}d}"
+        lot = generate_lot(args.root, lot_name, args.records, args.layout, args.image_size,
+                           not args.no_duplicated, None if args.no_year else '2023',
+                           args.text_files, args.seed + index)
+        lots.append(lot.to_dict())
+    print(json.dumps(lots, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Benchmarks da renomeação de lotes.
+
+Para cada layout de lote (ver lot_generator.LAYOUTS) e operação, um lote
+sintético é gerado em um diretório temporário e a operação roda em um
+processo separado (pico de memória isolado por cenário):
+
+    rename   LotPipeline.run, com o tempo de cada etapa
+    plan     LotPlanner.plan (simulação; lotes em pasta sem .zip)
+    report   Relatório de infrações (analyze_lot)
+
+O resultado (JSON) traz, por cenário, o tempo de cada etapa, arquivos/s e
+linhas/s sobre o tempo total do cenário e o pico de memória (RSS). Com --compare, os tempos e o pico de
+memória são comparados a um resultado anterior e o código de saída é 1 se
+algum cenário piorou além de --tolerance.
+
+Uso:
+    python benchmarks/run_benchmarks.py --records 5000 --output atual.json
+    python benchmarks/run_benchmarks.py --records 5000 --compare base.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'config'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from paths import setup_environment  # noqa: E402
+setup_environment()
+
+from lot_generator import LAYOUTS, generate_lot  # noqa: E402
+
+RESULT_VERSION = 2  # 2: taxas do cenário sobre o tempo total (*_per_second_total)
+OPERATIONS = ('rename', 'plan', 'report')
+ARCHIVE_LAYOUTS = ('zip', 'rar', 'nested_zip')  # Sem simulação (plan)
+NEW_LOT_NAME = 'L00126'
+
+
+# ----------------------------------------------------------------------
+# Processo filho: executa um cenário e imprime o resultado em JSON
+# ----------------------------------------------------------------------
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de memória residente do processo atual (None se indisponível)."""
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS em bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _stage_timer():
+    from progress import ProgressTracker
+
+    class StageTimer(ProgressTracker):
+        """ProgressTracker que registra a duração e os itens de cada etapa."""
+
+        def __init__(self):
+            super().__init__()
+            self.stages: List[Dict[str, Any]] = []
+            self._current: Optional[Dict[str, Any]] = None
+
+        def set_stage(self, stage: str, planned: Optional[int] = None) -> None:
+            self.finish()
+            super().set_stage(stage, planned)
+            self._current = {'name': stage, 'start': time.perf_counter(), 'items': 0}
+
+        def advance(self, count: int = 1, failed: int = 0) -> None:
+            super().advance(count, failed)
+            if self._current is not None:
+                self._current['items'] += count
+
+        def finish(self) -> None:
+            if self._current is not None:
+                current = self._current
+                self.stages.append({'name': current['name'],
+                                    'seconds': time.perf_counter() - current['start'],
+                                    'items': current['items']})
+                self._current = None
+
+    return StageTimer()
+
+
+def run_child(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Executa um cenário (no processo filho)."""
+    from log_manager import setup_logging
+    setup_logging(level='WARNING', console_stream='stderr', log_to_file=False)
+    root, lot_name, operation = spec['root'], spec['lot_name'], spec['operation']
+    baseline_rss = peak_rss_bytes()
+    stages: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+
+    if operation == 'rename':
+        from lot_pipeline import LotPipeline
+        from rename_journal import RenameJournal
+        timer = _stage_timer()
+        pipeline = LotPipeline(root, max_workers=spec['workers'])
+        result = pipeline.run(lot_name, NEW_LOT_NAME, '2024', True, None, progress=timer)
+        timer.finish()
+        stages = timer.stages
+        # O diário fica na pasta cache/ do projeto: remove a pasta do diretório temporário
+        journal_path = RenameJournal(root, lot_name, NEW_LOT_NAME).path
+        shutil.rmtree(os.path.dirname(journal_path), ignore_errors=True)
+        if not result.success:
+            raise RuntimeError(result.error)
+    elif operation == 'plan':
+        from lot_plan import LotPlanner
+        plan = LotPlanner(root).plan(lot_name, NEW_LOT_NAME, '2024', True, None)
+        if plan.errors:
+            raise RuntimeError(plan.errors[0])
+    elif operation == 'report':
+        from infraction_report import analyze_lot
+        analyze_lot((root, lot_name))
+    else:
+        raise ValueError(f"Operação desconhecida: {operation}")
+
+    return {
+        'seconds': time.perf_counter() - start,
+        'stages': stages,
+        'baseline_rss_bytes': baseline_rss,
+        'peak_rss_bytes': peak_rss_bytes(),
+    }
+
+
+# ----------------------------------------------------------------------
+# Processo principal
+# ----------------------------------------------------------------------
+
+def run_scenario(layout: str, operation: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Gera o lote e executa o cenário args.repeat vezes (fica a execução mais rápida)."""
+    runs = []
+    lot = None
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+    for _ in range(args.repeat):
+        root = tempfile.mkdtemp(prefix='operalote-bench-', dir=args.work_dir)
+        try:
+            lot = generate_lot(root, 'L00125', args.records, layout, args.image_size,
+                               text_files=args.text_files, seed=args.seed)
+            spec = {'root': root, 'lot_name': lot.name, 'operation': operation, 'workers': args.workers}
+            completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', json.dumps(spec)],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       universal_newlines=True)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                                   else f"código de saída {completed.returncode}")
+            runs.append(json.loads(completed.stdout))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    best = min(runs, key=lambda run: run['seconds'])
+    seconds = best['seconds']
+    stages = [{
+        'name': stage['name'],
+        'seconds': round(stage['seconds'], 4),
+        'items': stage['items'],
+        'items_per_second': round(stage['items'] / stage['seconds'], 1) if stage['seconds'] > 0 else None,
+    } for stage in best['stages']]
+    return {
+        'name': f"{layout}/{operation}",
+        'layout': layout,
+        'operation': operation,
+        'lot': lot.to_dict(),
+        'seconds': round(seconds, 4),
+        'runs': [round(run['seconds'], 4) for run in runs],
+        # Mesmo denominador em todos os cenários (tempo total); a taxa de cada
+        # etapa fica em stages[].items_per_second
+        'files_per_second_total': round(lot.files / seconds, 1) if seconds > 0 else None,
+        'lines_per_second_total': round(lot.lines / seconds, 1) if seconds > 0 else None,
+        'stages': stages,
+        'baseline_rss_bytes': best['baseline_rss_bytes'],
+        'peak_rss_bytes': max((run['peak_rss_bytes'] or 0) for run in runs) or None,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compara dois resultados.
+
+    Returns:
+        List[str]: Cenários que pioraram além da tolerância (tempo ou memória)
+    """
+    previous = {scenario['name']: scenario for scenario in baseline.get('scenarios', [])}
+    regressions = []
+    print(f"{'cenário':<22}{'antes (s)':>11}{'agora (s)':>11}{'variação':>10}{'pico RSS':>12}", file=sys.stderr)
+    for scenario in current['scenarios']:
+        before = previous.get(scenario['name'])
+        if before is None:
+            print(f"{scenario['name']:<22}{'-':>11}{scenario['seconds']:>11.3f}", file=sys.stderr)
+            continue
+        change = scenario['seconds'] / before['seconds'] - 1 if before['seconds'] else 0.0
+        memory_change = 0.0
+        if scenario.get('peak_rss_bytes') and before.get('peak_rss_bytes'):
+            memory_change = scenario['peak_rss_bytes'] / before['peak_rss_bytes'] - 1
+        print(f"{scenario['name']:<22}{before['seconds']:>11.3f}{scenario['seconds']:>11.3f}"
+              f"{change:>+10.1%}{memory_change:>+12.1%}", file=sys.stderr)
+        if change > tolerance or memory_change > tolerance:
+            regressions.append(scenario['name'])
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks da renomeação de lotes")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--records', type=int, default=2000, help="Registros por lote (2 imagens cada)")
+    parser.add_argument('--image-size', type=int, default=4096, help="Bytes por imagem (padrão: 4096)")
+    parser.add_argument('--text-files', type=int, default=4, help="Arquivos .txt por lote")
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS,
+                        help="Layouts (padrão: todos; 'rar' só se o executável 'rar' existir)")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--workers', type=int, default=None, help="Workers de arquivos (padrão: DEFAULT_WORKERS)")
+    parser.add_argument('--repeat', type=int, default=3, help="Execuções por cenário (vale a mais rápida)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', help="Diretório dos lotes temporários (padrão: temporário do sistema)")
+    parser.add_argument('--output', help="Grava o resultado JSON neste arquivo (padrão: saída padrão)")
+    parser.add_argument('--compare', help="Resultado anterior para comparação")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Piora aceita antes de acusar regressão (padrão: 0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    from config import DEFAULT_WORKERS
+    if args.workers is None:
+        args.workers = DEFAULT_WORKERS
+    layouts = args.layouts or [layout for layout in LAYOUTS if layout != 'rar' or shutil.which('rar')]
+
+    scenarios = []
+    for layout in layouts:
+        for operation in args.operations:
+            if operation == 'plan' and layout in ARCHIVE_LAYOUTS:
+                continue  # A simulação não trata lotes com arquivos compactados
+            print(f"{layout}/{operation}...", file=sys.stderr)
+            try:
+                scenarios.append(run_scenario(layout, operation, args))
+            except Exception as e:
+                print(f"  falhou: {e}", file=sys.stderr)
+                scenarios.append({'name': f"{layout}/{operation}", 'layout': layout,
+                                  'operation': operation, 'error': str(e)})
+
+    result = {
+        'version': RESULT_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'parameters': {'records': args.records, 'image_size': args.image_size, 'text_files': args.text_files,
+                       'workers': args.workers, 'repeat': args.repeat, 'seed': args.seed},
+        'scenarios': scenarios,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+    failed = any('error' in scenario for scenario in scenarios)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        successful = dict(result, scenarios=[scenario for scenario in scenarios if 'error' not in scenario])
+        regressions = compare(successful, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressões: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
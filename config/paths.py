@@ -40,6 +40,12 @@ def get_logs_path():
     project_root = os.path.dirname(current_dir)
     return os.path.join(project_root, 'logs')
 
+def get_cache_path():
+    """Retorna o caminho para o cache de análises"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, 'cache')
+
 def get_src_path():
     """Retorna o caminho para o código fonte"""
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+OperaLote 4.3 - Modo headless (linha de comando)
+Ex.: python operalote.py batch lotes.csv --root D:\\LOTES
+"""
+
+import sys
+import os
+
+# Adiciona o diretório config ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'config'))
+
+# Configura o ambiente
+from paths import setup_environment
+setup_environment()
+
+from cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
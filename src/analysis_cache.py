@@ -0,0 +1,174 @@
+"""
+Cache persistente da análise de infrações.
+
+Guarda, por lote, a contagem de códigos de infração de cada arquivo .txt
+junto com o tamanho e o mtime_ns lidos na análise. Uma nova análise só relê
+os arquivos cujo tamanho ou mtime mudou. O cache fica em um arquivo JSON na
+pasta cache/ do projeto (nunca dentro do lote), um por diretório de lote.
+Arquivos com mtime recente demais no momento da leitura não são guardados
+(ver InfractionCache.is_racy).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+from config import (
+    CACHE_DIRECTORY_NAME, INFRACTION_CACHE_VERSION, INFRACTION_CACHE_MTIME_RESOLUTION
+)
+from log_manager import get_logger
+
+logger = get_logger('analysis_cache')
+
+
+def get_cache_path() -> str:
+    """Pasta de cache do projeto (config/paths.get_cache_path quando disponível)."""
+    try:
+        from paths import get_cache_path as project_cache_path
+        return project_cache_path()
+    except ImportError:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(project_root, CACHE_DIRECTORY_NAME)
+
+
+class InfractionCache:
+    """
+    Contagens de infrações por arquivo de um lote, chaveadas por caminho
+    relativo, tamanho e mtime_ns.
+    """
+
+    def __init__(self, lot_directory: str, cache_directory: Optional[str] = None):
+        self.lot_directory = os.path.normpath(os.path.abspath(lot_directory))
+        self.cache_directory = cache_directory or os.path.join(get_cache_path(), 'infractions')
+        self.mtime_resolution_ns = int(INFRACTION_CACHE_MTIME_RESOLUTION * 1e9)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, list] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.racy = 0  # Arquivos não guardados por terem mtime recente demais
+        self._load()
+
+    @property
+    def cache_file(self) -> str:
+        """Arquivo JSON do lote (nome derivado do caminho absoluto do lote)."""
+        key = os.path.normcase(self.lot_directory).encode('utf-8', 'surrogateescape')
+        return os.path.join(self.cache_directory, hashlib.sha1(key).hexdigest() + '.json')
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.lot_directory).replace(os.sep, '/')
+
+    def _load(self) -> None:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de infrações ignorado ({self.cache_file}): {e}")
+            return
+        if (data.get('version') != INFRACTION_CACHE_VERSION
+                or data.get('lot_directory') != self.lot_directory):
+            return
+        self._entries = data.get('files', {})
+
+    def lookup(self, path: str, size: int, mtime_ns: int) -> Optional[Dict[str, int]]:
+        """
+        Obtém as contagens de um arquivo.
+
+        Args:
+            path (str): Caminho do arquivo .txt
+            size (int): Tamanho atual do arquivo
+            mtime_ns (int): mtime atual do arquivo
+
+        Returns:
+            Optional[Dict[str, int]]: Contagens, ou None se o arquivo não
+                estiver no cache ou tiver mudado
+        """
+        with self._lock:
+            entry = self._entries.get(self._relative(path))
+            if entry is None or entry[0] != size or entry[1] != mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[2]
+
+    def is_racy(self, mtime_ns: int, checked_ns: int) -> bool:
+        """
+        Indica se o mtime está perto demais do momento da leitura para
+        garantir que uma alteração posterior mude o mtime (mesma proteção do
+        índice do git). Em compartilhamentos SMB/FAT o mtime tem resolução de
+        até 2 s, e change_infraction_codes troca códigos de 4 dígitos sem
+        mudar o tamanho: uma edição logo após a leitura não seria percebida.
+
+        Args:
+            mtime_ns (int): mtime do arquivo no momento do os.stat
+            checked_ns (int): Relógio (time.time_ns) antes do os.stat
+
+        Returns:
+            bool: True se a entrada não deve ser guardada
+        """
+        return checked_ns - mtime_ns < self.mtime_resolution_ns
+
+    def store(self, path: str, size: int, mtime_ns: int, counts: Dict[str, int],
+              checked_ns: Optional[int] = None) -> bool:
+        """
+        Registra as contagens de um arquivo lido com o tamanho/mtime informados.
+
+        Args:
+            path (str): Caminho do arquivo .txt
+            size (int): Tamanho do arquivo antes da leitura
+            mtime_ns (int): mtime do arquivo antes da leitura
+            counts (Dict[str, int]): Contagens de infrações do arquivo
+            checked_ns (int): Relógio antes do os.stat (padrão: agora)
+
+        Returns:
+            bool: False se a entrada foi descartada por is_racy
+        """
+        if checked_ns is None:
+            checked_ns = time.time_ns()
+        if self.is_racy(mtime_ns, checked_ns):
+            with self._lock:
+                self.racy += 1
+            return False
+        with self._lock:
+            self._entries[self._relative(path)] = [size, mtime_ns, dict(counts)]
+            self._dirty = True
+        return True
+
+    def retain(self, paths: Iterable[str]) -> None:
+        """Remove as entradas de arquivos que não fazem mais parte do lote."""
+        keep = {self._relative(path) for path in paths}
+        with self._lock:
+            for relative in [relative for relative in self._entries if relative not in keep]:
+                del self._entries[relative]
+                self._dirty = True
+
+    def save(self) -> bool:
+        """
+        Grava o cache se houve alteração (arquivo temporário + os.replace).
+
+        Returns:
+            bool: False se não foi possível gravar (o cache é opcional)
+        """
+        with self._lock:
+            if not self._dirty:
+                return True
+            data = {
+                'version': INFRACTION_CACHE_VERSION,
+                'lot_directory': self.lot_directory,
+                'files': self._entries,
+            }
+            temp_path = self.cache_file + '.tmp'
+            try:
+                os.makedirs(self.cache_directory, exist_ok=True)
+                with open(temp_path, 'w', encoding='utf-8') as file:
+                    json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+                os.replace(temp_path, self.cache_file)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar o cache de infrações: {e}")
+                return False
+            self._dirty = False
+            return True
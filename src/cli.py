@@ -0,0 +1,601 @@
+"""
+Interface de linha de comando do OperaLote (modo headless).
+
+Uso:
+    python operalote.py batch MANIFESTO --root DIRETORIO [opções]
+    python operalote.py rename --root DIRETORIO --old LOTE --new NOVO [--profile]
+    python operalote.py report --root DIRETORIO [opções]
+    python operalote.py plan MANIFESTO --root DIRETORIO [--output plano.json] [--diff plano.diff]
+    python operalote.py apply plano.json [opções]
+    python operalote.py undo --root DIRETORIO --old LOTE --new NOVO
+    python operalote.py md5 --root DIRETORIO [--lots LOTE ...]
+    python operalote.py watch --root DIRETORIO --rules REGRAS [opções]
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import os
+import re
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import (
+    DEFAULT_WORKERS, LOG_LEVEL, PROFILE_FILE_WORKERS, TEXT_DURABILITY, WATCH_DEBOUNCE_SECONDS,
+    WATCH_POLL_INTERVAL
+)
+from lot_pipeline import LotPipeline, undo_lot
+from lot_plan import LotPlan, LotPlanner, LotPlanExecutor, PlanError
+from worker_pool import run_bounded
+from infraction_report import build_report, write_report_csv, discover_lots
+from md5_manifest import find_manifests, verify_manifest
+from lot_watcher import LotWatcher, WatchRule
+from text_stream import set_durability, DURABILITY_LEVELS
+from instrumentation import Instrumentation, write_chrome_trace
+from profiling import Profiler
+from log_manager import setup_logging, flush_logs, get_logs_path
+
+MANIFEST_FIELDS = ('old_lot', 'new_lot', 'year', 'add_year', 'infraction_code')
+RULE_FIELDS = ('pattern', 'new_lot', 'year', 'add_year', 'infraction_code')
+TRUE_VALUES = ('1', 'true', 'sim', 's', 'yes', 'y')
+
+
+class ManifestError(ValueError):
+    """Manifesto de lotes inválido."""
+
+
+def _parse_bool(value: Any, default: bool = True) -> bool:
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _normalize_row(row: Dict[str, Any], line: int) -> Dict[str, Any]:
+    old_lot = str(row.get('old_lot') or '').strip()
+    new_lot = str(row.get('new_lot') or '').strip()
+    if not old_lot or not new_lot:
+        raise ManifestError(f"Linha {line}: old_lot e new_lot são obrigatórios")
+    year = row.get('year')
+    code = row.get('infraction_code')
+    return {
+        'old_lot': old_lot,
+        'new_lot': new_lot,
+        'year': str(year).strip() if year not in (None, '') else None,
+        'add_year': _parse_bool(row.get('add_year'), default=True),
+        'infraction_code': str(code).strip() if code not in (None, '') else None,
+    }
+
+
+def _read_rows(path: str) -> List[Tuple[int, Dict[str, Any]]]:
+    """Linhas de um CSV (com cabeçalho) ou JSON (lista de objetos), com o número da linha."""
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if not isinstance(data, list):
+            raise ManifestError("Manifesto JSON deve ser uma lista de objetos")
+        return [(index + 1, row) for index, row in enumerate(data)]
+    with open(path, 'r', encoding='utf-8-sig', newline='') as file:
+        sample = file.read(4096)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(file, dialect=dialect)
+        return [(index + 2, row) for index, row in enumerate(reader)]
+
+
+def load_manifest(path: str) -> List[Dict[str, Any]]:
+    """
+    Lê o manifesto de lotes em CSV (com cabeçalho) ou JSON (lista de objetos).
+
+    Colunas: old_lot, new_lot, year, add_year, infraction_code
+
+    Args:
+        path (str): Caminho do manifesto
+
+    Returns:
+        List[Dict[str, Any]]: Linhas normalizadas
+
+    Raises:
+        ManifestError: Se o manifesto estiver inválido
+    """
+    rows = [_normalize_row(row, line) for line, row in _read_rows(path)]
+
+    # Dois lotes com a mesma origem ou o mesmo destino não podem rodar juntos
+    for field in ('old_lot', 'new_lot'):
+        seen = set()
+        for row in rows:
+            if row[field] in seen:
+                raise ManifestError(f"Lote repetido no manifesto ({field}): {row[field]}")
+            seen.add(row[field])
+    return rows
+
+
+def load_rules(path: str) -> List[WatchRule]:
+    """
+    Lê as regras de 'watch' em CSV (com cabeçalho) ou JSON (lista de
+    objetos). A primeira regra que casar com o nome do lote é usada.
+
+    Colunas: pattern, new_lot, year, add_year, infraction_code
+
+    Args:
+        path (str): Caminho do arquivo de regras
+
+    Returns:
+        List[WatchRule]: Regras na ordem do arquivo
+
+    Raises:
+        ManifestError: Se alguma regra estiver inválida
+    """
+    rules = []
+    for line, row in _read_rows(path):
+        pattern = str(row.get('pattern') or '').strip()
+        new_lot = str(row.get('new_lot') or '').strip()
+        if not pattern or not new_lot:
+            raise ManifestError(f"Linha {line}: pattern e new_lot são obrigatórios")
+        year = row.get('year')
+        code = row.get('infraction_code')
+        try:
+            rules.append(WatchRule(
+                pattern, new_lot,
+                year=str(year).strip() if year not in (None, '') else None,
+                add_year=_parse_bool(row.get('add_year'), default=True),
+                infraction_code=str(code).strip() if code not in (None, '') else None,
+            ))
+        except re.error as e:
+            raise ManifestError(f"Linha {line}: expressão inválida em pattern: {e}")
+    if not rules:
+        raise ManifestError("Nenhuma regra no arquivo")
+    return rules
+
+
+def run_batch(
+    root: str,
+    rows: List[Dict[str, Any]],
+    lot_workers: int = 1,
+    file_workers: int = DEFAULT_WORKERS,
+    zip_output: bool = False,
+    instrumentations: Optional[List[Instrumentation]] = None
+) -> Dict[str, Any]:
+    """
+    Processa vários lotes com limite de concorrência entre lotes.
+
+    Args:
+        root (str): Diretório que contém os lotes
+        rows (List[Dict]): Linhas do manifesto
+        lot_workers (int): Lotes processados ao mesmo tempo
+        file_workers (int): Workers de arquivos dentro de cada lote
+        zip_output (bool): Lotes .zip geram um novo .zip renomeado em vez
+            de um diretório
+        instrumentations (List[Instrumentation]): Se informada, cada lote é
+            instrumentado e sua Instrumentation é acrescentada à lista
+
+    Returns:
+        Dict[str, Any]: Resumo da execução (serializável em JSON)
+    """
+    def process(row):
+        pipeline = LotPipeline(root, max_workers=file_workers)
+        pipeline.zip_output = zip_output
+        if instrumentations is not None:
+            pipeline.instrumentation = Instrumentation(f"{row['old_lot']} -> {row['new_lot']}")
+            instrumentations.append(pipeline.instrumentation)
+        return pipeline.run(row['old_lot'], row['new_lot'], row['year'],
+                            row['add_year'], row['infraction_code'])
+
+    start = time.perf_counter()
+    lots = []
+    for row, lot_result, error in run_bounded(process, rows, lot_workers):
+        if error is not None:
+            lots.append({'old_name': row['old_lot'], 'new_name': row['new_lot'],
+                         'success': False, 'error': str(error)})
+        else:
+            lots.append(lot_result.to_dict())
+
+    succeeded = sum(1 for lot in lots if lot['success'])
+    return {
+        'root': root,
+        'total': len(lots),
+        'succeeded': succeeded,
+        'failed': len(lots) - succeeded,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'lots': lots,
+    }
+
+
+def build_plans(root: str, rows: List[Dict[str, Any]], workers: int = 1) -> List[LotPlan]:
+    """
+    Simula a renomeação de vários lotes (nada é alterado no disco).
+
+    Args:
+        root (str): Diretório que contém os lotes
+        rows (List[Dict]): Linhas do manifesto
+        workers (int): Lotes simulados ao mesmo tempo
+
+    Returns:
+        List[LotPlan]: Um plano por linha, na ordem do manifesto
+    """
+    planner = LotPlanner(root)
+
+    def plan(row):
+        return planner.plan(row['old_lot'], row['new_lot'], row['year'],
+                            row['add_year'], row['infraction_code'])
+
+    plans = []
+    for row, lot_plan, error in run_bounded(plan, rows, workers):
+        if error is not None:
+            lot_plan = LotPlan(root, row['old_lot'], row['new_lot'])
+            lot_plan.errors.append(str(error))
+        plans.append(lot_plan)
+    return plans
+
+
+def run_plans(plans: List[LotPlan], lot_workers: int = 1, file_workers: int = DEFAULT_WORKERS,
+              instrumentations: Optional[List[Instrumentation]] = None) -> Dict[str, Any]:
+    """
+    Executa planos gerados por build_plans (mesmo resumo de run_batch).
+
+    Args:
+        plans (List[LotPlan]): Planos a executar
+        lot_workers (int): Lotes executados ao mesmo tempo
+        file_workers (int): Workers de arquivos dentro de cada lote
+        instrumentations (List[Instrumentation]): Se informada, cada lote é
+            instrumentado e sua Instrumentation é acrescentada à lista
+
+    Returns:
+        Dict[str, Any]: Resumo da execução (serializável em JSON)
+    """
+    def execute(plan):
+        executor = LotPlanExecutor(file_workers)
+        if instrumentations is not None:
+            executor.instrumentation = Instrumentation(f"{plan.old_name} -> {plan.new_name}")
+            instrumentations.append(executor.instrumentation)
+        return executor.execute(plan)
+
+    start = time.perf_counter()
+    lots = []
+    for plan, lot_result, error in run_bounded(execute, plans, lot_workers):
+        if error is not None:
+            lots.append({'old_name': plan.old_name, 'new_name': plan.new_name,
+                         'success': False, 'error': str(error)})
+        else:
+            lots.append(lot_result.to_dict())
+
+    succeeded = sum(1 for lot in lots if lot['success'])
+    return {
+        'total': len(lots),
+        'succeeded': succeeded,
+        'failed': len(lots) - succeeded,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'lots': lots,
+    }
+
+
+def _write_json(data: Dict[str, Any], output: Optional[str]) -> None:
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+
+
+def _write_trace(path: Optional[str], instrumentations: Optional[List[Instrumentation]]) -> None:
+    if path and instrumentations is not None:
+        write_chrome_trace(path, instrumentations)
+        print(f"Trace gravado em {path} (abrir em chrome://tracing ou ui.perfetto.dev)", file=sys.stderr)
+
+
+def command_batch(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+    try:
+        rows = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Erro no manifesto: {e}", file=sys.stderr)
+        return 2
+
+    set_durability(args.durability)
+    instrumentations = [] if args.timings or args.trace else None
+    # O log do processamento vai para stderr; stdout fica só com o resumo JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run_batch(args.root, rows, args.lot_workers, args.file_workers, args.zip_output,
+                            instrumentations)
+        flush_logs()
+    _write_trace(args.trace, instrumentations)
+    _write_json(summary, args.summary)
+    return 0 if summary['failed'] == 0 else 1
+
+
+def command_rename(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+
+    set_durability(args.durability)
+    file_workers = args.file_workers
+    if file_workers is None:
+        file_workers = PROFILE_FILE_WORKERS if args.profile else DEFAULT_WORKERS
+    pipeline = LotPipeline(args.root, max_workers=file_workers)
+    pipeline.zip_output = args.zip_output
+    profiler = Profiler() if args.profile else None
+    with contextlib.redirect_stdout(sys.stderr):
+        with profiler if profiler is not None else contextlib.nullcontext():
+            result = pipeline.run(args.old, args.new, args.year, not args.no_year, args.infraction_code)
+        flush_logs()
+    if profiler is not None:
+        _write_profile(profiler, args.profile_dir or get_logs_path(), args.old)
+    _write_json(result.to_dict(), args.summary)
+    return 0 if result.success else 1
+
+
+def _write_profile(profiler: Profiler, directory: str, lot_name: str) -> None:
+    name = f"perfil_{os.path.splitext(lot_name)[0]}_{time.strftime('%Y%m%d_%H%M%S')}"
+    paths = profiler.write(directory, name)
+    print(profiler.format_top(), file=sys.stderr)
+    print(f"Perfil gravado em {paths['profile']} (pstats/snakeviz)", file=sys.stderr)
+    if 'collapsed' in paths:
+        print(f"Pilhas amostradas ({profiler.sampler.ticks} amostras) em {paths['collapsed']} "
+              f"(speedscope ou flamegraph.pl)", file=sys.stderr)
+
+
+def command_report(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+
+    report = build_report(args.root, args.lots or None, args.workers)
+    flush_logs()
+    output_format = args.format
+    if output_format is None:
+        output_format = 'csv' if args.output and args.output.lower().endswith('.csv') else 'json'
+    if output_format == 'json':
+        _write_json(report, args.output)
+    elif args.output:
+        with open(args.output, 'w', encoding='utf-8-sig', newline='') as file:
+            write_report_csv(report, file)
+    else:
+        write_report_csv(report, sys.stdout)
+    return 0 if report['failed'] == 0 else 1
+
+
+def command_plan(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+    try:
+        rows = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Erro no manifesto: {e}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    plans = build_plans(args.root, rows, args.workers)
+    flush_logs()
+    invalid = sum(1 for plan in plans if not plan.executable)
+    _write_json({
+        'root': args.root,
+        'total': len(plans),
+        'invalid': invalid,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'lots': [plan.to_dict() for plan in plans],
+    }, args.output)
+    if args.diff:
+        with open(args.diff, 'w', encoding='utf-8', newline='') as file:
+            for plan in plans:
+                file.write(plan.to_diff())
+    return 0 if invalid == 0 else 1
+
+
+def command_apply(args: argparse.Namespace) -> int:
+    try:
+        with open(args.plan, 'r', encoding='utf-8') as file:
+            plans = [LotPlan.from_dict(lot) for lot in json.load(file)['lots']]
+    except (OSError, ValueError, KeyError, PlanError) as e:
+        print(f"Erro no plano: {e}", file=sys.stderr)
+        return 2
+
+    set_durability(args.durability)
+    instrumentations = [] if args.timings or args.trace else None
+    summary = run_plans(plans, args.lot_workers, args.file_workers, instrumentations)
+    flush_logs()
+    _write_trace(args.trace, instrumentations)
+    _write_json(summary, args.summary)
+    return 0 if summary['failed'] == 0 else 1
+
+
+def command_md5(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    manifests = []
+    for lot_name in args.lots or discover_lots(args.root):
+        lot_directory = os.path.join(args.root, lot_name)
+        if not os.path.isdir(lot_directory):
+            continue
+        for path in find_manifests(lot_directory):
+            manifests.append(verify_manifest(path, args.workers).to_dict())
+    flush_logs()
+    failed = sum(1 for manifest in manifests
+                 if manifest['mismatched'] or manifest['missing'] or manifest['errors'])
+    _write_json({
+        'root': args.root,
+        'manifests': len(manifests),
+        'failed': failed,
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'results': manifests,
+    }, args.output)
+    return 0 if failed == 0 else 1
+
+
+def command_watch(args: argparse.Namespace) -> int:
+    if not os.path.isdir(args.root):
+        print(f"Diretório não encontrado: {args.root}", file=sys.stderr)
+        return 2
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as e:
+        print(f"Erro nas regras: {e}", file=sys.stderr)
+        return 2
+
+    set_durability(args.durability)
+    watcher = LotWatcher(args.root, rules, args.lot_workers, args.file_workers, args.debounce,
+                         args.poll_interval, use_inotify=not args.polling,
+                         process_existing=args.existing, zip_output=args.zip_output)
+    # Encerramento pelo serviço (SIGTERM): termina os lotes em andamento
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = watcher.run()
+        flush_logs()
+    _write_json(summary, args.summary)
+    return 0 if summary['failed'] == 0 else 1
+
+
+def command_undo(args: argparse.Namespace) -> int:
+    try:
+        summary = undo_lot(args.root, args.old, args.new)
+    except (OSError, RuntimeError) as e:
+        flush_logs()
+        print(f"Não foi possível desfazer: {e}", file=sys.stderr)
+        return 2
+    flush_logs()
+    _write_json(summary, None)
+    return 0 if summary['skipped'] == 0 and summary['irreversible'] == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='operalote', description="OperaLote - modo headless")
+    parser.add_argument('--log-level', default=LOG_LEVEL,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help=f"Nível do log no console (padrão: {LOG_LEVEL}; DEBUG mostra cada arquivo)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    batch = subparsers.add_parser('batch', help="Renomeia vários lotes a partir de um manifesto CSV/JSON")
+    batch.add_argument('manifest', help="Manifesto com colunas " + ", ".join(MANIFEST_FIELDS))
+    batch.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    batch.add_argument('--lot-workers', type=int, default=1,
+                       help="Lotes processados ao mesmo tempo (padrão: 1)")
+    batch.add_argument('--file-workers', type=int, default=DEFAULT_WORKERS,
+                       help=f"Workers de arquivos por lote (padrão: {DEFAULT_WORKERS})")
+    batch.add_argument('--zip-output', action='store_true',
+                       help="Lotes .zip geram um novo .zip renomeado (sem extrair no disco)")
+    batch.add_argument('--durability', choices=DURABILITY_LEVELS, default=TEXT_DURABILITY,
+                       help="fsync das regravações de texto: none, batch (uma vez por etapa) "
+                            f"ou full (a cada arquivo) (padrão: {TEXT_DURABILITY})")
+    batch.add_argument('--summary', help="Grava o resumo JSON neste arquivo (padrão: saída padrão)")
+    batch.add_argument('--timings', action='store_true',
+                       help="Mede tempo e E/S de cada etapa (tabela no log e 'instrumentation' no resumo)")
+    batch.add_argument('--trace', help="Grava o trace das etapas (formato Chrome) neste arquivo (implica --timings)")
+    batch.set_defaults(func=command_batch)
+
+    rename = subparsers.add_parser('rename', help="Renomeia um lote (com --profile, grava o perfil da execução)")
+    rename.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    rename.add_argument('--old', required=True, help="Lote atual (pasta, .zip ou .rar)")
+    rename.add_argument('--new', required=True, help="Novo nome do lote")
+    rename.add_argument('--year', help="Ano do código de infração (ex.: 2023)")
+    rename.add_argument('--no-year', action='store_true', help="Não adiciona o ano aos códigos")
+    rename.add_argument('--infraction-code', help="Código para padronizar todas as infrações")
+    rename.add_argument('--file-workers', type=int,
+                        help=f"Workers de arquivos (padrão: {DEFAULT_WORKERS}; "
+                             f"{PROFILE_FILE_WORKERS} com --profile)")
+    rename.add_argument('--zip-output', action='store_true',
+                        help="Lote .zip gera um novo .zip renomeado (sem extrair no disco)")
+    rename.add_argument('--durability', choices=DURABILITY_LEVELS, default=TEXT_DURABILITY,
+                        help=f"fsync das regravações de texto (padrão: {TEXT_DURABILITY})")
+    rename.add_argument('--summary', help="Grava o resumo JSON neste arquivo (padrão: saída padrão)")
+    rename.add_argument('--profile', action='store_true',
+                        help="Executa sob cProfile e amostragem de pilhas; grava .prof e .folded "
+                             "e mostra as funções mais pesadas")
+    rename.add_argument('--profile-dir', help="Pasta do perfil (padrão: logs/)")
+    rename.set_defaults(func=command_rename)
+
+    report = subparsers.add_parser('report', help="Estatísticas de infrações de todos os lotes de um diretório")
+    report.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    report.add_argument('--lots', nargs='+', help="Lotes a analisar (padrão: todas as pastas e .zip)")
+    report.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processos de análise (padrão: número de CPUs)")
+    report.add_argument('--format', choices=['csv', 'json'],
+                        help="Formato do relatório (padrão: pela extensão de --output, ou JSON)")
+    report.add_argument('--output', help="Grava o relatório neste arquivo (padrão: saída padrão)")
+    report.set_defaults(func=command_report)
+
+    plan = subparsers.add_parser('plan', help="Simula a renomeação dos lotes de um manifesto sem alterar o disco")
+    plan.add_argument('manifest', help="Manifesto com colunas " + ", ".join(MANIFEST_FIELDS))
+    plan.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    plan.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                      help=f"Lotes simulados ao mesmo tempo (padrão: {DEFAULT_WORKERS})")
+    plan.add_argument('--output', help="Grava o plano JSON neste arquivo (padrão: saída padrão)")
+    plan.add_argument('--diff', help="Grava também as mudanças em formato diff neste arquivo")
+    plan.set_defaults(func=command_plan)
+
+    apply = subparsers.add_parser('apply', help="Executa um plano gerado por 'plan'")
+    apply.add_argument('plan', help="Plano JSON gerado por 'plan --output'")
+    apply.add_argument('--lot-workers', type=int, default=1,
+                       help="Lotes processados ao mesmo tempo (padrão: 1)")
+    apply.add_argument('--file-workers', type=int, default=DEFAULT_WORKERS,
+                       help=f"Workers de arquivos por lote (padrão: {DEFAULT_WORKERS})")
+    apply.add_argument('--durability', choices=DURABILITY_LEVELS, default=TEXT_DURABILITY,
+                       help=f"fsync das regravações de texto (padrão: {TEXT_DURABILITY})")
+    apply.add_argument('--summary', help="Grava o resumo JSON neste arquivo (padrão: saída padrão)")
+    apply.add_argument('--timings', action='store_true',
+                       help="Mede tempo e E/S de cada etapa (tabela no log e 'instrumentation' no resumo)")
+    apply.add_argument('--trace', help="Grava o trace das etapas (formato Chrome) neste arquivo (implica --timings)")
+    apply.set_defaults(func=command_apply)
+
+    md5 = subparsers.add_parser('md5', help="Confere os md5sum.txt dos lotes de um diretório")
+    md5.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    md5.add_argument('--lots', nargs='+', help="Lotes a conferir (padrão: todas as pastas)")
+    md5.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                     help=f"Arquivos lidos em paralelo (padrão: {DEFAULT_WORKERS})")
+    md5.add_argument('--output', help="Grava o resultado JSON neste arquivo (padrão: saída padrão)")
+    md5.set_defaults(func=command_md5)
+
+    watch = subparsers.add_parser('watch', help="Monitora um diretório e processa os lotes que chegarem")
+    watch.add_argument('--root', required=True, help="Diretório monitorado")
+    watch.add_argument('--rules', required=True, help="Regras CSV/JSON com colunas " + ", ".join(RULE_FIELDS))
+    watch.add_argument('--lot-workers', type=int, default=1,
+                       help="Lotes processados ao mesmo tempo (padrão: 1)")
+    watch.add_argument('--file-workers', type=int, default=DEFAULT_WORKERS,
+                       help=f"Workers de arquivos por lote (padrão: {DEFAULT_WORKERS})")
+    watch.add_argument('--debounce', type=float, default=WATCH_DEBOUNCE_SECONDS,
+                       help=f"Segundos sem alterações antes de processar um lote (padrão: {WATCH_DEBOUNCE_SECONDS:g})")
+    watch.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL,
+                       help=f"Intervalo da varredura, em segundos (padrão: {WATCH_POLL_INTERVAL:g})")
+    watch.add_argument('--polling', action='store_true',
+                       help="Usa varredura periódica mesmo com inotify (compartilhamentos montados)")
+    watch.add_argument('--existing', action='store_true',
+                       help="Processa também os lotes que já estavam no diretório")
+    watch.add_argument('--zip-output', action='store_true',
+                       help="Lotes .zip geram um novo .zip renomeado (sem extrair no disco)")
+    watch.add_argument('--durability', choices=DURABILITY_LEVELS, default=TEXT_DURABILITY,
+                       help="fsync das regravações de texto: none, batch (uma vez por etapa) "
+                            f"ou full (a cada arquivo) (padrão: {TEXT_DURABILITY})")
+    watch.add_argument('--summary', help="Grava o resumo JSON ao encerrar (padrão: saída padrão)")
+    watch.set_defaults(func=command_watch)
+
+    undo = subparsers.add_parser('undo', help="Desfaz a última renomeação de um lote (pelo diário)")
+    undo.add_argument('--root', required=True, help="Diretório que contém os lotes")
+    undo.add_argument('--old', required=True, help="Nome original do lote")
+    undo.add_argument('--new', required=True, help="Novo nome usado na renomeação")
+    undo.set_defaults(func=command_undo)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    # Log no stderr: o stdout fica reservado para o resumo JSON
+    setup_logging(level=args.log_level, console_stream='stderr')
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -22,11 +22,104 @@ L00125_PATTERN = 'L00125'
 # Configurações de diretório
 AITS_DIRECTORY = 'AITs'
 
+# Escopo da busca de arquivos: False restringe ao diretório do lote renomeado,
+# True percorre todo o diretório raiz (todos os lotes)
+SCAN_WHOLE_ROOT = False
+
 # Configurações de texto
 TEXT_SEPARATOR = ';'
 YEAR_SUFFIX = '/2023'
 
+# Campos dos registros de infração (ex: 0008998;BRI1306/2023;20250905;14:49:38;
+# 2;000;000,0;00125000070a.jpg;00125000070b.jpg;001306;Av Getulio Vargas;5673)
+# O código de infração é sempre o último campo
+RECORD_FIELD_LOT = 0
+RECORD_FIELD_EQUIPMENT = 1      # BRI1306 ou BRI1306/2023 (com sufixo de ano)
+RECORD_FIELD_DATE = 2           # AAAAMMDD
+RECORD_FIELD_TIME = 3           # HH:MM:SS
+RECORD_FIELD_IMAGE = 7          # Primeira imagem do AIT
+RECORD_FIELD_LOCATION = 10
+RECORD_MIN_FIELDS = 4           # Linhas com menos campos são ignoradas
+
+# Configurações de paralelismo (arquivos em compartilhamentos de rede)
+DEFAULT_WORKERS = 8             # Workers do pool de processamento de arquivos
+MAX_IN_FLIGHT_PER_WORKER = 2    # Tarefas pendentes por worker (limita memória)
+TEXT_EXECUTOR = 'thread'        # 'thread' (padrão) ou 'process'
+
+# Arquivos de texto grandes: leitura linha a linha e novo conteúdo em memória
+# até este limite (caracteres); acima dele vai para um temporário no disco
+TEXT_READ_BUFFER_SIZE = 1024 * 1024
+TEXT_SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+
+# Durabilidade das regravações de texto (temporário + os.replace):
+# 'none'  - sem fsync (mais rápido; o conteúdo fica a cargo do sistema)
+# 'batch' - fsync dos arquivos e dos diretórios uma vez ao final de cada etapa
+# 'full'  - fsync de cada arquivo antes do os.replace e do diretório depois
+TEXT_DURABILITY = 'batch'
+
+# Lotes .zip: True grava cada membro direto no caminho final (já renomeado),
+# False extrai o arquivo inteiro e depois renomeia no disco
+ZIP_STREAM_INGEST = True
+ZIP_READ_BUFFER_SIZE = 1024 * 1024  # Buffer de leitura/cópia dos membros (bytes)
+
+# md5sum.txt do lote: após a renomeação as entradas passam para os novos nomes
+# (o MD5 de cada arquivo é recalculado em paralelo e comparado ao registrado)
+MD5_UPDATE_ENABLED = True
+MD5_READ_BUFFER_SIZE = 1024 * 1024  # Buffer de leitura do cálculo do MD5 (bytes)
+
 # Configurações de logging
+# INFO registra um resumo por etapa; DEBUG registra cada arquivo/linha processada
+LOG_LEVEL = 'INFO'              # Console
+LOG_FILE_LEVEL = 'INFO'         # Arquivo rotativo em logs/
+LOG_FILENAME = 'operalote.log'
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+LOG_CONSOLE_FORMAT = '%(message)s'
+
+# Cache da análise de infrações (fora do lote, na pasta cache/ do projeto)
+INFRACTION_CACHE_ENABLED = True
+CACHE_DIRECTORY_NAME = 'cache'
+INFRACTION_CACHE_VERSION = 2
+# Resolução do mtime no pior caso (FAT e alguns servidores SMB: 2 s). Arquivos
+# alterados há menos que isso no momento da leitura não entram no cache
+INFRACTION_CACHE_MTIME_RESOLUTION = 2.0
+
+# Diário de renomeação por lote (cache/journals/): retomada após interrupção
+# e comando 'undo'. Os textos são copiados antes de regravados para o undo
+RENAME_JOURNAL_ENABLED = True
+JOURNAL_DIRECTORY_NAME = 'journals'
+# Retenção: ao concluir ou desfazer uma execução, só os JOURNAL_RETENTION_COUNT
+# diários concluídos mais recentes, com até JOURNAL_RETENTION_DAYS dias, são
+# mantidos (com as cópias dos textos); o undo vale apenas para eles. Diários
+# de execuções interrompidas nunca são removidos
+JOURNAL_RETENTION_COUNT = 50
+JOURNAL_RETENTION_DAYS = 7
+
+# Plano de renomeação (operalote.py plan/apply): versão do formato JSON
+LOT_PLAN_VERSION = 1
+
+# Monitoramento do diretório de lotes (operalote.py watch): um lote só é
+# processado depois de WATCH_DEBOUNCE_SECONDS sem alterações nos arquivos.
+# Sem inotify (Windows, compartilhamentos montados), o diretório é varrido
+# a cada WATCH_POLL_INTERVAL segundos
+WATCH_DEBOUNCE_SECONDS = 30.0
+WATCH_POLL_INTERVAL = 5.0
+WATCH_USE_INOTIFY = True
+WATCH_IGNORED_SUFFIXES = ('.tmp', '.part', '.partial', '.filepart', '.crdownload')
+
+# Relatório de infrações de todos os lotes (operalote.py report)
+REPORT_CSV_DELIMITER = ';'      # Padrão do Excel em português
+REPORT_NO_YEAR = 'sem ano'      # Rótulo dos códigos sem sufixo de ano
+
+# Perfil de um lote (operalote.py rename --profile): cProfile mais amostragem
+# das pilhas de todas as threads a cada PROFILE_SAMPLE_INTERVAL segundos.
+# O cProfile só mede a thread que o ativou, por isso o perfil usa
+# PROFILE_FILE_WORKERS workers de arquivos se --file-workers não for informado
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_FILE_WORKERS = 1
+
 LOG_SUCCESS = "✅"
 LOG_ERROR = "❌"
 LOG_WARNING = "⚠️"
@@ -49,5 +142,13 @@ LOG_MESSAGES = {
     'subdirectory_success': "SUCESSO: {}",
     'subdirectory_error': "ERRO ao corrigir subdiretório {}: {}",
     'correction_completed': "✅ CORREÇÃO CONCLUÍDA: {} subdiretório(s) corrigido(s)",
-    'verification_ok': "✅ VERIFICAÇÃO OK: Nenhum subdiretório precisa de correção"
+    'verification_ok': "✅ VERIFICAÇÃO OK: Nenhum subdiretório precisa de correção",
+    'stage_summary': "Resumo - {}: {}",
+    'stage_summary_lot': "Resumo [{}] - {}: {}"
 }
+
+# Etapas com contadores de resumo (LoggingUtils.log_stage_summary)
+STAGE_FILE_RENAME = "Renomeação de arquivos"
+STAGE_TEXT_FILES = "Arquivos de texto"
+STAGE_INFRACTIONS = "Padronização de infrações"
+STAGE_CHECKSUM = "Atualização do md5sum"
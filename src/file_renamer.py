@@ -3,14 +3,21 @@ import glob
 import zipfile
 import rarfile
 import shutil
-import re
 from utils import (
     LotNumberUtils, 
     DirectoryUtils, 
     JpgFilenameProcessor, 
-    FileValidationUtils,
+    LotMatcher,
     LoggingUtils
 )
+from config import SCAN_WHOLE_ROOT, DEFAULT_WORKERS, STAGE_FILE_RENAME
+from rename_planner import JpgRenamePlanner, JpgRenameExecutor, RenameMap
+from text_stream import iter_text_lines, SpooledTextWriter, sync_written_files
+from rename_journal import OP_CREATE, OP_MERGE
+from instrumentation import traced, count, FILES_SCANNED, STAT_CALLS, RENAMES
+from log_manager import get_logger
+
+logger = get_logger('file_renamer')
 
 
 class FileRenamer:
@@ -18,6 +25,13 @@ class FileRenamer:
         self.directory = directory
         self.add_year = True  # Default: adicionar ano
         self.year = "2023"    # Default: ano 2023
+        self.scan_whole_root = SCAN_WHOLE_ROOT  # Default: apenas o lote renomeado
+        self.inventory = None  # LotInventory compartilhado entre as etapas
+        self.max_workers = DEFAULT_WORKERS  # Renomeações de JPG em paralelo
+        self.last_jpg_renames = {}  # Última renomeação de JPGs (origem -> destino)
+        self.last_renames = RenameMap()  # Todas as renomeações do último lote (md5sum.txt)
+        self.progress = None  # ProgressTracker opcional (execução em segundo plano)
+        self.journal = None  # RenameJournal opcional (retomada e undo)
     
     def _extract_numbers_from_name(self, name):
         """Delega para LotNumberUtils."""
@@ -27,6 +41,57 @@ class FileRenamer:
         """Delega para LotNumberUtils."""
         return LotNumberUtils.create_padded_number(number, padding)
     
+    def _uses_inventory(self, path):
+        """Verifica se o caminho pode ser consultado no inventário do lote."""
+        return self.inventory is not None and self.inventory.contains(path)
+    
+    def _exists(self, path):
+        """os.path.exists consultando o inventário quando disponível."""
+        if self._uses_inventory(path):
+            return self.inventory.exists(path)
+        count(STAT_CALLS)
+        return os.path.exists(path)
+    
+    def _isdir(self, path):
+        """os.path.isdir consultando o inventário quando disponível."""
+        if self._uses_inventory(path):
+            return self.inventory.isdir(path)
+        count(STAT_CALLS)
+        return os.path.isdir(path)
+    
+    def _listdir(self, path):
+        """os.listdir consultando o inventário quando disponível."""
+        if self._uses_inventory(path):
+            return self.inventory.listdir(path)
+        return os.listdir(path)
+    
+    def _track_directory_rename(self, old_path, new_path):
+        """Registra a renomeação de um diretório no inventário."""
+        if self.inventory is not None and self.inventory.contains(old_path):
+            self.inventory.rename_directory(old_path, new_path)
+    
+    def _track_rescan(self, path):
+        """Recarrega uma subárvore do inventário após alterações em bloco."""
+        if self._uses_inventory(path):
+            self.inventory.rescan(path)
+    
+    def _track_remove(self, path):
+        """Remove um caminho do inventário."""
+        if self._uses_inventory(path):
+            self.inventory.remove(path)
+    
+    def _rename_path(self, source, target, directory=True):
+        """os.rename registrado no diário (quando houver) e em last_renames."""
+        if self.journal is not None:
+            self.journal.rename(source, target)
+        else:
+            os.rename(source, target)
+        count(RENAMES)
+        if directory:
+            self.last_renames.add_directory(source, target)
+        else:
+            self.last_renames.add_file(source, target)
+    
     def _move_directory_content(self, source_path, target_path):
         """
         Move o conteúdo de um diretório para outro, substituindo arquivos existentes.
@@ -54,45 +119,57 @@ class FileRenamer:
             # Move o item
             if os.path.exists(source):
                 shutil.move(source, target)
+                count(RENAMES)
+        
+        if self.journal is not None:
+            # Destinos substituídos não podem ser restaurados pelo undo
+            self.journal.record(OP_MERGE, source_path, target_path)
+        self.last_renames.add_directory(source_path, target_path, merged=True)
+        self._track_rescan(source_path)
+        self._track_rescan(target_path)
     
-    def _get_search_directories(self):
-        """Delega para DirectoryUtils."""
-        return DirectoryUtils.get_search_directories(self.directory)
-    
-    def _should_rename_file(self, filename, old_name_number):
-        """Delega para FileValidationUtils."""
-        return FileValidationUtils.should_rename_file(filename, old_name_number)
-    
-    def _rename_jpg_file(self, filename, old_name_number, new_name_number):
+    def _get_search_directories(self, lot_directory=None):
         """
-        Renomeia um arquivo JPG aplicando as regras específicas para imagens.
+        Obtém os diretórios de busca de arquivos.
+        
+        Por padrão a busca fica restrita ao diretório do lote, de modo que o
+        custo de uma renomeação depende apenas do tamanho do lote. A varredura
+        de todo o diretório raiz só acontece com scan_whole_root habilitado.
         
         Args:
-            filename (str): Caminho completo do arquivo JPG
-            old_name_number (str): Número antigo do lote
-            new_name_number (str): Número novo do lote
+            lot_directory (str): Diretório do lote renomeado
             
         Returns:
-            bool: True se o arquivo foi renomeado com sucesso, False caso contrário
+            list: Lista de caminhos de diretórios
         """
-        try:
-            base_filename = os.path.basename(filename)
-            file_ext = os.path.splitext(base_filename)[1]
-            
-            if file_ext.lower() != '.jpg':
-                return False
-            
-            # Usa o processador de JPG para obter o novo nome
-            new_filename = JpgFilenameProcessor.update_jpg_filename(
-                base_filename, old_name_number, new_name_number
-            )
-            
-            # Realiza a renomeação
-            return self._perform_file_rename(filename, new_filename)
+        if self.scan_whole_root or lot_directory is None:
+            return DirectoryUtils.get_search_directories(self.directory)
+        if self._uses_inventory(lot_directory):
+            return self.inventory.get_directories()
+        return DirectoryUtils.get_search_directories(lot_directory)
+    
+    def _get_directory_files(self, search_dir, pattern='*'):
+        """
+        Lista os arquivos de um diretório de busca (sem subdiretórios).
+        
+        Args:
+            search_dir (str): Diretório de busca
+            pattern (str): Padrão glob ('*' ou '*.txt')
             
-        except Exception as e:
-            print(f"Erro ao renomear arquivo JPG {filename}: {e}")
-            return False
+        Returns:
+            list: Caminhos completos dos arquivos
+        """
+        if self._uses_inventory(search_dir):
+            extension = None if pattern == '*' else pattern[1:]
+            return self.inventory.get_files_in(search_dir, extension)
+        filenames = glob.glob(os.path.join(search_dir, pattern))
+        count(FILES_SCANNED, len(filenames))
+        count(STAT_CALLS, len(filenames))
+        return [filename for filename in filenames if not os.path.isdir(filename)]
+    
+    def get_lot_directory(self, old_name, new_name):
+        """Delega para DirectoryUtils."""
+        return DirectoryUtils.get_lot_directory(self.directory, old_name, new_name)
     
     def _perform_file_rename(self, old_filename, new_filename):
         """
@@ -110,27 +187,32 @@ class FileRenamer:
         
         # Verifica se o diretório de destino existe
         dest_dir = os.path.dirname(full_new_filename)
-        if not os.path.exists(dest_dir):
+        if not self._exists(dest_dir):
             os.makedirs(dest_dir, exist_ok=True)
         
-        if os.path.exists(old_filename) and old_filename != full_new_filename:
+        if self._exists(old_filename) and old_filename != full_new_filename:
             # Verifica se o arquivo de destino já existe
-            if os.path.exists(full_new_filename):
-                print(f"    ⚠️  Arquivo de destino já existe: {full_new_filename}")
-                print(f"    ℹ️  Arquivo de destino já existe, não fazendo nada")
+            if self._exists(full_new_filename):
+                LoggingUtils.count(STAGE_FILE_RENAME, 'destino_existente')
+                logger.debug(f"    ⚠️  Arquivo de destino já existe: {full_new_filename}")
+                logger.debug(f"    ℹ️  Arquivo de destino já existe, não fazendo nada")
                 return False
             
             try:
-                os.rename(old_filename, full_new_filename)
+                self._rename_path(old_filename, full_new_filename, directory=False)
+                if self._uses_inventory(old_filename):
+                    self.inventory.rename_file(old_filename, full_new_filename)
                 LoggingUtils.log_file_rename(old_filename, full_new_filename, True)
                 return True
             except Exception as e:
-                print(f"    ❌ Erro ao renomear {old_filename}: {e}")
+                LoggingUtils.count(STAGE_FILE_RENAME, 'falhas')
+                logger.error(f"    ❌ Erro ao renomear {old_filename}: {e}")
                 return False
         else:
-            print(f"    ℹ️  Não renomeando: old_filename={old_filename}, full_new_filename={full_new_filename}")
+            logger.debug(f"    ℹ️  Não renomeando: old_filename={old_filename}, full_new_filename={full_new_filename}")
             return False
     
+    @traced()
     def _fix_subdirectories(self, main_dir_path, new_name, old_name_number, new_name_number):
         """
         Corrige subdiretórios que precisam ser atualizados após renomeação.
@@ -144,47 +226,49 @@ class FileRenamer:
         Returns:
             bool: True se a correção foi bem-sucedida, False caso contrário
         """
-        if not os.path.exists(main_dir_path):
+        if not self._exists(main_dir_path):
             return False
             
-        print(f"Verificação OBRIGATÓRIA: corrigindo subdiretórios em {main_dir_path}...")
+        logger.info(f"Verificação OBRIGATÓRIA: corrigindo subdiretórios em {main_dir_path}...")
         
         # Lista todos os subdiretórios para verificar se precisam ser corrigidos
         subdirs_to_fix = []
-        for item in os.listdir(main_dir_path):
+        for item in self._listdir(main_dir_path):
             item_path = os.path.join(main_dir_path, item)
-            if os.path.isdir(item_path) and item.isdigit() and len(item) >= 6:
+            if self._isdir(item_path) and item.isdigit() and len(item) >= 6:
                 expected_number = self._create_padded_number(new_name_number)
                 if item != expected_number:
                     subdirs_to_fix.append((item, expected_number))
-                    print(f"DETECTADO: Subdiretório {item} precisa ser renomeado para {expected_number}")
+                    logger.info(f"DETECTADO: Subdiretório {item} precisa ser renomeado para {expected_number}")
         
         # Força a correção de TODOS os subdiretórios encontrados
         for old_subdir, new_subdir in subdirs_to_fix:
-            print(f"CORRIGINDO AGORA: {old_subdir} -> {new_subdir}")
+            logger.info(f"CORRIGINDO AGORA: {old_subdir} -> {new_subdir}")
             old_subdir_path = os.path.join(main_dir_path, old_subdir)
             new_subdir_path = os.path.join(main_dir_path, new_subdir)
             
             try:
-                if os.path.exists(new_subdir_path):
+                if self._exists(new_subdir_path):
                     # Se destino existe, move conteúdo
                     self._move_directory_content(old_subdir_path, new_subdir_path)
-                    if os.path.exists(old_subdir_path):
+                    if self._exists(old_subdir_path):
                         os.rmdir(old_subdir_path)
-                    print(f"SUCESSO: Conteúdo movido de {old_subdir} para {new_subdir}")
+                        self._track_remove(old_subdir_path)
+                    logger.info(f"SUCESSO: Conteúdo movido de {old_subdir} para {new_subdir}")
                 else:
                     # Renomeia diretamente
-                    if os.path.exists(old_subdir_path):
-                        os.rename(old_subdir_path, new_subdir_path)
-                    print(f"SUCESSO: Subdiretório renomeado {old_subdir} -> {new_subdir}")
+                    if self._exists(old_subdir_path):
+                        self._rename_path(old_subdir_path, new_subdir_path)
+                        self._track_directory_rename(old_subdir_path, new_subdir_path)
+                    logger.info(f"SUCESSO: Subdiretório renomeado {old_subdir} -> {new_subdir}")
             except Exception as e:
-                print(f"ERRO ao corrigir subdiretório {old_subdir}: {e}")
+                logger.error(f"ERRO ao corrigir subdiretório {old_subdir}: {e}")
                 return False
                 
         if subdirs_to_fix:
-            print(f"✅ CORREÇÃO CONCLUÍDA: {len(subdirs_to_fix)} subdiretório(s) corrigido(s)")
+            logger.info(f"✅ CORREÇÃO CONCLUÍDA: {len(subdirs_to_fix)} subdiretório(s) corrigido(s)")
         else:
-            print(f"✅ VERIFICAÇÃO OK: Nenhum subdiretório precisa de correção")
+            logger.info(f"✅ VERIFICAÇÃO OK: Nenhum subdiretório precisa de correção")
             
         return True
     
@@ -202,24 +286,31 @@ class FileRenamer:
             if os.path.exists(aits_direct_path):
                 # Caso: diretorio/AITs -> diretorio/novo_nome/AITs
                 new_subdir_path = os.path.join(directory_path, new_name_number)
+                # Subdiretório criado aqui é removido pelo undo (depois das renomeações)
+                create_operation = None
+                if self.journal is not None and not os.path.exists(new_subdir_path):
+                    create_operation = self.journal.plan(OP_CREATE, new_subdir_path)
                 os.makedirs(new_subdir_path, exist_ok=True)
+                if create_operation is not None:
+                    self.journal.done(create_operation)
                 
                 new_aits_path = os.path.join(new_subdir_path, 'AITs')
-                print(f"Movendo AITs: {aits_direct_path} -> {new_aits_path}")
+                logger.info(f"Movendo AITs: {aits_direct_path} -> {new_aits_path}")
                 # VERIFICAÇÃO ADICIONAL: Verifica se o diretório AITs ainda existe antes de mover
                 if os.path.exists(aits_direct_path):
-                    shutil.move(aits_direct_path, new_aits_path)
+                    self._rename_path(aits_direct_path, new_aits_path)
                 
                 # Move outros arquivos que possam estar no diretório principal
                 for item in os.listdir(directory_path):
                     item_path = os.path.join(directory_path, item)
                     if os.path.isfile(item_path) and item != new_name_number:
                         target_path = os.path.join(new_subdir_path, item)
-                        print(f"Movendo arquivo: {item_path} -> {target_path}")
+                        logger.info(f"Movendo arquivo: {item_path} -> {target_path}")
                         # VERIFICAÇÃO ADICIONAL: Verifica se o arquivo ainda existe antes de mover
                         if os.path.exists(item_path):
-                            shutil.move(item_path, target_path)
+                            self._rename_path(item_path, target_path, directory=False)
                 
+                self._track_rescan(directory_path)
                 return True
             
             # Caso: procura por subdiretórios que precisam ser renomeados
@@ -243,7 +334,7 @@ class FileRenamer:
                         
                     if should_rename:
                         new_item_path = os.path.join(directory_path, new_name_number)
-                        print(f"Renomeando diretório interno: {item_path} -> {new_item_path}")
+                        logger.info(f"Renomeando diretório interno: {item_path} -> {new_item_path}")
                         
                         # Se o destino já existe, move o conteúdo
                         if os.path.exists(new_item_path):
@@ -254,7 +345,7 @@ class FileRenamer:
                         else:
                             # VERIFICAÇÃO ADICIONAL: Verifica se o diretório ainda existe antes de renomear
                             if os.path.exists(item_path):
-                                os.rename(item_path, new_item_path)
+                                self._rename_path(item_path, new_item_path)
                         
                         subdir_renamed = True
                         break
@@ -262,15 +353,18 @@ class FileRenamer:
             # Após renomear o diretório principal, renomeia recursivamente 
             # todos os subdiretórios internos com o mesmo nome
             if subdir_renamed:
-                print(f"Aplicando renomeação recursiva de subdiretórios...")
+                logger.info(f"Aplicando renomeação recursiva de subdiretórios...")
                 self.rename_directories_recursively(directory_path, old_name, new_name)
+            
+            self._track_rescan(directory_path)
                         
             return True
                         
         except Exception as e:
-            print(f"Erro ao renomear diretórios internos: {e}")
+            logger.error(f"Erro ao renomear diretórios internos: {e}")
             return False
     
+    @traced()
     def update_internal_structure(self, directory_name, old_internal_name, new_internal_name):
         """
         Atualiza a estrutura interna de um diretório sem renomear o diretório principal.
@@ -284,11 +378,11 @@ class FileRenamer:
         try:
             main_dir_path = os.path.join(self.directory, directory_name)
             
-            if not os.path.exists(main_dir_path):
-                print(f"Diretório principal {directory_name} não encontrado")
+            if not self._exists(main_dir_path):
+                logger.warning(f"Diretório principal {directory_name} não encontrado")
                 return False
             
-            print(f"Atualizando estrutura interna de {directory_name}: {old_internal_name} -> {new_internal_name}")
+            logger.info(f"Atualizando estrutura interna de {directory_name}: {old_internal_name} -> {new_internal_name}")
             
             # Para atualizar a estrutura interna corretamente, precisamos:
             # 1. Procurar por subdiretórios com o nome antigo (formato com zeros à esquerda)
@@ -297,60 +391,64 @@ class FileRenamer:
             old_padded = self._create_padded_number(old_internal_name)
             new_padded = self._create_padded_number(new_internal_name)
             
-            print(f"Procurando subdiretório {old_padded} para renomear para {new_padded}")
+            logger.info(f"Procurando subdiretório {old_padded} para renomear para {new_padded}")
             
             # Procura pelo subdiretório antigo
             old_subdir_path = os.path.join(main_dir_path, old_padded)
             new_subdir_path = os.path.join(main_dir_path, new_padded)
             
-            if os.path.exists(old_subdir_path):
-                print(f"Encontrado subdiretório {old_padded}, renomeando para {new_padded}")
+            if self._exists(old_subdir_path):
+                logger.info(f"Encontrado subdiretório {old_padded}, renomeando para {new_padded}")
                 # Se o destino já existe, move o conteúdo
-                if os.path.exists(new_subdir_path):
-                    print(f"Destino {new_padded} já existe, movendo conteúdo")
+                if self._exists(new_subdir_path):
+                    logger.info(f"Destino {new_padded} já existe, movendo conteúdo")
                     self._move_directory_content(old_subdir_path, new_subdir_path)
                     # Remove o diretório de origem, se ainda existir
-                    if os.path.exists(old_subdir_path):
+                    if self._exists(old_subdir_path):
                         os.rmdir(old_subdir_path)
+                        self._track_remove(old_subdir_path)
                 else:
                     # Renomeia diretamente
-                    os.rename(old_subdir_path, new_subdir_path)
-                    print(f"Subdiretório renomeado com sucesso")
+                    self._rename_path(old_subdir_path, new_subdir_path)
+                    self._track_directory_rename(old_subdir_path, new_subdir_path)
+                    logger.info(f"Subdiretório renomeado com sucesso")
                 
                 # Aplica renomeação recursiva nos subdiretórios internos
                 # success = self.rename_directories_recursively(main_dir_path, old_padded, new_padded)
-                print(f"Estrutura interna atualizada com sucesso")
+                logger.info(f"Estrutura interna atualizada com sucesso")
                 return True
             else:
-                print(f"Subdiretório {old_padded} não encontrado")
+                logger.warning(f"Subdiretório {old_padded} não encontrado")
                 # Tenta encontrar qualquer subdiretório numérico que precise ser atualizado
-                for item in os.listdir(main_dir_path):
+                for item in self._listdir(main_dir_path):
                     item_path = os.path.join(main_dir_path, item)
-                    if os.path.isdir(item_path) and item.isdigit() and len(item) >= 6:
+                    if self._isdir(item_path) and item.isdigit() and len(item) >= 6:
                         # Verifica se este subdiretório precisa ser atualizado
                         expected_old = self._create_padded_number(old_internal_name)
                         if item == expected_old:
                             new_item_path = os.path.join(main_dir_path, new_padded)
-                            print(f"Encontrado subdiretório {item} que deve ser atualizado para {new_padded}")
+                            logger.info(f"Encontrado subdiretório {item} que deve ser atualizado para {new_padded}")
                             
                             # Se o destino já existe, move o conteúdo
-                            if os.path.exists(new_item_path):
-                                print(f"Destino {new_padded} já existe, movendo conteúdo")
+                            if self._exists(new_item_path):
+                                logger.info(f"Destino {new_padded} já existe, movendo conteúdo")
                                 self._move_directory_content(item_path, new_item_path)
                                 # Remove o diretório de origem, se ainda existir
-                                if os.path.exists(item_path):
+                                if self._exists(item_path):
                                     os.rmdir(item_path)
+                                    self._track_remove(item_path)
                             else:
                                 # Renomeia diretamente
-                                os.rename(item_path, new_item_path)
-                                print(f"Subdiretório renomeado com sucesso")
+                                self._rename_path(item_path, new_item_path)
+                                self._track_directory_rename(item_path, new_item_path)
+                                logger.info(f"Subdiretório renomeado com sucesso")
                             return True
                 
-                print(f"Nenhuma atualização necessária para a estrutura interna")
+                logger.info(f"Nenhuma atualização necessária para a estrutura interna")
                 return True
                 
         except Exception as e:
-            print(f"Erro ao atualizar estrutura interna: {e}")
+            logger.error(f"Erro ao atualizar estrutura interna: {e}")
             return False
     
     def rename_subdirectory_and_files(self, parent_directory, old_subdir_name, new_subdir_name):
@@ -382,7 +480,7 @@ class FileRenamer:
             return False
             
         except Exception as e:
-            print(f"Erro ao renomear subdiretório e arquivos: {e}")
+            logger.error(f"Erro ao renomear subdiretório e arquivos: {e}")
             return False
     
     def rename_directories_recursively(self, directory_path, old_name, new_name):
@@ -399,7 +497,7 @@ class FileRenamer:
             old_name_number = self._extract_numbers_from_name(old_name)
             new_name_number = self._extract_numbers_from_name(new_name)
             
-            print(f"Renomeando diretórios recursivamente: {old_name_number} -> {new_name_number}")
+            logger.info(f"Renomeando diretórios recursivamente: {old_name_number} -> {new_name_number}")
             
             # Lista todos os itens no diretório atual
             if not os.path.exists(directory_path):
@@ -416,7 +514,7 @@ class FileRenamer:
                 # Verifica se este diretório tem o nome que deve ser alterado
                 if item_name == old_name_number:
                     new_item_path = os.path.join(directory_path, new_name_number)
-                    print(f"Renomeando diretório: {item_path} -> {new_item_path}")
+                    logger.info(f"Renomeando diretório: {item_path} -> {new_item_path}")
                     
                     # Se o destino já existe, move o conteúdo
                     if os.path.exists(new_item_path):
@@ -428,7 +526,8 @@ class FileRenamer:
                         self.rename_directories_recursively(new_item_path, old_name, new_name)
                     else:
                         # Renomeia o diretório
-                        os.rename(item_path, new_item_path)
+                        self._rename_path(item_path, new_item_path)
+                        self._track_directory_rename(item_path, new_item_path)
                         # Processa recursivamente o diretório renomeado
                         self.rename_directories_recursively(new_item_path, old_name, new_name)
                 else:
@@ -439,49 +538,56 @@ class FileRenamer:
             return True
             
         except Exception as e:
-            print(f"Erro ao renomear diretórios recursivamente: {e}")
+            logger.error(f"Erro ao renomear diretórios recursivamente: {e}")
             return False
 
+    @traced()
     def rename_directory(self, old_name, new_name):
+        self.last_renames = RenameMap()
         old_dir_path = os.path.join(self.directory, old_name)
         new_dir_path = os.path.join(self.directory, new_name)
         home_dir = self.directory
         
         # Caso especial: mesmo nome de diretório, mas precisa atualizar estrutura interna
         if old_name == new_name:
-            print(f"Mesmo nome de diretório ({old_name}). Verificando se precisa atualizar estrutura interna...")
+            logger.info(f"Mesmo nome de diretório ({old_name}). Verificando se precisa atualizar estrutura interna...")
             
             # Extrai números para verificar se são diferentes
             old_name_number = self._extract_numbers_from_name(old_name)
             new_name_number = self._extract_numbers_from_name(new_name)
             
             # Procura por subdiretórios que possam precisar ser atualizados
-            if os.path.exists(old_dir_path):
-                for item in os.listdir(old_dir_path):
+            if self._exists(old_dir_path):
+                for item in self._listdir(old_dir_path):
                     item_path = os.path.join(old_dir_path, item)
-                    if os.path.isdir(item_path) and item.isdigit() and len(item) >= 6:
+                    if self._isdir(item_path) and item.isdigit() and len(item) >= 6:
                         # Encontrou subdiretório numérico que pode precisar ser atualizado
                         # Ex: encontrou "0000125" quando new_name é "L08786"
                         expected_number = self._create_padded_number(new_name_number)  # Ex: "0008786"
                         if item != expected_number:
-                            print(f"Encontrado subdiretório {item} que deve ser atualizado para {expected_number}")
+                            logger.info(f"Encontrado subdiretório {item} que deve ser atualizado para {expected_number}")
                             return self.update_internal_structure(old_name, item, expected_number)
                 
-                print(f"Nenhuma atualização de estrutura interna necessária para {old_name}")
+                logger.info(f"Nenhuma atualização de estrutura interna necessária para {old_name}")
                 return True
             else:
-                print(f"Diretório {old_name} não encontrado")
+                logger.warning(f"Diretório {old_name} não encontrado")
                 return False
         
         # Fluxo normal: nomes diferentes
         if os.path.exists(new_dir_path):
-            print("Erro: O diretório já existe.")
+            logger.error("Erro: O diretório já existe.")
             return False
 
         if not new_dir_path:
-            print("Erro: O novo nome do diretório não pode estar vazio.")
+            logger.error("Erro: O novo nome do diretório não pode estar vazio.")
             return False
 
+        # Lotes compactados: o diretório extraído é registrado como criado
+        create_operation = None
+        if self.journal is not None and old_dir_path.endswith(('.zip', '.rar')):
+            create_operation = self.journal.plan(OP_CREATE, new_dir_path)
+
         try:
             if old_dir_path.endswith('.zip'):
                 with zipfile.ZipFile(old_dir_path, 'r') as zip_ref:
@@ -490,22 +596,23 @@ class FileRenamer:
                     
                     if os.path.exists(extracted_dir):
                         if len((old_dir_path.split('/')[-1])) == len(old_name):
-                            os.rename(extracted_dir, new_name)
+                            self._rename_path(extracted_dir, os.path.abspath(new_name))
                         else:
-                            os.rename(extracted_dir, new_dir_path)
+                            self._rename_path(extracted_dir, new_dir_path)
             elif old_dir_path.endswith('.rar'):
                 with rarfile.RarFile(old_dir_path, 'r') as rar_ref:
                     rar_ref.extractall(new_dir_path)
                     extracted_dir = os.path.splitext(old_dir_path)[0]
                     if os.path.exists(extracted_dir):
                         if old_dir_path.split('/')[-1] == old_name:
-                            os.rename(extracted_dir, new_name)
+                            self._rename_path(extracted_dir, os.path.abspath(new_name))
                         else:
-                            os.rename(extracted_dir, new_dir_path)
+                            self._rename_path(extracted_dir, new_dir_path)
             else:
-                if os.path.exists(old_dir_path):
+                if self._exists(old_dir_path):
                     # Renomeia o diretório principal
-                    os.rename(old_dir_path, new_dir_path)
+                    self._rename_path(old_dir_path, new_dir_path)
+                    self._track_directory_rename(old_dir_path, new_dir_path)
                     
                     # Após renomear o diretório principal, atualiza a estrutura interna
                     # Extrai números para atualizar subdiretórios
@@ -513,17 +620,20 @@ class FileRenamer:
                     new_name_number = self._extract_numbers_from_name(new_name)
                     
                     # Aplica atualização de estrutura interna nos subdiretórios
-                    print(f"Atualizando estrutura interna de {new_name}: {old_name_number} -> {new_name_number}")
+                    logger.info(f"Atualizando estrutura interna de {new_name}: {old_name_number} -> {new_name_number}")
                     self.update_internal_structure(new_name, old_name_number, new_name_number)
                     
-                    print(f"Renomeação de diretórios concluída. Estrutura pronta para processamento de arquivos.")
+                    logger.info(f"Renomeação de diretórios concluída. Estrutura pronta para processamento de arquivos.")
                         
         except Exception as e:
-            print(f"Erro ao renomear o diretório: {e}")
+            logger.error(f"Erro ao renomear o diretório: {e}")
             return False
 
+        if create_operation is not None:
+            self.journal.done(create_operation)
         return True
 
+    @traced()
     def rename_files(self, old_name, new_name):
         old_name_number = self._extract_numbers_from_name(old_name)
         new_name_number = self._extract_numbers_from_name(new_name)
@@ -538,94 +648,58 @@ class FileRenamer:
         # Só impede a renomeação se os nomes E os números forem iguais
         # MAS permite renomeação para arquivos JPG que precisam de padronização de dígitos
         if old_name == new_name and not numbers_are_different:
-            print(f"Mesmo nome de lote ({old_name}) e mesmo número ({old_name_number}). Verificando necessidade de padronização de arquivos.")
+            logger.info(f"Mesmo nome de lote ({old_name}) e mesmo número ({old_name_number}). Verificando necessidade de padronização de arquivos.")
             # Continua o processamento para verificar se há arquivos JPG que precisam ser padronizados
             
         # Se old_name == new_name mas os números são diferentes, continua o processamento para padronizar os números
         if old_name == new_name and numbers_are_different:
-            print(f"Mesmo nome de lote ({old_name}) mas números diferentes ({old_name_number} -> {new_name_number}). Processando padronização de arquivos.")
+            logger.info(f"Mesmo nome de lote ({old_name}) mas números diferentes ({old_name_number} -> {new_name_number}). Processando padronização de arquivos.")
         elif old_name != new_name:
-            print(f"Nomes diferentes ({old_name} -> {new_name}). Processando renomeação completa.")
+            logger.info(f"Nomes diferentes ({old_name} -> {new_name}). Processando renomeação completa.")
         
-        print(f"=== INICIANDO rename_files({old_name} -> {new_name}) ===")
+        logger.info(f"=== INICIANDO rename_files({old_name} -> {new_name}) ===")
         
         # CRÍTICO: SEMPRE verifica e corrige subdiretórios ANTES de processar arquivos
         # Isso resolve definitivamente o problema onde arquivos são processados em caminhos antigos
-        main_dir_path = os.path.join(self.directory, new_name if os.path.exists(os.path.join(self.directory, new_name)) else old_name)
+        main_dir_path = self.get_lot_directory(old_name, new_name)
         self._fix_subdirectories(main_dir_path, new_name, old_name_number, new_name_number)
         
         # SEMPRE reconstrói a lista de diretórios após qualquer correção
-        # Define os diretórios onde procurar arquivos
-        search_directories = self._get_search_directories()
+        # Define os diretórios onde procurar arquivos (apenas o lote, salvo opt-in)
+        search_directories = self._get_search_directories(main_dir_path)
+        
+        logger.info(f"Diretórios de busca para arquivos: {search_directories}")
+        
+        # JPGs são apenas coletados aqui e renomeados depois, em bloco,
+        # pelo planejador (colisões resolvidas em memória, execução paralela)
+        jpg_candidates = []
+        listed_files = []
         
-        print(f"Diretórios de busca para arquivos: {search_directories}")
+        # Variantes do número antigo preparadas uma única vez para todos os arquivos
+        matcher = LotMatcher(old_name, new_name)
         
         # Processa arquivos em todos os diretórios relevantes
         for search_dir in search_directories:
-            if not os.path.exists(search_dir):
+            if not self._exists(search_dir):
                 continue
                 
-            for filename in glob.glob(os.path.join(search_dir, '*')):
-                base_filename = os.path.basename(filename)
-                
-                # Pula diretórios
-                if os.path.isdir(filename):
+            directory_files = self._get_directory_files(search_dir)
+            listed_files.extend(directory_files)
+            for filename in directory_files:
+                # Retomada: arquivo já renomeado nesta execução (segundo o diário)
+                if self.journal is not None and self.journal.is_done_target(filename):
                     continue
                 
-                # Verifica se o arquivo deve ser renomeado
-                if self._should_rename_file(filename, old_name_number):
-                    # Calcula o novo nome do arquivo
-                    file_ext = os.path.splitext(base_filename)[1]
-                    file_name_without_ext = os.path.splitext(base_filename)[0]
-                    
-                    # Lógica de renomeação mais robusta
-                    new_file_name_without_ext = file_name_without_ext
-                    
-                    print(f"  Iniciando renomeação de: {file_name_without_ext}")
-                    
-                    # Casos especiais para arquivos com padrão "L00125"
-                    if file_name_without_ext.startswith('L00') and len(file_name_without_ext) >= 6:
-                        # Substitui L00125 por L + novo_numero
-                        new_file_name_without_ext = f"L{new_name_number}"
-                        print(f"    Aplicado caso especial L00xxx: {new_file_name_without_ext}")
-                    # Caso especial específico: L00125.txt sempre vira L + número do lote
-                    elif file_name_without_ext == 'L00125' and file_ext == '.txt':
-                        new_file_name_without_ext = f"L{new_name_number}"
-                        print(f"    Aplicado caso especial L00125.txt: {new_file_name_without_ext}")
-                    # Caso especial: arquivo sem L que deveria ter L
-                    elif (file_ext == '.txt' and new_name.startswith('L') and 
-                          not file_name_without_ext.startswith('L') and
-                          file_name_without_ext == new_name[1:]):
-                        new_file_name_without_ext = new_name
-                        print(f"    Aplicado caso especial .txt sem L: {new_file_name_without_ext}")
-                    # Caso especial para arquivos JPG - garante 7 dígitos
-                    elif file_ext.lower() == '.jpg':
-                        # Para arquivos JPG, delega para a função especializada
-                        self._rename_jpg_file(filename, old_name_number, new_name_number)
-                        continue  # Já foi processado, pula para o próximo arquivo
-                    # Caso padrão
-                    elif old_name_number in file_name_without_ext:
-                        # Sempre garante que o novo número tenha exatamente 7 dígitos
-                        new_number_padded = self._create_padded_number(new_name_number)
-                        new_file_name_without_ext = file_name_without_ext.replace(old_name_number, new_number_padded)
-                        print(f"    Aplicado caso padrão com 7 dígitos: {new_file_name_without_ext}")
-                    # Tenta substituir versão sem zeros à esquerda
-                    else:
-                        old_trimmed = old_name_number.lstrip('0')
-                        if old_trimmed in file_name_without_ext:
-                            new_trimmed = new_name_number.lstrip('0')
-                            new_file_name_without_ext = file_name_without_ext.replace(old_trimmed, new_trimmed)
-                            print(f"    Substituído versão sem zeros: {new_file_name_without_ext}")
-                    
-                    # Verificação especial para arquivos .txt sem prefixo L (fallback)
-                    if (file_ext == '.txt' and new_name.startswith('L') and 
-                        not new_file_name_without_ext.startswith('L') and 
-                        file_name_without_ext == new_file_name_without_ext):
-                        new_file_name_without_ext = new_name  # Usa o nome completo com L
-                        print(f"    Aplicado fallback para .txt: {new_file_name_without_ext}")
+                # Verifica se o arquivo deve ser renomeado e calcula o novo nome
+                new_filename = matcher.match(filename)
+                if new_filename is not None:
+                    if matcher.is_jpg(filename):
+                        # Para arquivos JPG, delega para o planejador de renomeação
+                        jpg_candidates.append(filename)
+                        continue  # Será processado em bloco, pula para o próximo arquivo
                     
                     # Realiza a renomeação do arquivo
-                    self._perform_file_rename(filename, new_file_name_without_ext + file_ext)
+                    self._perform_file_rename(filename, new_filename)
                 
                 # Processa arquivos compactados
                 if filename.endswith('.zip'):
@@ -636,7 +710,7 @@ class FileRenamer:
                             # Verifica se o diretório de destino já existe
                             target_dir = extracted_dir.replace(old_name, new_name)
                             if os.path.exists(target_dir):
-                                print(f"Destino {target_dir} já existe. Movendo conteúdo...")
+                                logger.info(f"Destino {target_dir} já existe. Movendo conteúdo...")
                                 # Move o conteúdo do diretório extraído para o diretório existente
                                 self._move_directory_content(extracted_dir, target_dir)
                                 # Remove o diretório extraído vazio, se ainda existir
@@ -644,82 +718,137 @@ class FileRenamer:
                                     os.rmdir(extracted_dir)
                             else:
                                 # Se o destino não existe, renomeia normalmente
-                                os.rename(extracted_dir, target_dir)
+                                self._rename_path(extracted_dir, target_dir)
+                    if self.journal is not None:
+                        self.journal.record(OP_MERGE, filename, search_dir)
+                    self._track_rescan(search_dir)
                 elif filename.endswith('.rar'):
                     with rarfile.RarFile(filename, 'r') as rar_ref:
                         rar_ref.extractall(search_dir)
                         extracted_dir = os.path.splitext(filename)[0]
                         if os.path.exists(extracted_dir):
                             if extracted_dir == old_name:
-                                os.rename(extracted_dir, new_name)
+                                self._rename_path(extracted_dir, os.path.abspath(new_name))
                             else:
-                                os.rename(extracted_dir, extracted_dir.replace(old_name, new_name))
+                                self._rename_path(extracted_dir, extracted_dir.replace(old_name, new_name))
+                    if self.journal is not None:
+                        self.journal.record(OP_MERGE, filename, search_dir)
+                    self._track_rescan(search_dir)
+        
+        self.last_jpg_renames = self._rename_jpg_files(
+            jpg_candidates, listed_files, old_name_number, new_name_number
+        )
+        self.last_renames.add_files(self.last_jpg_renames)
+        LoggingUtils.log_stage_summary(STAGE_FILE_RENAME)
+    
+    @traced()
+    def _rename_jpg_files(self, jpg_candidates, existing_files, old_name_number, new_name_number):
+        """
+        Renomeia um conjunto de arquivos JPG: calcula todos os destinos,
+        resolve colisões e ciclos em memória e executa os os.rename em
+        paralelo, sem verificar a existência de cada arquivo no disco.
+        
+        Args:
+            jpg_candidates (list): Caminhos dos JPGs a renomear
+            existing_files (list): Arquivos existentes nos diretórios de busca
+            old_name_number (str): Número antigo do lote
+            new_name_number (str): Número novo do lote
+            
+        Returns:
+            dict: Renomeações concluídas (caminho antigo -> caminho novo)
+        """
+        if not jpg_candidates:
+            return {}
+        
+        plan = JpgRenamePlanner.plan(jpg_candidates, old_name_number, new_name_number, existing_files)
+        logger.info(f"Plano de renomeação de JPGs: {len(plan)} arquivo(s) em {len(plan.stages)} etapa(s), "
+              f"{len(plan.skipped)} ignorado(s)")
+        if self.progress is not None:
+            self.progress.set_stage("Renomeando imagens", len(plan))
+        executor = JpgRenameExecutor(self.max_workers, self.inventory, self.progress, self.journal)
+        return executor.execute(plan)
 
+    @traced()
     def rename_text_content(self, old_name, new_name):
         old_name_number = self._extract_numbers_from_name(old_name)
         new_name_number = self._extract_numbers_from_name(new_name)
 
         # Define os diretórios onde procurar arquivos de texto usando a mesma lógica melhorada
-        search_directories = self._get_search_directories()
+        lot_directory = self.get_lot_directory(old_name, new_name)
+        search_directories = self._get_search_directories(lot_directory)
         
         # Processa arquivos .txt em todos os diretórios relevantes
+        written = []
         for search_dir in search_directories:
-            if not os.path.exists(search_dir):
+            if not self._exists(search_dir):
                 continue
                 
-            for filename in glob.glob(os.path.join(search_dir, '*.txt')):
+            for filename in self._get_directory_files(search_dir, '*.txt'):
                 if os.path.basename(filename).lower() == 'md5sum.txt':
                     continue
                     
-                # Lê o conteúdo do arquivo
-                with open(filename, 'r', encoding='utf-8') as file:
-                    filedata = file.readlines()
+                # Lê o arquivo linha a linha; o novo conteúdo substitui o original ao final
+                with SpooledTextWriter(filename) as writer:
+                    for line in iter_text_lines(filename):
+                        writer.write(self._rename_text_line(line, old_name_number, new_name_number))
 
-                # Processa cada linha
-                new_filedata = []
-                for line in filedata:
-                    line_split = line.strip().split(';')
-                    
-                    # Verifica se a linha contém o número antigo
-                    line_contains_old_number = old_name_number in line
+                    # Salva o arquivo atualizado
+                    writer.commit()
+                written.append(filename)
+                
+                if self._uses_inventory(filename):
+                    self.inventory.update_file(filename)
                     
-                    if line_contains_old_number and len(line_split) > 0:
-                        # Atualiza o primeiro campo (número do lote)
-                        line_split[0] = self._create_padded_number(new_name_number)
-                        
-                        # Verifica se deve adicionar ano e se já não tem ano
-                        if (self.add_year and self.year and 
-                            len(line_split) > 1 and 
-                            not line_split[1].endswith(f'/{self.year}')):
-                            line_split[1] = line_split[1] + f'/{self.year}'
-                        
-                        # Processa todos os campos da linha para atualizar nomes de arquivos
-                        for i in range(1, len(line_split)):
-                            if line_split[i]:
-                                # Verifica se o campo contém um nome de arquivo JPG
-                                if line_split[i].endswith('.jpg'):
-                                    # Atualiza nomes de arquivos JPG na linha
-                                    line_split[i] = self._update_jpg_filename_in_text(
-                                        line_split[i], old_name_number, new_name_number)
-                                else:
-                                    # Para outros campos, aplica a substituição simples
-                                    # mas apenas se o campo contém o número antigo
-                                    if old_name_number in line_split[i]:
-                                        line_split[i] = line_split[i].replace(
-                                            old_name_number, self._create_padded_number(new_name_number))
+                LoggingUtils.log_text_file_update(filename)
+        sync_written_files(written)
+    
+    def _rename_text_line(self, line, old_name_number, new_name_number):
+        """
+        Atualiza uma linha de texto para o novo número do lote.
+        
+        Args:
+            line (str): Linha original
+            old_name_number (str): Número antigo do lote
+            new_name_number (str): Número novo do lote
+            
+        Returns:
+            str: Linha atualizada (com quebra de linha)
+        """
+        line_split = line.strip().split(';')
+        
+        # Verifica se a linha contém o número antigo
+        line_contains_old_number = old_name_number in line
+        
+        if line_contains_old_number and len(line_split) > 0:
+            # Atualiza o primeiro campo (número do lote)
+            line_split[0] = self._create_padded_number(new_name_number)
+            
+            # Verifica se deve adicionar ano e se já não tem ano
+            if (self.add_year and self.year and 
+                len(line_split) > 1 and 
+                not line_split[1].endswith(f'/{self.year}')):
+                line_split[1] = line_split[1] + f'/{self.year}'
+            
+            # Processa todos os campos da linha para atualizar nomes de arquivos
+            for i in range(1, len(line_split)):
+                if line_split[i]:
+                    # Verifica se o campo contém um nome de arquivo JPG
+                    if line_split[i].endswith('.jpg'):
+                        # Atualiza nomes de arquivos JPG na linha
+                        line_split[i] = self._update_jpg_filename_in_text(
+                            line_split[i], old_name_number, new_name_number)
                     else:
-                        # Para linhas que não contém o número antigo, apenas atualiza o primeiro campo
-                        if len(line_split) > 0:
-                            line_split[0] = self._create_padded_number(new_name_number)
+                        # Para outros campos, aplica a substituição simples
+                        # mas apenas se o campo contém o número antigo
+                        if old_name_number in line_split[i]:
+                            line_split[i] = line_split[i].replace(
+                                old_name_number, self._create_padded_number(new_name_number))
+        else:
+            # Para linhas que não contém o número antigo, apenas atualiza o primeiro campo
+            if len(line_split) > 0:
+                line_split[0] = self._create_padded_number(new_name_number)
 
-                    new_line = ';'.join(line_split) + '\n'
-                    new_filedata.append(new_line)
-                
-                # Salva o arquivo atualizado
-                with open(filename, 'w', encoding='utf-8') as file:
-                    file.writelines(new_filedata)
-                    
-                print(f"Arquivo de texto atualizado: {filename}")
+        return ';'.join(line_split) + '\n'
     
     def _update_jpg_filename_in_text(self, filename, old_name_number, new_name_number):
         """Delega para JpgFilenameProcessor."""
@@ -738,4 +867,54 @@ class FileRenamer:
             year (str): Ano a ser adicionado (ex: "2023")
         """
         self.add_year = add_year
-        self.year = year if add_year else None
\ No newline at end of file
+        self.year = year if add_year else None
+    
+    def set_search_scope(self, scan_whole_root):
+        """
+        Configura o escopo da busca de arquivos.
+        
+        Args:
+            scan_whole_root (bool): Se True, percorre todo o diretório raiz
+                (todos os lotes); se False, apenas o diretório do lote renomeado
+        """
+        self.scan_whole_root = scan_whole_root
+    
+    def set_progress(self, progress):
+        """
+        Define o ProgressTracker que recebe o progresso por arquivo e
+        transmite pedidos de cancelamento.
+        
+        Args:
+            progress (ProgressTracker): Progresso, ou None
+        """
+        self.progress = progress
+    
+    def set_parallelism(self, max_workers):
+        """
+        Configura o número de renomeações de JPG executadas em paralelo.
+        
+        Args:
+            max_workers (int): Número de workers (1 desativa o paralelismo)
+        """
+        self.max_workers = max(1, int(max_workers))
+    
+    def set_journal(self, journal):
+        """
+        Define o diário de renomeação (RenameJournal) da execução atual.
+        Com o diário, cada os.rename é registrado antes e confirmado depois,
+        e arquivos já renomeados são ignorados em uma retomada.
+        
+        Args:
+            journal (RenameJournal): Diário do lote (None desativa)
+        """
+        self.journal = journal
+    
+    def set_inventory(self, inventory):
+        """
+        Define o inventário do lote usado por todas as etapas de renomeação.
+        
+        Args:
+            inventory (LotInventory): Inventário do lote, ou None para
+                consultar o disco diretamente
+        """
+        self.inventory = inventory
\ No newline at end of file
@@ -1,18 +1,23 @@
 import customtkinter as tk
 
 from tkinter import filedialog, messagebox
-from file_renamer import FileRenamer
-from PIL import Image, ImageTk
+from PIL import Image  # Já carregado pelo customtkinter (CTkImage); não pesa na inicialização
 import os
 import sys
-from text_file_editor import TextFileEditor
+import threading
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'assets'))
 from CTkScrollableDropdown import *
-from infraction_analyzer import InfractionAnalyzer
+from progress import ProgressTracker, OperationCancelled
+from log_manager import get_logger
+
+logger = get_logger('gui')
+
+# Intervalo de atualização da barra de progresso (ms)
+PROGRESS_POLL_MS = 100
 
 
 class Application(tk.CTkFrame):
-    def __init__(self, master=None):
+    def __init__(self, master=None, startup=None):
         super().__init__(master)
         self.master = master
         self.master.geometry("850x800")  # Aumentado para acomodar novos campos
@@ -34,15 +39,22 @@ class Application(tk.CTkFrame):
             
             if icon_path:
                 self.master.iconbitmap(icon_path)
-                print(f"Ícone carregado: {icon_path}")
+                logger.info(f"Ícone carregado: {icon_path}")
             else:
-                print("Ícone não encontrado em nenhum dos caminhos testados")
+                logger.warning("Ícone não encontrado em nenhum dos caminhos testados")
         except Exception as e:
-            print(f"Erro ao carregar ícone: {e}")  
+            logger.error(f"Erro ao carregar ícone: {e}")  
         self.pack(padx=12,pady=12)
         self.file_list = []
         self.infraction_analyzer = None
+        self.progress = None       # ProgressTracker da execução em andamento
+        self.worker_thread = None  # Thread de processamento em segundo plano
+        self.startup = startup     # StartupTimer da inicialização (opcional)
         self.create_widgets()
+        if self.startup is not None:
+            self.startup.mark("widgets")
+        # As imagens são decodificadas depois que a janela aparece
+        self.after_idle(self.load_images)
 
     def show_message(self, message):
         messagebox.showinfo("Renomear Lote BRC", message)
@@ -55,7 +67,7 @@ class Application(tk.CTkFrame):
         else:
             tk.set_appearance_mode('System')
             
-        print("Tema Claro: ", self.switch_var.get())
+        logger.info("Tema Claro: %s", self.switch_var.get())
     
     def toggle_year_entry(self):
         """Habilita/desabilita o campo de entrada do ano baseado no checkbox"""
@@ -126,29 +138,25 @@ class Application(tk.CTkFrame):
     
         self.directory_button = tk.CTkButton(self, width=150, text="Executar", command= self.rename)
         self.directory_button.pack(padx=12,pady=10)
+        self.execute_button = self.directory_button
+        
+        # Progresso da execução em segundo plano (exibido apenas durante a execução)
+        self.progress_frame = tk.CTkFrame(self, fg_color="transparent")
+        self.progress_bar = tk.CTkProgressBar(self.progress_frame, width=350)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side="left", padx=10, pady=5)
+        self.cancel_button = tk.CTkButton(self.progress_frame, width=90, text="Cancelar",
+                                          command=self.cancel_running_task,
+                                          fg_color="red", hover_color="darkred")
+        self.cancel_button.pack(side="left", padx=10, pady=5)
+        self.progress_label = tk.CTkLabel(self, text="", font=("Arial", 12))
               
         self.space_label = tk.CTkLabel(self, text="", height=1)
         self.space_label.pack()
 
-        # Configura o caminho das imagens
-        possible_image_paths = [
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "logo"),
-            os.path.join(os.getcwd(), "assets", "logo"),
-            "assets/logo"
-        ]
-        
-        image_path = None
-        for path in possible_image_paths:
-            if os.path.exists(path):
-                image_path = path
-                break
-        
-        if image_path:
-            self.logo_image = tk.CTkImage(Image.open(os.path.join(image_path, "brc_b3.png")), size=(200, 100))
-        else:
-            print("Pasta de imagens não encontrada")
-            self.logo_image = None
-        self.logo_label = tk.CTkLabel(self, text=None, image=self.logo_image)
+        # Espaço reservado para o logo (imagem carregada em load_images)
+        self.logo_image = None
+        self.logo_label = tk.CTkLabel(self, text="", width=200, height=100)
         self.logo_label.pack()
 
 
@@ -156,9 +164,7 @@ class Application(tk.CTkFrame):
         self.space_label.pack()
 
 
-        self.help_icon = tk.CTkImage(light_image=Image.open(os.path.join(image_path, "chat_dark.png")),
-                                                 dark_image=Image.open(os.path.join(image_path, "chat_light.png")), size=(25, 25))
-
+        self.help_icon = None
         self.help_button = tk.CTkButton(self, image=self.help_icon, command=self.show_help_message,corner_radius=0, height=40, border_spacing=10, text="Ajuda",
                                                    fg_color="transparent", text_color=("gray10", "gray90"), hover_color=("gray70", "gray30"))
         self.help_button.pack(padx=10)
@@ -173,11 +179,51 @@ class Application(tk.CTkFrame):
         self.copyright_label = tk.CTkLabel(self, text="Versão 4.3 - © Brascontrol", font=("Arial", 12))
         self.copyright_label.pack()
 
+    def load_images(self):
+        """Carrega o logo e o ícone de ajuda (chamado após a primeira pintura da janela)"""
+        # Processa os eventos pendentes: a janela é desenhada antes da decodificação
+        self.update()
+        if self.startup is not None:
+            self.startup.mark("primeira pintura")
+
+        # Configura o caminho das imagens
+        possible_image_paths = [
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "assets", "logo"),
+            os.path.join(os.getcwd(), "assets", "logo"),
+            "assets/logo"
+        ]
+        
+        image_path = None
+        for path in possible_image_paths:
+            if os.path.exists(path):
+                image_path = path
+                break
+        
+        if image_path:
+            try:
+                self.logo_image = tk.CTkImage(Image.open(os.path.join(image_path, "brc_b3.png")), size=(200, 100))
+                self.logo_label.configure(image=self.logo_image)
+                self.help_icon = tk.CTkImage(light_image=Image.open(os.path.join(image_path, "chat_dark.png")),
+                                             dark_image=Image.open(os.path.join(image_path, "chat_light.png")), size=(25, 25))
+                self.help_button.configure(image=self.help_icon)
+            except Exception as e:
+                logger.error(f"Erro ao carregar imagens: {e}")
+        else:
+            logger.warning("Pasta de imagens não encontrada")
+
+        if self.startup is not None:
+            self.startup.mark("imagens")
+            logger.info(self.startup.format_summary())
+
     def select_directory(self):
         directory = filedialog.askdirectory()
         if directory:
             self.directory_entry.delete(0, tk.END)
             self.directory_entry.insert(0, directory)
+            # Módulos de processamento importados só no primeiro uso
+            from file_renamer import FileRenamer
+            from text_file_editor import TextFileEditor
+            from infraction_analyzer import InfractionAnalyzer
             self.file_renamer = FileRenamer(directory)
             self.text_file_editor = TextFileEditor(directory)
             self.infraction_analyzer = InfractionAnalyzer(directory)
@@ -195,6 +241,14 @@ class Application(tk.CTkFrame):
             messagebox.showwarning("Aviso", "Selecione um lote e digite o novo nome")
             return
         
+        if not self.file_renamer:
+            messagebox.showwarning("Aviso", "Selecione o diretório dos lotes")
+            return
+        
+        if self.worker_thread is not None and self.worker_thread.is_alive():
+            messagebox.showwarning("Aviso", "Aguarde o término da operação em andamento")
+            return
+        
         # Obtém as configurações de ano
         add_year = self.add_year_var.get()
         year = self.year_entry.get().strip() if add_year else None
@@ -215,37 +269,113 @@ class Application(tk.CTkFrame):
             self.text_file_editor.set_year_config(add_year, year)
         if self.file_renamer:
             self.file_renamer.set_year_config(add_year, year)
-            
-        if self.file_renamer.rename_directory(old_name, new_name):
-            self.file_renamer.rename_files(old_name, new_name)
-            self.file_renamer.rename_text_content(old_name, new_name)
-            self.text_file_editor.edit_text_content(old_name, new_name)
-            
-            # === ANÁLISE AUTOMÁTICA DE INFRAÇÕES APÓS RENOMEAÇÃO ===
-            self.auto_analyze_and_suggest_changes(new_name)
-            
-            self.show_message("Renomeado com Sucesso")  
+        
+        # O processamento roda fora da thread do Tk; a janela continua
+        # respondendo e o progresso é lido via after()
+        from lot_pipeline import LotPipeline
+        pipeline = LotPipeline(self.file_renamer.directory)
+        
+        def task(progress):
+            return pipeline.run(old_name, new_name, year, add_year, progress=progress)
+        
+        def on_done(result):
+            if result.cancelled:
+                self.show_message("Operação cancelada. O lote pode estar parcialmente renomeado.")
+            elif pipeline.inventory is None:
+                # O diretório do lote não chegou a ser renomeado
+                logger.error(f"Falha ao renomear o lote {old_name}: {result.error}")
+                self.show_message("Falha ao Renomear o Lote. Verifique se o lote existe")
+            elif not result.success:
+                # Lote renomeado, mas alguma etapa posterior falhou (textos, md5sum...)
+                logger.error(f"Falha ao processar o lote {old_name}: {result.error}")
+                messagebox.showerror("Erro", f"O lote foi renomeado, mas houve falha no processamento: {result.error}")
+            else:
+                self.infraction_analyzer.set_inventory(pipeline.inventory)
+                
+                # === ANÁLISE AUTOMÁTICA DE INFRAÇÕES APÓS RENOMEAÇÃO ===
+                self.auto_analyze_and_suggest_changes(new_name, result.infraction_counts)
+                
+                self.show_message("Renomeado com Sucesso")
+        
+        self.run_in_background(task, on_done)
+    
+    def run_in_background(self, task, on_done):
+        """
+        Executa uma tarefa longa em uma thread de trabalho.
+        
+        Args:
+            task: Função que recebe o ProgressTracker e retorna o resultado
+            on_done: Chamada na thread do Tk com o resultado da tarefa
+        """
+        self.progress = ProgressTracker()
+        outcome = {}
+        
+        def worker():
+            try:
+                outcome['result'] = task(self.progress)
+            except OperationCancelled as e:
+                outcome['cancelled'] = e
+            except Exception as e:
+                outcome['error'] = e
+        
+        self.execute_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.progress_bar.set(0)
+        self.progress_frame.pack(after=self.execute_button, padx=12, pady=(0, 5))
+        self.progress_label.pack(after=self.progress_frame)
+        
+        self.worker_thread = threading.Thread(target=worker, daemon=True)
+        self.worker_thread.start()
+        self.after(PROGRESS_POLL_MS, self._poll_background_task, on_done, outcome)
+    
+    def _poll_background_task(self, on_done, outcome):
+        """Atualiza o progresso e, ao final, entrega o resultado na thread do Tk."""
+        snapshot = self.progress.snapshot()
+        self.progress_bar.set(snapshot['fraction'])
+        self.progress_label.configure(text=ProgressTracker.format_snapshot(snapshot))
+        
+        if self.worker_thread.is_alive():
+            self.after(PROGRESS_POLL_MS, self._poll_background_task, on_done, outcome)
+            return
+        
+        self.progress_frame.pack_forget()
+        self.progress_label.pack_forget()
+        self.execute_button.configure(state="normal")
+        
+        if 'error' in outcome:
+            messagebox.showerror("Erro", f"Erro durante o processamento: {outcome['error']}")
+        elif 'cancelled' in outcome:
+            self.show_message("Operação cancelada.")
         else:
-            self.show_message("Falha ao Renomear o Lote. Verifique se o lote existe")  
+            on_done(outcome.get('result'))
+    
+    def cancel_running_task(self):
+        """Solicita o cancelamento; a execução para entre um arquivo e outro."""
+        if self.progress is not None:
+            self.progress.cancel()
+            self.cancel_button.configure(state="disabled")
+            self.progress_label.configure(text="Cancelando... aguardando o arquivo atual")
 
 
     def show_help_message(self):
         message = "1 - Selecione o diretorio onde se encontra os Lotes:\n2 - Escolha o lote a ser renomeado poder pasta ou arquivo zip\n3 - digite o novo nome do Lote\n4 - Configure o ano do código de infração:\n   • Marque a opção para adicionar ano\n   • Digite o ano desejado (padrão: 2023)\n   • Desmarque para não adicionar ano\n5 - Clique em Executar\n\nNome de lotes aceitos:\nL05282, 0005282, L0230712\nL05282.zip, 000582.zip, L0230712.zip\n\nFuncionalidades de Infrações:\n- Analise automática de códigos de infração\n- Alteração em massa de códigos\n- 5673: Parado sobre faixa de pedestre\n- 6050: Avanço de sinal vermelho\n- 7587: Transitar em faixa exclusiva\n\nConfiguração de Ano:\n- Com ano: BRI1132/2023\n- Sem ano: BRI1132"                  
         messagebox.showinfo("Ajuda", message)
 
-    def auto_analyze_and_suggest_changes(self, lote_name):
+    def auto_analyze_and_suggest_changes(self, lote_name, infraction_counts=None):
         """Analisa automaticamente as infrações após renomeação e sugere mudanças"""
         if not self.infraction_analyzer:
             return
             
         try:
-            print(f"\n=== ANÁLISE AUTOMÁTICA DE INFRAÇÕES PARA {lote_name} ====")
+            logger.info(f"\n=== ANÁLISE AUTOMÁTICA DE INFRAÇÕES PARA {lote_name} ====")
             
-            # Analisa as infrações do lote renomeado
-            self.infraction_counts = self.infraction_analyzer.analyze_infractions(lote_name)
+            # Analisa as infrações do lote renomeado (reaproveita a contagem, se houver)
+            if infraction_counts is None:
+                infraction_counts = self.infraction_analyzer.analyze_infractions(lote_name)
+            self.infraction_counts = infraction_counts
             
             if not self.infraction_counts:
-                print("Nenhuma infração encontrada para análise")
+                logger.info("Nenhuma infração encontrada para análise")
                 return
                 
             # Analisa e sugere mudanças baseado em regras inteligentes
@@ -255,7 +385,7 @@ class Application(tk.CTkFrame):
                 self.prompt_automatic_change(suggestion, lote_name)
                 
         except Exception as e:
-            print(f"Erro na análise automática: {e}")
+            logger.error(f"Erro na análise automática: {e}")
     
     def analyze_and_suggest_infraction_changes(self):
         """Analisa padrões e sugere mudanças inteligentes de códigos"""
@@ -401,16 +531,9 @@ class Application(tk.CTkFrame):
             # Botão para aplicar
             def apply_selection():
                 chosen_code = selected_code.get()
-                chosen_desc = dict(infractions_list)[chosen_code]
                 popup.destroy()
+                # A mensagem de sucesso é exibida ao final da execução
                 self.apply_automatic_changes(chosen_code, lote_name)
-                
-                # Mensagem de sucesso
-                success_msg = (f"\u2705 Padronização aplicada com sucesso!\n\n"
-                             f"Todas as {total} infrações foram convertidas para:\n"
-                             f"Código: {chosen_code}\n"
-                             f"Tipo: {chosen_desc}")
-                messagebox.showinfo("\u2705 Sucesso", success_msg)
             
             apply_button = tk.CTkButton(buttons_frame, text="✅ Aplicar Seleção", 
                                        command=apply_selection, 
@@ -427,7 +550,7 @@ class Application(tk.CTkFrame):
             popup.focus_set()
             
         except Exception as e:
-            print(f"Erro ao criar popup de seleção: {e}")
+            logger.error(f"Erro ao criar popup de seleção: {e}")
             # Fallback para messagebox simples
             self.fallback_prompt(suggestion, lote_name)
     
@@ -454,31 +577,28 @@ class Application(tk.CTkFrame):
             if response:
                 self.apply_automatic_changes(suggested_code, lote_name)
             else:
-                print("Usuário optou por não aplicar as mudanças automáticas")
+                logger.info("Usuário optou por não aplicar as mudanças automáticas")
                 
         except Exception as e:
-            print(f"Erro no fallback: {e}")
+            logger.error(f"Erro no fallback: {e}")
             # Fallback para messagebox simples
             self.fallback_prompt(suggestion, lote_name)
     
     def apply_automatic_changes(self, new_code, lote_name):
-        """Aplica as mudanças automáticas de código"""
-        try:
-            total_files_modified = 0
-            total_lines_modified = 0
-            
-            print(f"\n=== APLICANDO MUDANÇAS AUTOMÁTICAS ====")
-            print(f"Alterando todos os códigos para: {new_code}")
-            
-            # Aplica mudanças para todos os códigos existentes
-            for old_code in self.infraction_counts.keys():
-                if old_code != new_code:  # Não alterar se já é o código desejado
-                    files_mod, lines_mod = self.infraction_analyzer.change_infraction_codes(lote_name, old_code, new_code)
-                    total_files_modified += files_mod
-                    total_lines_modified += lines_mod
-            
-            # Re-analisa para atualizar contadores
-            self.infraction_counts = self.infraction_analyzer.analyze_infractions(lote_name)
+        """Aplica as mudanças automáticas de código (em segundo plano)"""
+        logger.info(f"\n=== APLICANDO MUDANÇAS AUTOMÁTICAS ====")
+        logger.info(f"Alterando todos os códigos para: {new_code}")
+        
+        # Aplica mudanças para todos os códigos existentes em uma única passada
+        # (códigos iguais ao desejado são ignorados); os contadores são
+        # atualizados na mesma leitura
+        code_map = {old_code: new_code for old_code in self.infraction_counts.keys()}
+        
+        def task(progress):
+            return self.infraction_analyzer.standardize_codes(lote_name, code_map, progress)
+        
+        def on_done(result):
+            total_files_modified, total_lines_modified, self.infraction_counts = result
             
             description = self.infraction_analyzer.get_infraction_description(new_code)
             
@@ -492,16 +612,10 @@ class Application(tk.CTkFrame):
             
             messagebox.showinfo("✅ Sucesso Automático", success_message)
             
-            print(f"Mudanças automáticas aplicadas: {total_files_modified} arquivos, {total_lines_modified} linhas")
-            
+            logger.info(f"Mudanças automáticas aplicadas: {total_files_modified} arquivos, {total_lines_modified} linhas")
+        
+        try:
+            self.run_in_background(task, on_done)
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao aplicar mudanças automáticas: {e}")
-            print(f"Erro nas mudanças automáticas: {e}")
-
-
-
-
-
-
-
-
+            logger.error(f"Erro nas mudanças automáticas: {e}")
@@ -1,6 +1,16 @@
 import os
 import glob
-from collections import defaultdict
+import time
+from text_pipeline import (
+    TextPipeline, InfractionCodeTransform, InfractionCountTransform, InfractionYearCountTransform
+)
+from analysis_cache import InfractionCache
+from utils import LoggingUtils
+from config import STAGE_INFRACTIONS, INFRACTION_CACHE_ENABLED
+import instrumentation
+from log_manager import get_logger
+
+logger = get_logger('infraction_analyzer')
 
 class InfractionAnalyzer:
     """
@@ -14,111 +24,141 @@ class InfractionAnalyzer:
             "6050": "AVANÇO DE SINAL VERMELHO", 
             "7587": "TRANSITAR EM FAIXA EXCLUSIVA"
         }
+        self.inventory = None
+        self.use_cache = INFRACTION_CACHE_ENABLED
+    
+    def set_cache_enabled(self, enabled):
+        """
+        Ativa/desativa o cache persistente da análise de infrações
+        """
+        self.use_cache = enabled
+    
+    def set_inventory(self, inventory):
+        """
+        Define o inventário do lote para evitar novas listagens de diretório
+        """
+        self.inventory = inventory
+    
+    def _get_inventory(self, lote_name):
+        """
+        Retorna o inventário se ele corresponder ao lote informado
+        """
+        if self.inventory is None:
+            return None
+        main_dir = os.path.normpath(os.path.join(self.directory, lote_name))
+        if self.inventory.lot_directory != main_dir:
+            return None
+        return self.inventory
+    
+    def get_text_files(self, lote_name):
+        """
+        Retorna os arquivos .txt com registros de infração do lote
+        """
+        return self._get_text_files(lote_name)
+    
+    def _get_text_files(self, lote_name):
+        """
+        Retorna os arquivos .txt do lote (exceto md5sum.txt)
+        """
+        inventory = self._get_inventory(lote_name)
+        if inventory is not None:
+            filenames = inventory.get_text_files()
+        else:
+            filenames = []
+            for search_dir in self._get_search_directories(lote_name):
+                if os.path.exists(search_dir):
+                    filenames.extend(glob.glob(os.path.join(search_dir, '*.txt')))
+        return [filename for filename in filenames
+                if os.path.basename(filename).lower() != 'md5sum.txt']
         
+    @instrumentation.traced()
     def analyze_infractions(self, lote_name):
         """
         Analisa todos os arquivos .txt do lote e conta infrações por tipo
         Retorna: dict com contadores de infrações
         """
-        infraction_counts = defaultdict(int)
+        pipeline = TextPipeline([InfractionCountTransform()])
+        filenames = self._get_text_files(lote_name)
+        if not self.use_cache:
+            return pipeline.process_files(filenames).infraction_counts
         
-        # Define os diretórios onde procurar arquivos
-        search_directories = self._get_search_directories(lote_name)
-        
-        for search_dir in search_directories:
-            if not os.path.exists(search_dir):
+        # Relê apenas os arquivos novos ou alterados desde a última análise
+        cache = InfractionCache(os.path.join(self.directory, lote_name))
+        counts = {}
+        stale = []
+        checked_ns = time.time_ns()  # Antes dos os.stat (ver InfractionCache.is_racy)
+        instrumentation.count(instrumentation.STAT_CALLS, len(filenames))  # os.stat de cada arquivo
+        for filename in filenames:
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                stale.append((filename, None))
                 continue
-                
-            for filename in glob.glob(os.path.join(search_dir, '*.txt')):
-                # Pula md5sum.txt
-                if os.path.basename(filename).lower() == 'md5sum.txt':
-                    continue
-                    
-                try:
-                    with open(filename, 'r', encoding='utf-8') as file:
-                        for line in file:
-                            line = line.strip()
-                            if not line:
-                                continue
-                                
-                            # Split da linha por ';'
-                            parts = line.split(';')
-                            
-                            # O código de infração está na última posição
-                            if len(parts) > 0:
-                                infraction_code = parts[-1].strip()
-                                if infraction_code and infraction_code.isdigit():
-                                    infraction_counts[infraction_code] += 1
-                                    
-                except Exception as e:
-                    print(f"Erro ao analisar arquivo {filename}: {e}")
-                    
-        return dict(infraction_counts)
+            cached = cache.lookup(filename, stat.st_size, stat.st_mtime_ns)
+            if cached is None:
+                stale.append((filename, stat))
+                continue
+            for code, count in cached.items():
+                counts[code] = counts.get(code, 0) + count
+        
+        if stale:
+            result = pipeline.process_files([filename for filename, _ in stale])
+            # stat obtido antes da leitura: uma alteração posterior invalida a
+            # entrada, exceto dentro da resolução do mtime (não guardada)
+            for (filename, stat), file_result in zip(stale, result.files):
+                if stat is not None and file_result.error is None:
+                    cache.store(filename, stat.st_size, stat.st_mtime_ns,
+                                file_result.infraction_counts, checked_ns)
+            for code, count in result.infraction_counts.items():
+                counts[code] = counts.get(code, 0) + count
+        cache.retain(filenames)
+        cache.save()
+        logger.debug(f"Análise de infrações de {lote_name}: {cache.hits} em cache, {len(stale)} lido(s), "
+                     f"{cache.racy} fora do cache (mtime recente)")
+        return counts
+    
+    @instrumentation.traced()
+    def analyze_infractions_by_year(self, lote_name):
+        """
+        Conta as infrações do lote por código e por sufixo de ano (sem cache)
+        Retorna: TextPipelineResult (code_year_counts, linhas e erros por arquivo)
+        """
+        pipeline = TextPipeline([InfractionYearCountTransform()])
+        return pipeline.process_files(self._get_text_files(lote_name))
     
     def change_infraction_codes(self, lote_name, old_code, new_code):
         """
         Altera todas as ocorrências de old_code para new_code nos arquivos do lote
         """
-        files_modified = 0
-        lines_modified = 0
+        files_modified, lines_modified, _ = self.standardize_codes(lote_name, {old_code: new_code})
+        return files_modified, lines_modified
+    
+    @instrumentation.traced()
+    def standardize_codes(self, lote_name, code_map, progress=None):
+        """
+        Aplica um mapeamento de códigos (antigo -> novo) em passada única por
+        arquivo e recontabiliza as infrações na mesma leitura
+        Retorna: (arquivos modificados, linhas alteradas, contadores de infrações)
+        """
+        inventory = self._get_inventory(lote_name)
+        pipeline = TextPipeline([InfractionCodeTransform(code_map), InfractionCountTransform()])
         
-        # Define os diretórios onde procurar arquivos
-        search_directories = self._get_search_directories(lote_name)
+        # md5sum.txt é excluído por _get_text_files - NUNCA alterar
+        filenames = self._get_text_files(lote_name)
+        if progress is not None:
+            progress.set_stage("Padronizando infrações", len(filenames))
+        result = pipeline.process_files(filenames, progress=progress)
+        for file_result in result.files:
+            if file_result.written:
+                if inventory is not None:
+                    inventory.update_file(file_result.filename)
+                LoggingUtils.count(STAGE_INFRACTIONS, 'arquivos')
+                if LoggingUtils.is_debug_enabled():
+                    logger.debug(f"Arquivo modificado: {file_result.filename} ({file_result.code_lines_changed} linha(s))")
+        LoggingUtils.count(STAGE_INFRACTIONS, 'linhas', result.code_lines_changed)
+        LoggingUtils.log_stage_summary(STAGE_INFRACTIONS)
         
-        for search_dir in search_directories:
-            if not os.path.exists(search_dir):
-                continue
-                
-            for filename in glob.glob(os.path.join(search_dir, '*.txt')):
-                # Pula md5sum.txt - NUNCA alterar
-                if os.path.basename(filename).lower() == 'md5sum.txt':
-                    continue
-                    
-                try:
-                    # Lê o arquivo
-                    with open(filename, 'r', encoding='utf-8') as file:
-                        lines = file.readlines()
-                    
-                    new_lines = []
-                    file_changed = False
-                    
-                    for line in lines:
-                        original_line = line
-                        line_stripped = line.strip()
-                        
-                        if not line_stripped:
-                            new_lines.append(line)
-                            continue
-                            
-                        # Split da linha por ';'
-                        parts = line_stripped.split(';')
-                        
-                        # Verifica se o código de infração (última posição) é o que queremos alterar
-                        if len(parts) > 0:
-                            current_code = parts[-1].strip()
-                            if current_code == old_code:
-                                parts[-1] = new_code
-                                new_line = ';'.join(parts) + '\n'
-                                new_lines.append(new_line)
-                                file_changed = True
-                                lines_modified += 1
-                                print(f"Alterado: {current_code} -> {new_code} em {os.path.basename(filename)}")
-                            else:
-                                new_lines.append(original_line)
-                        else:
-                            new_lines.append(original_line)
-                    
-                    # Salva o arquivo se houver mudanças
-                    if file_changed:
-                        with open(filename, 'w', encoding='utf-8') as file:
-                            file.writelines(new_lines)
-                        files_modified += 1
-                        print(f"Arquivo modificado: {filename}")
-                        
-                except Exception as e:
-                    print(f"Erro ao modificar arquivo {filename}: {e}")
-                    
-        return files_modified, lines_modified
+        return result.files_written, result.code_lines_changed, result.infraction_counts
     
     def _get_search_directories(self, lote_name):
         """
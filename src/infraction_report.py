@@ -0,0 +1,211 @@
+"""
+Relatório de infrações de todos os lotes de um diretório.
+
+Cada lote (pasta ou .zip) é analisado por um processo do pool e as contagens
+são agregadas por código, por lote e por sufixo de ano. O resultado pode ser
+exportado em CSV (uma linha por lote/ano/código) ou JSON.
+"""
+
+import csv
+import io
+import os
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+from config import (
+    DEFAULT_WORKERS,
+    ZIP_EXTENSION,
+    RAR_EXTENSION,
+    TXT_EXTENSION,
+    MD5SUM_FILENAME,
+    REPORT_CSV_DELIMITER,
+    REPORT_NO_YEAR
+)
+from infraction_analyzer import InfractionAnalyzer
+from text_pipeline import TextPipeline, TextFileResult, TextPipelineResult, InfractionYearCountTransform
+from worker_pool import run_bounded, EXECUTOR_PROCESS
+from log_manager import get_logger
+
+logger = get_logger('infraction_report')
+
+CSV_FIELDS = ('lote', 'ano', 'codigo', 'descricao', 'quantidade')
+
+
+def discover_lots(root: str) -> List[str]:
+    """
+    Lista os lotes de um diretório: subpastas e arquivos .zip (os .rar são
+    ignorados, pois exigem extração completa).
+
+    Args:
+        root (str): Diretório que contém os lotes
+
+    Returns:
+        List[str]: Nomes dos lotes em ordem alfabética
+    """
+    lots = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir() or entry.name.lower().endswith(ZIP_EXTENSION):
+                lots.append(entry.name)
+            elif entry.name.lower().endswith(RAR_EXTENSION):
+                logger.info(f"Lote {entry.name} ignorado no relatório (.rar)")
+    return sorted(lots)
+
+
+def analyze_zip_lot(zip_path: str) -> TextPipelineResult:
+    """
+    Conta as infrações dos arquivos .txt de um lote .zip sem extraí-lo.
+
+    Args:
+        zip_path (str): Caminho do arquivo .zip
+
+    Returns:
+        TextPipelineResult: Contagens por arquivo e agregadas
+    """
+    pipeline = TextPipeline([InfractionYearCountTransform()])
+    pipeline_result = TextPipelineResult()
+    with zipfile.ZipFile(zip_path) as zip_file:
+        for info in zip_file.infolist():
+            basename = info.filename.rsplit('/', 1)[-1].lower()
+            if info.is_dir() or not basename.endswith(TXT_EXTENSION) or basename == MD5SUM_FILENAME:
+                continue
+            file_result = TextFileResult(f"{zip_path}/{info.filename}")
+            try:
+                with zip_file.open(info) as raw, io.TextIOWrapper(raw, encoding='utf-8') as text:
+                    pipeline.process_lines(text, file_result)
+            except Exception as e:
+                logger.error(f"Erro ao processar arquivo {file_result.filename}: {e}")
+                file_result.error = e
+            pipeline_result.add(file_result)
+    return pipeline_result
+
+
+def analyze_lot(task: Tuple[str, str]) -> Dict[str, Any]:
+    """
+    Analisa um lote (executado nos processos do pool).
+
+    Args:
+        task (Tuple[str, str]): (diretório raiz, nome do lote)
+
+    Returns:
+        Dict[str, Any]: lot, files, lines, errors e counts
+            ({código: {ano: quantidade}})
+    """
+    root, lot_name = task
+    if lot_name.lower().endswith(ZIP_EXTENSION):
+        result = analyze_zip_lot(os.path.join(root, lot_name))
+    else:
+        result = InfractionAnalyzer(root).analyze_infractions_by_year(lot_name)
+
+    counts: Dict[str, Dict[str, int]] = {}
+    for (code, year), count in result.code_year_counts.items():
+        by_year = counts.setdefault(code, {})
+        by_year[year] = by_year.get(year, 0) + count
+    return {
+        'lot': lot_name,
+        'files': len(result.files),
+        'lines': sum(file_result.lines for file_result in result.files),
+        'errors': len(result.errors),
+        'counts': counts,
+    }
+
+
+def _add_counts(target: Dict[str, int], key: str, count: int) -> None:
+    target[key] = target.get(key, 0) + count
+
+
+def build_report(
+    root: str,
+    lots: Optional[List[str]] = None,
+    max_workers: int = DEFAULT_WORKERS
+) -> Dict[str, Any]:
+    """
+    Analisa todos os lotes em paralelo e agrega as contagens.
+
+    Args:
+        root (str): Diretório que contém os lotes
+        lots (List[str]): Lotes a analisar (padrão: discover_lots(root))
+        max_workers (int): Processos do pool (1 = em série)
+
+    Returns:
+        Dict[str, Any]: Relatório (serializável em JSON) com totais por
+            código, por ano e por código/ano, e o detalhamento por lote
+    """
+    start = time.perf_counter()
+    if lots is None:
+        lots = discover_lots(root)
+    logger.info(f"Relatório de infrações: {len(lots)} lote(s) em {root}")
+
+    analyzer = InfractionAnalyzer(root)
+    lot_reports = []
+    by_code: Dict[str, int] = {}
+    by_year: Dict[str, int] = {}
+    by_code_year: Dict[str, Dict[str, int]] = {}
+    tasks = [(root, lot_name) for lot_name in lots]
+    for (_, lot_name), lot_report, error in run_bounded(analyze_lot, tasks, max_workers,
+                                                        executor_type=EXECUTOR_PROCESS):
+        if error is not None:
+            logger.error(f"Erro ao analisar lote {lot_name}: {error}")
+            lot_reports.append({'lot': lot_name, 'error': str(error)})
+            continue
+
+        lot_by_code: Dict[str, int] = {}
+        lot_by_year: Dict[str, int] = {}
+        lot_by_code_year: Dict[str, Dict[str, int]] = {}
+        for code, years in lot_report['counts'].items():
+            for year, count in years.items():
+                year = year or REPORT_NO_YEAR
+                _add_counts(lot_by_code, code, count)
+                _add_counts(lot_by_year, year, count)
+                _add_counts(lot_by_code_year.setdefault(code, {}), year, count)
+                _add_counts(by_code, code, count)
+                _add_counts(by_year, year, count)
+                _add_counts(by_code_year.setdefault(code, {}), year, count)
+        lot_reports.append({
+            'lot': lot_name,
+            'files': lot_report['files'],
+            'lines': lot_report['lines'],
+            'errors': lot_report['errors'],
+            'total': sum(lot_by_code.values()),
+            'by_code': dict(sorted(lot_by_code.items())),
+            'by_year': dict(sorted(lot_by_year.items())),
+            'by_code_year': {code: dict(sorted(years.items()))
+                             for code, years in sorted(lot_by_code_year.items())},
+        })
+        logger.debug(f"Lote {lot_name}: {lot_report['lines']} linha(s), {lot_report['files']} arquivo(s)")
+
+    analyzed = [lot for lot in lot_reports if 'error' not in lot]
+    return {
+        'root': root,
+        'lots': len(lot_reports),
+        'failed': len(lot_reports) - len(analyzed),
+        'files': sum(lot['files'] for lot in analyzed),
+        'lines': sum(lot['lines'] for lot in analyzed),
+        'total': sum(by_code.values()),
+        'by_code': {code: {'description': analyzer.get_infraction_description(code), 'count': count}
+                    for code, count in sorted(by_code.items())},
+        'by_year': dict(sorted(by_year.items())),
+        'by_code_year': {code: dict(sorted(years.items())) for code, years in sorted(by_code_year.items())},
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+        'lot_reports': lot_reports,
+    }
+
+
+def write_report_csv(report: Dict[str, Any], output) -> None:
+    """
+    Grava o relatório em CSV: uma linha por lote, ano e código.
+
+    Args:
+        report (Dict): Resultado de build_report
+        output: Arquivo de texto aberto para escrita
+    """
+    analyzer = InfractionAnalyzer(report['root'])
+    writer = csv.writer(output, delimiter=REPORT_CSV_DELIMITER, lineterminator='\n')
+    writer.writerow(CSV_FIELDS)
+    for lot in report['lot_reports']:
+        for code, years in lot.get('by_code_year', {}).items():
+            for year, count in years.items():
+                writer.writerow((lot['lot'], year, code,
+                                 analyzer.get_infraction_description(code), count))
@@ -0,0 +1,389 @@
+"""
+Instrumentação da renomeação de lotes: intervalos por etapa (spans) e
+contadores de E/S (arquivos varridos, chamadas stat, bytes lidos e
+gravados, renomeações).
+
+Uma Instrumentation é ativada na thread que processa o lote (activate) e
+acompanha as tarefas que run_bounded envia aos workers. Cada contador é
+somado ao total e a todos os intervalos abertos naquele ponto, de modo que
+o resumo mostra, por etapa, quantas chamadas stat ou quantos bytes ela
+causou. Sem instrumentação ativa, span() e count() não fazem nada.
+
+O resultado é exportado como JSON do formato Trace Event (aberto em
+chrome://tracing ou no Perfetto) e como uma tabela de resumo.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Contadores
+FILES_SCANNED = 'files_scanned'
+STAT_CALLS = 'stat_calls'
+BYTES_READ = 'bytes_read'
+BYTES_WRITTEN = 'bytes_written'
+RENAMES = 'renames'
+COUNTERS = (FILES_SCANNED, STAT_CALLS, BYTES_READ, BYTES_WRITTEN, RENAMES)
+
+# Colunas da tabela de resumo
+COUNTER_LABELS = {
+    FILES_SCANNED: 'arquivos',
+    STAT_CALLS: 'stat',
+    BYTES_READ: 'lidos',
+    BYTES_WRITTEN: 'gravados',
+    RENAMES: 'renomeações',
+}
+BYTE_COUNTERS = (BYTES_READ, BYTES_WRITTEN)
+
+_local = threading.local()
+
+
+class Span:
+    """Intervalo medido; os contadores incluem os dos intervalos internos."""
+
+    __slots__ = ('name', 'args', 'parent', 'depth', 'start', 'end', 'thread', 'counters')
+
+    def __init__(self, name: str, args: Dict[str, Any], parent: Optional['Span']):
+        self.name = name
+        self.args = args
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent is not None else 0
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.thread = threading.current_thread()
+        self.counters: Dict[str, int] = {}
+
+
+class _SpanContext:
+    """Abre um Span ao entrar e o registra ao sair."""
+
+    __slots__ = ('instrumentation', 'name', 'args', 'span')
+
+    def __init__(self, instrumentation: 'Instrumentation', name: str, args: Dict[str, Any]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.args = args
+        self.span = None
+
+    def __enter__(self) -> Span:
+        self.span = Span(self.name, self.args, getattr(_local, 'span', None))
+        _local.span = self.span
+        return self.span
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        span = self.span
+        span.end = time.perf_counter()
+        _local.span = span.parent
+        if exc_type is not None:
+            span.args = dict(span.args, error=exc_type.__name__)
+        self.instrumentation._record(span)
+
+
+class _NullContext:
+    """Contexto vazio (instrumentação desligada)."""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        return None
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class _Activation:
+    """Liga uma Instrumentation à thread atual e restaura a anterior ao sair."""
+
+    def __init__(self, instrumentation: 'Instrumentation', parent: Optional[Span]):
+        self.instrumentation = instrumentation
+        self.parent = parent
+        self._previous = None
+
+    def __enter__(self) -> 'Instrumentation':
+        self._previous = (getattr(_local, 'instrumentation', None), getattr(_local, 'span', None),
+                          getattr(_local, 'stage', None))
+        _local.instrumentation = self.instrumentation
+        _local.span = self.parent
+        _local.stage = None
+        return self.instrumentation
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        end_stage()
+        _local.instrumentation, _local.span, _local.stage = self._previous
+
+
+class Instrumentation:
+    """
+    Intervalos e contadores de uma execução (thread-safe).
+
+    Uso:
+        instrumentation = Instrumentation('L00125 -> L00126')
+        with instrumentation.activate():
+            with span('rename_files'):
+                count(RENAMES)
+        print(instrumentation.format_summary())
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counters: Dict[str, int] = {}
+
+    def activate(self, parent: Optional[Span] = None) -> _Activation:
+        """Contexto em que span() e count() da thread atual vão para esta instância."""
+        return _Activation(self, parent)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def _count(self, counter: str, amount: int, span: Optional[Span]) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+            while span is not None:
+                span.counters[counter] = span.counters.get(counter, 0) + amount
+                span = span.parent
+
+    # Exportação ---------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Resumo por nome de intervalo, na ordem em que cada um começou.
+
+        Returns:
+            Dict[str, Any]: name, elapsed_seconds, counters (totais) e spans
+                (name, depth, calls, seconds e os contadores de cada intervalo)
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+            counters = dict(self.counters)
+        rows: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            row = rows.setdefault(span.name, {'name': span.name, 'depth': span.depth, 'calls': 0, 'seconds': 0.0})
+            row['calls'] += 1
+            row['seconds'] += span.end - span.start
+            for counter, value in span.counters.items():
+                row[counter] = row.get(counter, 0) + value
+        for row in rows.values():
+            row['seconds'] = round(row['seconds'], 4)
+        end = max((span.end for span in spans), default=self.origin)
+        return {
+            'name': self.name,
+            'elapsed_seconds': round(end - self.origin, 4),
+            'counters': counters,
+            'spans': list(rows.values()),
+        }
+
+    def format_summary(self) -> str:
+        """Tabela de resumo (uma linha por intervalo e a linha de totais)."""
+        summary = self.summary()
+        header = ['etapa', 'chamadas', 'tempo (s)'] + [COUNTER_LABELS[counter] for counter in COUNTERS]
+        rows = [['  ' * row['depth'] + row['name'], str(row['calls']), f"{row['seconds']:.3f}"]
+                + [_format_counter(counter, row.get(counter, 0)) for counter in COUNTERS]
+                for row in summary['spans']]
+        rows.append(['total', '', f"{summary['elapsed_seconds']:.3f}"]
+                    + [_format_counter(counter, summary['counters'].get(counter, 0)) for counter in COUNTERS])
+        widths = [max(len(line[column]) for line in [header] + rows) for column in range(len(header))]
+        lines = []
+        for line in [header] + rows:
+            cells = [line[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(line[1:], widths[1:])]
+            lines.append('  '.join(cells))
+        lines.insert(1, '  '.join('-' * width for width in widths))
+        return '\n'.join(lines)
+
+    def trace_events(self, pid: int = 1) -> List[Dict[str, Any]]:
+        """
+        Eventos do formato Trace Event: um evento completo ('X') por
+        intervalo, com os contadores em args, e os nomes do processo (a
+        execução) e das threads.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+            counters = dict(self.counters)
+        threads: Dict[int, int] = {}
+        events: List[Dict[str, Any]] = [
+            {'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0, 'args': {'name': self.name or f"execução {pid}"}},
+        ]
+        for span in spans:
+            ident = span.thread.ident
+            if ident not in threads:
+                threads[ident] = len(threads) + 1
+                events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': threads[ident],
+                               'args': {'name': span.thread.name}})
+            events.append({
+                'ph': 'X',
+                'name': span.name,
+                'cat': 'operalote',
+                'pid': pid,
+                'tid': threads[ident],
+                'ts': round((span.start - self.origin) * 1e6, 1),
+                'dur': round((span.end - span.start) * 1e6, 1),
+                'args': dict(span.args, **span.counters),
+            })
+        end = max((span.end for span in spans), default=self.origin)
+        events.append({'ph': 'C', 'name': 'contadores', 'pid': pid, 'tid': 0,
+                       'ts': round((end - self.origin) * 1e6, 1), 'args': counters})
+        return events
+
+
+def _format_counter(counter: str, value: int) -> str:
+    if counter in BYTE_COUNTERS:
+        return format_bytes(value)
+    return str(value)
+
+
+def format_bytes(value: int) -> str:
+    """Tamanho legível (ex.: 12.3 MiB)."""
+    size = float(value)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return str(value)
+
+
+def write_chrome_trace(path: str, instrumentations: Iterable[Instrumentation]) -> None:
+    """
+    Grava o JSON do formato Trace Event; cada execução (lote) aparece como
+    um processo separado, com o tempo contado a partir da primeira delas.
+
+    Args:
+        path (str): Arquivo de saída (.json)
+        instrumentations (Iterable[Instrumentation]): Execuções a exportar
+    """
+    instrumentations = list(instrumentations)
+    origin = min((instrumentation.origin for instrumentation in instrumentations), default=0.0)
+    events = []
+    for pid, instrumentation in enumerate(instrumentations, 1):
+        offset = (instrumentation.origin - origin) * 1e6
+        for event in instrumentation.trace_events(pid):
+            if 'ts' in event:
+                event['ts'] = round(event['ts'] + offset, 1)
+            events.append(event)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file, ensure_ascii=False)
+
+
+class StartupTimer:
+    """
+    Etapas sequenciais da inicialização da interface: cada mark() encerra a
+    etapa iniciada no mark() anterior (ou em origin).
+    """
+
+    def __init__(self, origin: Optional[float] = None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self._last = self.origin
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.stages.append((name, now - self._last))
+        self._last = now
+
+    def elapsed(self) -> float:
+        """Segundos da origem até o último mark()."""
+        return self._last - self.origin
+
+    def format_summary(self) -> str:
+        """Ex.: 'Inicialização em 1.52 s: importações 0.812 s, janela 0.120 s, ...'"""
+        stages = ', '.join(f"{name} {seconds:.3f} s" for name, seconds in self.stages)
+        return f"Inicialização em {self.elapsed():.2f} s: {stages}"
+
+
+# Pontos de instrumentação ---------------------------------------------------------
+
+def activate(instrumentation: Optional[Instrumentation]):
+    """Instrumentation.activate() ou, com None, um contexto que não faz nada."""
+    if instrumentation is None:
+        return _NULL_CONTEXT
+    return instrumentation.activate()
+
+
+def current() -> Optional[Instrumentation]:
+    """Instrumentação ativa na thread atual (None se desligada)."""
+    return getattr(_local, 'instrumentation', None)
+
+
+def span(name: str, **args):
+    """
+    Contexto que mede um intervalo na instrumentação ativa.
+
+    Args:
+        name (str): Nome do intervalo (ex.: 'FileRenamer.rename_files')
+        **args: Detalhes gravados no evento do trace
+    """
+    instrumentation = getattr(_local, 'instrumentation', None)
+    if instrumentation is None:
+        return _NULL_CONTEXT
+    return _SpanContext(instrumentation, name, args)
+
+
+def stage(name: str) -> None:
+    """
+    Abre o intervalo de uma etapa e encerra o da etapa anterior, para os
+    fluxos que só marcam o início de cada etapa (como set_stage do
+    ProgressTracker). O último é encerrado por end_stage ou ao desativar.
+    """
+    instrumentation = getattr(_local, 'instrumentation', None)
+    if instrumentation is None:
+        return
+    end_stage()
+    context = _SpanContext(instrumentation, name, {})
+    context.__enter__()
+    _local.stage = context
+
+
+def end_stage() -> None:
+    """Encerra o intervalo aberto por stage(), se houver."""
+    context = getattr(_local, 'stage', None)
+    if context is not None:
+        _local.stage = None
+        context.__exit__(None, None, None)
+
+
+def count(counter: str, amount: int = 1) -> None:
+    """Soma um contador na instrumentação ativa (e nos intervalos abertos)."""
+    instrumentation = getattr(_local, 'instrumentation', None)
+    if instrumentation is not None and amount:
+        instrumentation._count(counter, amount, getattr(_local, 'span', None))
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorador: mede cada chamada da função como um intervalo."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            instrumentation = getattr(_local, 'instrumentation', None)
+            if instrumentation is None:
+                return func(*args, **kwargs)
+            with _SpanContext(instrumentation, span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """
+    Envolve uma função executada em outra thread (workers de run_bounded)
+    para que ela use a instrumentação e o intervalo aberto da thread atual.
+    """
+    instrumentation = getattr(_local, 'instrumentation', None)
+    if instrumentation is None:
+        return func
+    parent = getattr(_local, 'span', None)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _Activation(instrumentation, parent):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,227 @@
+"""
+Logging estruturado do OperaLote.
+
+As mensagens são enfileiradas (QueueHandler) e gravadas por uma thread
+própria (QueueListener) no console e em um arquivo rotativo na pasta logs/,
+de modo que o processamento não espera pela escrita no console. Detalhes por
+arquivo e por linha ficam no nível DEBUG; no nível padrão (INFO) cada etapa
+registra apenas um resumo com os contadores acumulados em StageCounters.
+Cada execução de lote liga os seus StageCounters à thread que a processa
+(e aos workers de run_bounded), de modo que lotes simultâneos não misturam
+os totais.
+"""
+
+import atexit
+import functools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from typing import Callable, Dict, Optional
+from config import (
+    LOG_LEVEL,
+    LOG_FILE_LEVEL,
+    LOG_FILENAME,
+    LOG_FILE_MAX_BYTES,
+    LOG_FILE_BACKUP_COUNT,
+    LOG_FORMAT,
+    LOG_CONSOLE_FORMAT
+)
+
+LOGGER_NAME = 'operalote'
+
+_lock = threading.Lock()
+_queue: Optional[queue.Queue] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """
+    Obtém o logger do OperaLote (ou um filho, ex: 'operalote.file_renamer').
+
+    Args:
+        name (str): Nome do módulo (opcional)
+    """
+    if not name or name == '__main__':
+        return logging.getLogger(LOGGER_NAME)
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def get_logs_path() -> str:
+    """Pasta de logs do projeto (config/paths.get_logs_path quando disponível)."""
+    try:
+        from paths import get_logs_path as project_logs_path
+        return project_logs_path()
+    except ImportError:
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return os.path.join(project_root, 'logs')
+
+
+class _ConsoleHandler(logging.StreamHandler):
+    """
+    Escreve no sys.stdout/sys.stderr vigente no momento da escrita (respeita
+    redirecionamentos e executáveis sem console, onde o stream é None).
+    """
+
+    def __init__(self, stream_name: str = 'stdout'):
+        super().__init__()
+        self.stream_name = stream_name
+
+    def emit(self, record: logging.LogRecord) -> None:
+        stream = getattr(sys, self.stream_name, None)
+        if stream is None:
+            return
+        self.stream = stream
+        super().emit(record)
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    file_level: Optional[str] = None,
+    console_stream: str = 'stdout',
+    log_to_file: bool = True
+) -> logging.Logger:
+    """
+    Configura o logging assíncrono (chamado uma vez pelo ponto de entrada).
+
+    Args:
+        level (str): Nível do console (padrão: LOG_LEVEL)
+        file_level (str): Nível do arquivo (padrão: LOG_FILE_LEVEL)
+        console_stream (str): 'stdout' ou 'stderr'
+        log_to_file (bool): Se deve gravar o arquivo rotativo em logs/
+
+    Returns:
+        logging.Logger: Logger raiz do OperaLote
+    """
+    global _queue, _listener
+    logger = get_logger()
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        console_handler = _ConsoleHandler(console_stream)
+        console_handler.setLevel(level or LOG_LEVEL)
+        console_handler.setFormatter(logging.Formatter(LOG_CONSOLE_FORMAT))
+        handlers = [console_handler]
+
+        if log_to_file:
+            try:
+                logs_path = get_logs_path()
+                os.makedirs(logs_path, exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    os.path.join(logs_path, LOG_FILENAME),
+                    maxBytes=LOG_FILE_MAX_BYTES,
+                    backupCount=LOG_FILE_BACKUP_COUNT,
+                    encoding='utf-8'
+                )
+                file_handler.setLevel(file_level or LOG_FILE_LEVEL)
+                file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+                handlers.append(file_handler)
+            except OSError as e:
+                # Instalação sem permissão de escrita: segue apenas com o console
+                print(f"Não foi possível criar o arquivo de log: {e}", file=sys.stderr)
+
+        _queue = queue.Queue()
+        _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+        logger.handlers[:] = [logging.handlers.QueueHandler(_queue)]
+        logger.setLevel(min(handler.level for handler in handlers))
+        logger.propagate = False
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return logger
+
+
+def flush_logs() -> None:
+    """Aguarda a escrita de todas as mensagens já enfileiradas."""
+    if _queue is not None and _listener is not None:
+        _queue.join()
+
+
+def shutdown_logging() -> None:
+    """Esvazia a fila e encerra a thread de escrita."""
+    global _queue, _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        get_logger().handlers[:] = []
+        _queue = None
+        _listener = None
+
+
+class StageCounters:
+    """
+    Contadores por etapa (thread-safe), ex: arquivos renomeados, textos
+    gravados, linhas processadas. Acumulados durante a etapa e registrados
+    como uma única linha de resumo ao final. label identifica a execução
+    (ex: 'L00125 -> L00126') nas linhas de resumo.
+    """
+
+    def __init__(self, label: str = ''):
+        self.label = label
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def increment(self, stage: str, key: str, count: int = 1) -> None:
+        with self._lock:
+            counters = self._counters.setdefault(stage, {})
+            counters[key] = counters.get(key, 0) + count
+
+    def get(self, stage: str) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counters.get(stage, {}))
+
+    def pop(self, stage: str) -> Dict[str, int]:
+        """Retorna e zera os contadores de uma etapa."""
+        with self._lock:
+            return self._counters.pop(stage, {})
+
+    def activate(self) -> '_CountersActivation':
+        """Contexto que liga estes contadores à thread atual."""
+        return _CountersActivation(self)
+
+
+class _CountersActivation:
+    """Liga StageCounters à thread atual e restaura os anteriores ao sair."""
+
+    def __init__(self, counters: StageCounters):
+        self.counters = counters
+        self._previous = None
+
+    def __enter__(self) -> StageCounters:
+        self._previous = getattr(_counters_local, 'counters', None)
+        _counters_local.counters = self.counters
+        return self.counters
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        _counters_local.counters = self._previous
+
+
+_counters_local = threading.local()
+_default_counters = StageCounters()  # Fora de uma execução de lote (ex: GUI, comando md5)
+
+
+def current_stage_counters() -> StageCounters:
+    """Contadores da execução ligada à thread atual (ou os gerais)."""
+    counters = getattr(_counters_local, 'counters', None)
+    return counters if counters is not None else _default_counters
+
+
+def propagate_stage_counters(func: Callable) -> Callable:
+    """
+    Envolve uma função executada em outra thread (workers de run_bounded)
+    para que ela conte nos StageCounters da thread atual.
+    """
+    counters = getattr(_counters_local, 'counters', None)
+    if counters is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with counters.activate():
+            return func(*args, **kwargs)
+    return wrapper
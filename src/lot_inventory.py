@@ -0,0 +1,344 @@
+"""
+Inventário em memória de um lote.
+
+O diretório do lote é percorrido uma única vez com os.scandir e todas as
+etapas do processamento (renomeação de diretórios, arquivos, textos e análise
+de infrações) consultam e atualizam este inventário em vez de listar o disco
+novamente. Em compartilhamentos de rede isso reduz drasticamente o número de
+chamadas stat/listdir.
+"""
+
+import os
+from typing import Dict, List, Optional, Set
+from config import AITS_DIRECTORY
+from instrumentation import traced, count, FILES_SCANNED, STAT_CALLS
+from log_manager import get_logger
+
+logger = get_logger('lot_inventory')
+
+
+class FileEntry:
+    """Metadados de um arquivo do lote."""
+
+    __slots__ = ('path', 'name', 'extension', 'size', 'mtime_ns')
+
+    def __init__(self, path: str, size: int = 0, mtime_ns: int = 0):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.extension = os.path.splitext(self.name)[1].lower()
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def __repr__(self) -> str:
+        return f"FileEntry({self.path!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+class LotInventory:
+    """
+    Inventário de arquivos e diretórios de um lote, construído em uma só
+    passada e mantido atualizado conforme as renomeações acontecem.
+    """
+
+    def __init__(self, lot_directory: str):
+        self.lot_directory = os.path.normpath(lot_directory)
+        self.stat_calls = 0
+        self._files: Dict[str, FileEntry] = {}
+        self._by_extension: Dict[str, Set[str]] = {}
+        # Diretório -> nomes dos filhos (arquivos e subdiretórios)
+        self._children: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def from_directory(cls, lot_directory: str) -> Optional['LotInventory']:
+        """
+        Constrói o inventário de um diretório de lote.
+
+        Args:
+            lot_directory (str): Caminho do diretório do lote
+
+        Returns:
+            Optional[LotInventory]: Inventário pronto, ou None se o caminho
+                não for um diretório (ex: lote ainda compactado)
+        """
+        if not os.path.isdir(lot_directory):
+            return None
+        return cls(lot_directory).scan()
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    @traced('LotInventory.scan')
+    def scan(self) -> 'LotInventory':
+        """Percorre o lote inteiro com os.scandir e preenche o inventário."""
+        self._files.clear()
+        self._by_extension.clear()
+        self._children.clear()
+        self._scan_tree(self.lot_directory)
+        return self
+
+    @traced('LotInventory.rescan')
+    def rescan(self, directory: str) -> None:
+        """
+        Recarrega uma subárvore do lote (ex: após mover conteúdo ou extrair
+        um arquivo compactado).
+
+        Args:
+            directory (str): Diretório a ser recarregado
+        """
+        directory = os.path.normpath(directory)
+        self._forget_tree(directory)
+        if os.path.isdir(directory):
+            self._link_to_parent(directory)
+            self._scan_tree(directory)
+
+    def _scan_tree(self, directory: str) -> None:
+        """Percorre iterativamente uma árvore de diretórios."""
+        pending = [directory]
+        files = 0
+        while pending:
+            current = pending.pop()
+            children = self._children.setdefault(current, set())
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        children.add(entry.name)
+                        path = os.path.join(current, entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            self._children.setdefault(path, set())
+                            pending.append(path)
+                        else:
+                            files += 1
+                            stat_result = entry.stat()
+                            self._add_entry(FileEntry(path, stat_result.st_size, stat_result.st_mtime_ns))
+            except OSError as e:
+                logger.warning(f"Erro ao listar diretório {current}: {e}")
+        self.stat_calls += files
+        count(FILES_SCANNED, files)
+        count(STAT_CALLS, files)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def contains(self, path: str) -> bool:
+        """Verifica se o caminho pertence à árvore deste lote."""
+        path = os.path.normpath(path)
+        return path == self.lot_directory or path.startswith(self.lot_directory + os.sep)
+
+    def exists(self, path: str) -> bool:
+        path = os.path.normpath(path)
+        return path in self._files or path in self._children
+
+    def isdir(self, path: str) -> bool:
+        return os.path.normpath(path) in self._children
+
+    def isfile(self, path: str) -> bool:
+        return os.path.normpath(path) in self._files
+
+    def listdir(self, directory: str) -> List[str]:
+        """Equivalente a os.listdir, em ordem alfabética."""
+        return sorted(self._children.get(os.path.normpath(directory), ()))
+
+    def get_entry(self, path: str) -> Optional[FileEntry]:
+        return self._files.get(os.path.normpath(path))
+
+    def get_files(self, extension: Optional[str] = None) -> List[str]:
+        """
+        Obtém os arquivos do lote, opcionalmente filtrados por extensão.
+
+        Args:
+            extension (str): Extensão com ponto (ex: ".txt"), sem distinção
+                de maiúsculas/minúsculas
+
+        Returns:
+            List[str]: Caminhos dos arquivos em ordem alfabética
+        """
+        if extension is None:
+            return sorted(self._files)
+        return sorted(self._by_extension.get(extension.lower(), ()))
+
+    def get_files_in(self, directory: str, extension: Optional[str] = None) -> List[str]:
+        """Obtém os arquivos imediatamente dentro de um diretório."""
+        directory = os.path.normpath(directory)
+        files = []
+        for name in self.listdir(directory):
+            path = os.path.join(directory, name)
+            entry = self._files.get(path)
+            if entry is not None and (extension is None or entry.extension == extension.lower()):
+                files.append(path)
+        return files
+
+    def get_subdirectories(self, directory: str) -> List[str]:
+        """Obtém os nomes dos subdiretórios imediatos de um diretório."""
+        directory = os.path.normpath(directory)
+        return [name for name in self.listdir(directory)
+                if os.path.join(directory, name) in self._children]
+
+    def get_directories(self) -> List[str]:
+        """
+        Obtém todos os diretórios do lote, começando pela raiz
+        (equivalente a DirectoryUtils.get_search_directories).
+        """
+        directories = []
+        pending = [self.lot_directory]
+        while pending:
+            current = pending.pop(0)
+            directories.append(current)
+            pending.extend(os.path.join(current, name) for name in self.get_subdirectories(current))
+        return directories
+
+    def get_aits_directories(self) -> List[str]:
+        """Obtém todos os diretórios AITs do lote."""
+        return sorted(path for path in self._children
+                      if os.path.basename(path) == AITS_DIRECTORY)
+
+    def get_text_search_directories(self) -> List[str]:
+        """
+        Obtém os diretórios de busca de arquivos de texto: a raiz do lote,
+        seus subdiretórios imediatos e os AITs desses subdiretórios
+        (equivalente a DirectoryUtils.get_text_search_directories).
+        """
+        directories = [self.lot_directory]
+        for name in self.get_subdirectories(self.lot_directory):
+            item_path = os.path.join(self.lot_directory, name)
+            directories.append(item_path)
+            aits_path = os.path.join(item_path, AITS_DIRECTORY)
+            if aits_path in self._children:
+                directories.append(aits_path)
+        return directories
+
+    def get_text_files(self, directories: Optional[List[str]] = None) -> List[str]:
+        """
+        Obtém os arquivos .txt dos diretórios de busca de texto.
+
+        Args:
+            directories (List[str]): Diretórios a considerar (padrão:
+                get_text_search_directories)
+
+        Returns:
+            List[str]: Caminhos dos arquivos .txt
+        """
+        if directories is None:
+            directories = self.get_text_search_directories()
+        files = []
+        for directory in directories:
+            files.extend(self.get_files_in(directory, '.txt'))
+        return files
+
+    def total_size(self) -> int:
+        """Soma dos tamanhos de todos os arquivos do lote."""
+        return sum(entry.size for entry in self._files.values())
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    # ------------------------------------------------------------------
+    # Atualizações
+    # ------------------------------------------------------------------
+
+    def add_file(self, path: str) -> None:
+        """Registra (ou atualiza) um arquivo, lendo seus metadados do disco."""
+        path = os.path.normpath(path)
+        self.stat_calls += 1
+        count(STAT_CALLS)
+        stat_result = os.stat(path)
+        self._discard_file(path)
+        self._link_to_parent(path)
+        self._add_entry(FileEntry(path, stat_result.st_size, stat_result.st_mtime_ns))
+
+    def update_file(self, path: str) -> None:
+        """Atualiza tamanho e mtime de um arquivo após reescrita."""
+        self.add_file(path)
+
+    def add_directory(self, path: str) -> None:
+        """Registra um diretório novo (vazio)."""
+        path = os.path.normpath(path)
+        self._link_to_parent(path)
+        self._children.setdefault(path, set())
+
+    def remove(self, path: str) -> None:
+        """Remove um arquivo ou uma árvore de diretórios do inventário."""
+        path = os.path.normpath(path)
+        if path in self._files:
+            self._discard_file(path)
+        else:
+            self._forget_tree(path)
+        parent = self._children.get(os.path.dirname(path))
+        if parent is not None:
+            parent.discard(os.path.basename(path))
+
+    def rename_file(self, old_path: str, new_path: str) -> None:
+        """Registra a renomeação de um arquivo (sem novo stat)."""
+        old_path = os.path.normpath(old_path)
+        new_path = os.path.normpath(new_path)
+        entry = self._files.get(old_path)
+        self.remove(old_path)
+        self._link_to_parent(new_path)
+        if entry is None:
+            self.add_file(new_path)
+        else:
+            self._add_entry(FileEntry(new_path, entry.size, entry.mtime_ns))
+
+    def rename_directory(self, old_path: str, new_path: str) -> None:
+        """
+        Registra a renomeação de um diretório, atualizando todos os caminhos
+        da subárvore. Se o diretório renomeado for a raiz do lote, o
+        inventário passa a apontar para o novo caminho.
+        """
+        old_path = os.path.normpath(old_path)
+        new_path = os.path.normpath(new_path)
+        prefix = old_path + os.sep
+
+        def relocate(path):
+            if path == old_path:
+                return new_path
+            if path.startswith(prefix):
+                return new_path + path[len(old_path):]
+            return path
+
+        self._children = {relocate(path): names for path, names in self._children.items()}
+        files = {}
+        for path, entry in self._files.items():
+            new_entry_path = relocate(path)
+            if new_entry_path != path:
+                entry = FileEntry(new_entry_path, entry.size, entry.mtime_ns)
+            files[new_entry_path] = entry
+        self._files = files
+        self._by_extension = {}
+        for path, entry in self._files.items():
+            self._by_extension.setdefault(entry.extension, set()).add(path)
+
+        if old_path == self.lot_directory:
+            self.lot_directory = new_path
+        else:
+            old_parent = self._children.get(os.path.dirname(old_path))
+            if old_parent is not None:
+                old_parent.discard(os.path.basename(old_path))
+            self._link_to_parent(new_path)
+
+    # ------------------------------------------------------------------
+    # Auxiliares internos
+    # ------------------------------------------------------------------
+
+    def _add_entry(self, entry: FileEntry) -> None:
+        self._files[entry.path] = entry
+        self._by_extension.setdefault(entry.extension, set()).add(entry.path)
+
+    def _discard_file(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if entry is not None:
+            self._by_extension.get(entry.extension, set()).discard(path)
+
+    def _link_to_parent(self, path: str) -> None:
+        if path == self.lot_directory:
+            return
+        parent = os.path.dirname(path)
+        if parent in self._children or self.contains(parent):
+            self._children.setdefault(parent, set()).add(os.path.basename(path))
+
+    def _forget_tree(self, directory: str) -> None:
+        prefix = directory + os.sep
+        for path in [p for p in self._children if p == directory or p.startswith(prefix)]:
+            del self._children[path]
+        for path in [p for p in self._files if p.startswith(prefix)]:
+            self._discard_file(path)
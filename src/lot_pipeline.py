@@ -0,0 +1,559 @@
+"""
+Execução headless da renomeação de um lote.
+
+Reproduz o fluxo do botão "Executar" da interface (Application.rename) sem
+depender do Tkinter: renomeação do diretório, dos arquivos, reescrita dos
+textos, opcionalmente padronização dos códigos de infração e, por fim,
+atualização dos md5sum.txt para os novos nomes.
+
+Cada execução é registrada em um RenameJournal: se for interrompida, a
+próxima execução do mesmo lote (mesmos nomes) retoma a partir da última
+operação confirmada, e undo_lot desfaz uma execução em ordem inversa.
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+from file_renamer import FileRenamer
+from text_file_editor import TextFileEditor
+from infraction_analyzer import InfractionAnalyzer
+from lot_inventory import LotInventory
+from progress import OperationCancelled
+from zip_ingest import ZipLotIngestor, ZipLotRepacker
+from rename_journal import RenameJournal, OP_CREATE, STAGE_DIRECTORY, STAGE_FILES, STAGE_TEXT, STAGE_CHECKSUM
+from md5_manifest import update_lot_manifests
+from utils import LotNumberUtils
+from instrumentation import activate, span, stage, end_stage
+from config import (
+    DEFAULT_WORKERS,
+    ZIP_STREAM_INGEST,
+    ZIP_READ_BUFFER_SIZE,
+    ZIP_EXTENSION,
+    RAR_EXTENSION,
+    JPG_EXTENSION,
+    RENAME_JOURNAL_ENABLED,
+    MD5_UPDATE_ENABLED
+)
+from log_manager import get_logger, StageCounters
+
+logger = get_logger('lot_pipeline')
+
+MIN_YEAR = 2000
+MAX_YEAR = 2100
+
+
+def validate_year(add_year: bool, year: Optional[str]) -> Optional[str]:
+    """
+    Valida o ano do código de infração (mesmas regras da interface).
+
+    Args:
+        add_year (bool): Se o ano deve ser adicionado
+        year (str): Ano informado
+
+    Returns:
+        Optional[str]: Ano normalizado, ou None se não for adicionado
+
+    Raises:
+        ValueError: Se o ano não for numérico ou estiver fora do intervalo
+    """
+    if not add_year:
+        return None
+    year = str(year).strip() if year is not None else ''
+    if not year:
+        return None
+    try:
+        year_int = int(year)
+    except ValueError:
+        raise ValueError("Ano deve ser um número válido")
+    if year_int < MIN_YEAR or year_int > MAX_YEAR:
+        raise ValueError(f"Ano deve estar entre {MIN_YEAR} e {MAX_YEAR}")
+    return year
+
+
+class LotRunResult:
+    """Resumo da execução de um lote (serializável em JSON)."""
+
+    def __init__(self, old_name: str, new_name: str):
+        self.old_name = old_name
+        self.new_name = new_name
+        self.success = False
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.resumed = False  # Execução interrompida retomada pelo diário
+        self.jpg_renamed = 0
+        self.text_files_written = 0
+        self.text_errors = 0
+        self.code_lines_changed = 0
+        self.md5_renamed = 0   # Entradas do md5sum.txt atualizadas para o novo nome
+        self.md5_updated = 0   # Entradas com MD5 recalculado (conteúdo alterado)
+        self.md5_missing = 0   # Entradas cujo arquivo não foi encontrado
+        self.md5_mismatched = 0  # MD5 diferente em arquivo não regravado (falha)
+        self.infraction_counts: Dict[str, int] = {}
+        self.output_path: Optional[str] = None  # .zip gerado (modo zip_output)
+        self.elapsed_seconds = 0.0
+        self.instrumentation: Optional[Dict[str, Any]] = None  # Resumo por etapa (se instrumentado)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'old_name': self.old_name,
+            'new_name': self.new_name,
+            'success': self.success,
+            'error': self.error,
+            'cancelled': self.cancelled,
+            'resumed': self.resumed,
+            'jpg_renamed': self.jpg_renamed,
+            'text_files_written': self.text_files_written,
+            'text_errors': self.text_errors,
+            'code_lines_changed': self.code_lines_changed,
+            'md5_renamed': self.md5_renamed,
+            'md5_updated': self.md5_updated,
+            'md5_missing': self.md5_missing,
+            'md5_mismatched': self.md5_mismatched,
+            'infraction_counts': dict(sorted(self.infraction_counts.items())),
+            'output_path': self.output_path,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'instrumentation': self.instrumentation,
+        }
+
+
+class LotPipeline:
+    """
+    Fluxo completo de renomeação de um lote, sem interface gráfica.
+
+    Cada instância usa seus próprios FileRenamer, TextFileEditor e
+    InfractionAnalyzer, de modo que lotes diferentes podem ser processados
+    em paralelo.
+    """
+
+    def __init__(self, directory: str, max_workers: int = DEFAULT_WORKERS):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.file_renamer = FileRenamer(directory)
+        self.text_file_editor = TextFileEditor(directory)
+        self.infraction_analyzer = InfractionAnalyzer(directory)
+        self.file_renamer.set_parallelism(max_workers)
+        self.text_file_editor.set_parallelism(max_workers)
+        self.inventory = None  # Inventário do lote após a execução
+        self.progress = None
+        self.stream_zip = ZIP_STREAM_INGEST  # Lotes .zip gravados direto no destino
+        self.zip_buffer_size = ZIP_READ_BUFFER_SIZE
+        self.zip_output = False  # Lotes .zip entregues como um novo .zip renomeado
+        self.journal_enabled = RENAME_JOURNAL_ENABLED
+        self.journal = None  # Diário da execução atual
+        self.md5_update = MD5_UPDATE_ENABLED  # Atualiza os md5sum.txt ao final
+        self.instrumentation = None  # Instrumentation opcional (tempo e E/S por etapa)
+        self.stage_counters = None   # StageCounters da última execução (resumos do log)
+
+    def run(
+        self,
+        old_name: str,
+        new_name: str,
+        year: Optional[str] = None,
+        add_year: bool = True,
+        infraction_code: Optional[str] = None,
+        progress=None
+    ) -> LotRunResult:
+        """
+        Renomeia um lote.
+
+        Args:
+            old_name (str): Nome atual do lote (diretório, .zip ou .rar)
+            new_name (str): Novo nome do lote
+            year (str): Ano adicionado ao código de infração
+            add_year (bool): Se deve adicionar o ano
+            infraction_code (str): Código para o qual todas as infrações são
+                padronizadas (None mantém os códigos)
+            progress (ProgressTracker): Progresso/cancelamento (opcional);
+                o cancelamento é atendido entre arquivos e entre etapas
+
+        Returns:
+            LotRunResult: Resumo da execução
+        """
+        result = LotRunResult(old_name, new_name)
+        self.progress = progress
+        self.file_renamer.set_progress(progress)
+        self.text_file_editor.set_progress(progress)
+        start = time.perf_counter()
+        self.stage_counters = StageCounters(f"{old_name} -> {new_name}")
+        with activate(self.instrumentation), self.stage_counters.activate(), \
+                span('LotPipeline.run', lot=old_name, new_lot=new_name):
+            try:
+                self._run(result, old_name, new_name, year, add_year, infraction_code)
+                if self.journal is not None:
+                    self.journal.finish()
+            except OperationCancelled as e:
+                result.cancelled = True
+                result.error = str(e)
+                logger.info(f"Lote {old_name}: {e}")
+            except Exception as e:
+                result.error = str(e)
+                logger.error(f"Erro ao processar lote {old_name}: {e}")
+            finally:
+                end_stage()
+                # Sem finish(), o diário fica aberto para a retomada
+                if self.journal is not None:
+                    self.journal.close()
+        result.elapsed_seconds = time.perf_counter() - start
+        report_instrumentation(result, self.instrumentation)
+        return result
+
+    def _run(self, result, old_name, new_name, year, add_year, infraction_code):
+        if not old_name or not new_name:
+            raise ValueError("Informe o lote e o novo nome")
+
+        year = validate_year(add_year, year)
+        add_year = bool(add_year and year)
+        self.file_renamer.set_year_config(add_year, year)
+        self.text_file_editor.set_year_config(add_year, year)
+
+        # A retomada vem antes da verificação: o lote antigo pode já ter sido renomeado
+        if self._open_journal(old_name, new_name):
+            if self._resume(result, old_name, new_name, infraction_code):
+                return
+
+        if not os.path.exists(os.path.join(self.directory, old_name)):
+            raise FileNotFoundError(f"Lote não encontrado: {old_name}")
+        if self.journal is not None:
+            self._start_journal()
+
+        # Lotes .zip/.rar: o número do lote vem do nome sem a extensão
+        lot_name = LotNumberUtils.strip_archive_extension(old_name)
+
+        if self.zip_output and old_name.endswith(ZIP_EXTENSION):
+            if self._run_zip_repack(result, old_name, lot_name, new_name, infraction_code):
+                return
+
+        if self.stream_zip and old_name.endswith(ZIP_EXTENSION):
+            if self._run_zip_ingest(result, old_name, lot_name, new_name, infraction_code):
+                return
+
+        self._enter_stage("Renomeando diretório", 1)
+
+        # Inventário único do lote (None enquanto compactado)
+        lot_inventory = LotInventory.from_directory(os.path.join(self.directory, old_name))
+        self.file_renamer.set_inventory(lot_inventory)
+
+        if not self.file_renamer.rename_directory(old_name, new_name):
+            raise RuntimeError("Falha ao renomear o lote. Verifique se o lote existe")
+        self._stage_done(STAGE_DIRECTORY)
+
+        if lot_inventory is None:
+            lot_inventory = LotInventory.from_directory(
+                self.file_renamer.get_lot_directory(old_name, new_name))
+            self.file_renamer.set_inventory(lot_inventory)
+        self.text_file_editor.set_inventory(lot_inventory)
+        self.infraction_analyzer.set_inventory(lot_inventory)
+        self.inventory = lot_inventory
+        self._advance()
+
+        self._enter_stage("Renomeando arquivos")
+        self.file_renamer.rename_files(lot_name, new_name)
+        result.jpg_renamed = len(self.file_renamer.last_jpg_renames)
+        self._check_cancelled()
+        self._stage_done(STAGE_FILES)
+
+        stage("Reescrevendo arquivos de texto")  # Progresso da etapa aberto pelo TextFileEditor
+        text_result = self.text_file_editor.rewrite_lot_text(
+            lot_name, new_name, target_code=infraction_code
+        )
+        self._check_cancelled()
+        self._stage_done(STAGE_TEXT)
+        self._apply_text_result(result, text_result)
+        self._update_checksums(result, lot_name, new_name, renames=self.file_renamer.last_renames,
+                               text_result=text_result)
+
+    def _update_checksums(self, result, old_name, new_name, lot_directory=None, renames=None,
+                          text_result=None, rewritten=None):
+        """
+        Atualiza os md5sum.txt do lote (após a reescrita dos textos). Com o
+        mapa das renomeações, só os textos regravados são relidos; sem ele
+        (retomada), todos os arquivos listados são conferidos. Só os textos
+        regravados (text_result ou rewritten) recebem um novo MD5.
+        """
+        if self.md5_update:
+            self._enter_stage("Atualizando md5sum")
+            if lot_directory is None:
+                lot_directory = self.file_renamer.get_lot_directory(old_name, new_name)
+            if rewritten is None and text_result is not None:
+                rewritten = [file_result.filename for file_result in text_result.files
+                             if file_result.written]
+            for manifest_result in update_lot_manifests(lot_directory, old_name, new_name, self.inventory,
+                                                        self.journal, self.max_workers, renames, rewritten):
+                apply_manifest_result(result, manifest_result)
+        self._stage_done(STAGE_CHECKSUM)
+
+    def _open_journal(self, old_name, new_name):
+        """
+        Carrega o diário do lote.
+
+        Returns:
+            bool: True se há uma execução interrompida a retomar
+        """
+        self.journal = None
+        if not self.journal_enabled:
+            return False
+        self.journal = RenameJournal(self.directory, old_name, new_name)
+        if not self.journal.exists():
+            return False
+        try:
+            self.journal.load()
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Diário de {old_name} ilegível, iniciando um novo: {e}")
+            return False
+        return self.journal.interrupted
+
+    def _start_journal(self):
+        """Inicia um diário novo (substitui o de uma execução anterior)."""
+        try:
+            self.journal.start()
+        except OSError as e:
+            # O diário é opcional: sem ele não há retomada nem undo
+            logger.warning(f"Não foi possível criar o diário de renomeação: {e}")
+            self.journal = None
+        self.file_renamer.set_journal(self.journal)
+        self.text_file_editor.set_journal(self.journal)
+
+    def _stage_done(self, stage):
+        if self.journal is not None:
+            self.journal.stage_done(stage)
+
+    def _resume(self, result, old_name, new_name, infraction_code):
+        """
+        Retoma uma execução interrompida: conclui as operações pendentes do
+        diário e refaz apenas as etapas não concluídas. Só os caminhos
+        registrados no diário são verificados (sem varrer o lote).
+
+        Returns:
+            bool: False se nada foi confirmado (a execução recomeça do zero)
+        """
+        journal = self.journal
+        pending = journal.complete_pending()
+        if not journal.completed():
+            logger.info(f"Lote {old_name}: execução anterior sem operações confirmadas, recomeçando")
+            return False
+
+        logger.info(f"Lote {old_name}: retomando execução interrompida "
+                    f"({len(journal.completed())} operação(ões) confirmada(s), {pending} pendente(s))")
+        result.resumed = True
+        lot_name = LotNumberUtils.strip_archive_extension(old_name)
+        self.file_renamer.set_journal(journal)
+        self.text_file_editor.set_journal(journal)
+
+        if STAGE_DIRECTORY not in journal.stages_done:
+            self._enter_stage("Renomeando diretório", 1)
+            if old_name == new_name:
+                self.file_renamer.rename_directory(old_name, new_name)
+            elif not old_name.endswith((ZIP_EXTENSION, RAR_EXTENSION)):
+                # Renomeação do diretório principal já confirmada; refaz os subdiretórios
+                self.file_renamer.update_internal_structure(
+                    new_name,
+                    LotNumberUtils.extract_numbers_from_name(old_name),
+                    LotNumberUtils.extract_numbers_from_name(new_name)
+                )
+            journal.stage_done(STAGE_DIRECTORY)
+            self._advance()
+
+        lot_inventory = LotInventory.from_directory(self.file_renamer.get_lot_directory(old_name, new_name))
+        self.file_renamer.set_inventory(lot_inventory)
+        self.text_file_editor.set_inventory(lot_inventory)
+        self.infraction_analyzer.set_inventory(lot_inventory)
+        self.inventory = lot_inventory
+
+        if STAGE_FILES not in journal.stages_done:
+            self._enter_stage("Renomeando arquivos")
+            # Com o plano de JPGs registrado, as pendências já foram concluídas acima
+            if not journal.jpg_planned:
+                self.file_renamer.rename_files(lot_name, new_name)
+            self._check_cancelled()
+            journal.stage_done(STAGE_FILES)
+        self.file_renamer.last_jpg_renames = {
+            source: target for source, target in journal.completed_renames().items()
+            if source.lower().endswith(JPG_EXTENSION)
+        }
+        result.jpg_renamed = len(self.file_renamer.last_jpg_renames)
+
+        if STAGE_TEXT not in journal.stages_done:
+            stage("Reescrevendo arquivos de texto")
+            text_result = self.text_file_editor.rewrite_lot_text(
+                lot_name, new_name, target_code=infraction_code
+            )
+            self._check_cancelled()
+            journal.stage_done(STAGE_TEXT)
+            self._apply_text_result(result, text_result)
+        else:
+            result.success = True
+        if STAGE_CHECKSUM not in journal.stages_done:
+            # Textos confirmados no diário (nesta execução ou na anterior) podem ter sido regravados
+            self._update_checksums(result, lot_name, new_name, rewritten=journal.rewritten_texts())
+        return True
+
+    def _run_zip_ingest(self, result, old_name, lot_name, new_name, infraction_code):
+        """
+        Renomeia um lote .zip gravando cada membro direto no caminho final.
+        old_name é o nome do arquivo (.zip) e lot_name, o nome do lote sem a
+        extensão (usado nas regras de renomeação).
+
+        Returns:
+            bool: False se o .zip exigir o fluxo tradicional (extração completa)
+        """
+        new_dir_path = os.path.join(self.directory, new_name)
+        if os.path.exists(new_dir_path):
+            logger.error("Erro: O diretório já existe.")
+            raise RuntimeError("Falha ao renomear o lote. Verifique se o lote existe")
+
+        self._check_cancelled()
+        text_pipeline = self.text_file_editor.build_lot_pipeline(
+            lot_name, new_name, target_code=infraction_code
+        )
+        ingestor = ZipLotIngestor(self.zip_buffer_size, self.progress)
+        create_operation = self._plan_create(new_dir_path)
+        ingest = ingestor.ingest(os.path.join(self.directory, old_name),
+                                 lot_name, new_name, new_dir_path, text_pipeline)
+        if ingest is None:
+            self._discard(create_operation)
+            return False
+        self._confirm_create(create_operation)
+
+        lot_inventory = LotInventory.from_directory(ingest.lot_directory)
+        self.file_renamer.set_inventory(lot_inventory)
+        self.text_file_editor.set_inventory(lot_inventory)
+        self.infraction_analyzer.set_inventory(lot_inventory)
+        self.inventory = lot_inventory
+        self.file_renamer.last_jpg_renames = ingest.jpg_renames
+        result.jpg_renamed = len(ingest.jpg_renames)
+        self._apply_text_result(result, ingest.text_result)
+        self._update_checksums(result, lot_name, new_name, ingest.lot_directory, ingest.renames,
+                               ingest.text_result)
+        return True
+
+    def _run_zip_repack(self, result, old_name, lot_name, new_name, infraction_code):
+        """
+        Gera o lote renomeado como um novo .zip, sem extrair no disco.
+        old_name é o nome do .zip de origem e lot_name, o nome do lote sem a
+        extensão (usado nas regras de renomeação).
+
+        Returns:
+            bool: False se o .zip exigir o fluxo tradicional (extração completa)
+        """
+        output_name = new_name if new_name.endswith(ZIP_EXTENSION) else new_name + ZIP_EXTENSION
+        output_path = os.path.join(self.directory, output_name)
+        if os.path.exists(output_path):
+            raise RuntimeError(f"O arquivo {output_name} já existe")
+
+        self._check_cancelled()
+        new_lot_name = os.path.splitext(output_name)[0]
+        text_pipeline = self.text_file_editor.build_lot_pipeline(
+            lot_name, new_lot_name, target_code=infraction_code
+        )
+        repacker = ZipLotRepacker(self.zip_buffer_size, self.progress)
+        create_operation = self._plan_create(output_path)
+        repack = repacker.repack(os.path.join(self.directory, old_name), output_path,
+                                 lot_name, new_lot_name, text_pipeline)
+        if repack is None:
+            self._discard(create_operation)
+            return False
+        self._confirm_create(create_operation)
+
+        self._stage_done(STAGE_CHECKSUM)  # md5sum.txt do .zip gerado não é atualizado
+        self.file_renamer.last_jpg_renames = repack.jpg_renames
+        result.output_path = repack.output_path
+        result.jpg_renamed = len(repack.jpg_renames)
+        self._apply_text_result(result, repack.text_result)
+        return True
+
+    def _plan_create(self, path):
+        if self.journal is None:
+            return None
+        return self.journal.plan(OP_CREATE, path)
+
+    def _confirm_create(self, operation):
+        if operation is not None:
+            self.journal.done(operation)
+            for stage_name in (STAGE_DIRECTORY, STAGE_FILES, STAGE_TEXT):
+                self.journal.stage_done(stage_name)
+
+    def _discard(self, operation):
+        if operation is not None:
+            self.journal.discard(operation)
+
+    def _apply_text_result(self, result, text_result):
+        result.text_files_written = text_result.files_written
+        result.text_errors = len(text_result.errors)
+        result.code_lines_changed = text_result.code_lines_changed
+        result.infraction_counts = text_result.infraction_counts
+        result.success = result.text_errors == 0
+        if not result.success:
+            result.error = f"{result.text_errors} arquivo(s) de texto com erro"
+
+    def _enter_stage(self, stage_name, planned=None):
+        self._check_cancelled()
+        stage(stage_name)
+        if self.progress is not None:
+            self.progress.set_stage(stage_name, planned)
+
+    def _advance(self):
+        if self.progress is not None:
+            self.progress.advance()
+
+    def _check_cancelled(self):
+        if self.progress is not None:
+            self.progress.check_cancelled()
+
+
+def apply_manifest_result(result: LotRunResult, manifest_result) -> None:
+    """
+    Soma o resultado de um md5sum.txt ao resumo do lote; erros e MD5
+    divergentes em arquivos não regravados falham a execução.
+    """
+    result.md5_renamed += manifest_result.renamed
+    result.md5_updated += len(manifest_result.updated)
+    result.md5_missing += len(manifest_result.missing)
+    result.md5_mismatched += len(manifest_result.mismatched)
+    if manifest_result.errors:
+        result.success = False
+        result.error = f"Erro ao atualizar {manifest_result.path}"
+    elif manifest_result.mismatched:
+        result.success = False
+        result.error = (f"MD5 diferente do registrado em {manifest_result.path}: "
+                        f"{', '.join(manifest_result.mismatched)}")
+
+
+def report_instrumentation(result: LotRunResult, instrumentation) -> None:
+    """Anexa o resumo da instrumentação ao resultado e registra a tabela no log."""
+    if instrumentation is None:
+        return
+    result.instrumentation = instrumentation.summary()
+    logger.info(f"Instrumentação do lote {result.old_name}:\n{instrumentation.format_summary()}")
+
+
+def undo_lot(directory: str, old_name: str, new_name: str) -> Dict[str, Any]:
+    """
+    Desfaz a última execução de um lote a partir do diário, em ordem
+    inversa (renomeações revertidas, textos restaurados das cópias e
+    diretórios/arquivos extraídos removidos). Uma execução interrompida
+    tem as pendências resolvidas antes.
+
+    Args:
+        directory (str): Diretório que contém os lotes
+        old_name (str): Nome original do lote
+        new_name (str): Novo nome usado na execução
+
+    Returns:
+        Dict[str, Any]: Resumo (undone, skipped, irreversible)
+
+    Raises:
+        FileNotFoundError: Se não houver diário para o lote
+        RuntimeError: Se a execução já tiver sido desfeita
+    """
+    journal = RenameJournal(directory, old_name, new_name)
+    if not journal.exists():
+        raise FileNotFoundError(f"Nenhum diário de renomeação para {old_name} -> {new_name}")
+    journal.load()
+    if journal.undone:
+        raise RuntimeError(f"A renomeação {old_name} -> {new_name} já foi desfeita")
+    if journal.interrupted:
+        journal.complete_pending()
+    summary = journal.undo()
+    logger.info(f"Renomeação {old_name} -> {new_name} desfeita: {summary['undone']} operação(ões), "
+                f"{summary['skipped']} ignorada(s), {summary['irreversible']} irreversível(is)")
+    return {'old_name': old_name, 'new_name': new_name, **summary}
@@ -0,0 +1,674 @@
+"""
+Plano de renomeação de um lote (simulação sem alterar o disco).
+
+O LotPlanner percorre o lote uma única vez (LotInventory) e reproduz em
+memória o que LotPipeline faria: renomeação do diretório, correção dos
+subdiretórios numéricos, renomeação dos arquivos e dos JPGs (mesmo plano de
+JpgRenamePlanner) e as linhas alteradas de cada arquivo de texto, inclusive
+a padronização dos códigos de infração. Os arquivos de texto são apenas
+lidos.
+
+O LotPlan resultante pode ser exportado em JSON ou como diff e depois
+executado pelo LotPlanExecutor sem recalcular nada: o executor confere se o
+lote ainda está como na simulação (tamanho/mtime dos textos e conteúdo de
+cada linha alterada) antes de aplicar as mudanças.
+"""
+
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import (
+    DEFAULT_WORKERS,
+    ZIP_EXTENSION,
+    RAR_EXTENSION,
+    MD5SUM_FILENAME,
+    MIN_DIRECTORY_LENGTH,
+    LOT_PLAN_VERSION,
+    RENAME_JOURNAL_ENABLED,
+    MD5_UPDATE_ENABLED
+)
+from utils import LotMatcher
+from lot_inventory import LotInventory
+from lot_pipeline import LotRunResult, validate_year, report_instrumentation, apply_manifest_result
+from progress import OperationCancelled
+from rename_planner import JpgRenamePlan, JpgRenamePlanner, JpgRenameExecutor, RenameMap, RenameOperation
+from rename_journal import RenameJournal, OP_MERGE, STAGE_DIRECTORY, STAGE_FILES, STAGE_TEXT, STAGE_CHECKSUM
+from md5_manifest import update_lot_manifests
+from text_file_editor import TextFileEditor
+from text_pipeline import TextFileResult
+from text_stream import iter_text_lines, SpooledTextWriter, sync_written_files
+from worker_pool import run_bounded
+from instrumentation import traced, activate, span, stage, end_stage, count, RENAMES
+from log_manager import get_logger, StageCounters
+
+logger = get_logger('lot_plan')
+
+# Tipos de operação do plano
+PLAN_RENAME = 'rename'  # os.rename(source, target)
+PLAN_MERGE = 'merge'    # Conteúdo de source movido para target (substitui o existente)
+
+
+class PlanError(Exception):
+    """Plano inválido ou desatualizado em relação ao disco."""
+
+
+class PlanOperation:
+    """Renomeação de diretório/arquivo ou mescla de diretórios."""
+
+    __slots__ = ('kind', 'source', 'target')
+
+    def __init__(self, kind: str, source: str, target: str):
+        self.kind = kind
+        self.source = source
+        self.target = target
+
+    def __repr__(self) -> str:
+        return f"PlanOperation({self.kind!r}, {self.source!r} -> {self.target!r})"
+
+
+class TextFileChange:
+    """Linhas alteradas de um arquivo de texto."""
+
+    def __init__(self, source: str, target: str, size: int = 0, mtime_ns: int = 0):
+        self.source = source    # Caminho atual (antes das renomeações)
+        self.target = target    # Caminho após as renomeações
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.lines = 0
+        self.code_lines_changed = 0
+        self.infraction_counts: Dict[str, int] = {}
+        self.changes: List[Tuple[int, str, str]] = []  # (índice da linha, original, nova)
+        self.error: Optional[str] = None
+
+
+class LotPlan:
+    """Todas as operações de uma renomeação de lote."""
+
+    def __init__(self, root: str, old_name: str, new_name: str, year: Optional[str] = None,
+                 infraction_code: Optional[str] = None):
+        self.root = root
+        self.old_name = old_name
+        self.new_name = new_name
+        self.year = year
+        self.infraction_code = infraction_code
+        self.lot_directory = os.path.join(root, new_name)
+        self.directory_operations: List[PlanOperation] = []
+        self.file_operations: List[PlanOperation] = []
+        self.jpg_plan = JpgRenamePlan()
+        self.skipped: List[Tuple[str, str, str]] = []  # (origem, destino, motivo)
+        self.text_files: List[TextFileChange] = []
+        self.errors: List[str] = []
+        self.elapsed_seconds = 0.0
+
+    @property
+    def executable(self) -> bool:
+        return not self.errors
+
+    @property
+    def changed_text_files(self) -> List[TextFileChange]:
+        return [text_file for text_file in self.text_files if text_file.changes and text_file.error is None]
+
+    def infraction_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for text_file in self.text_files:
+            for code, code_count in text_file.infraction_counts.items():
+                counts[code] = counts.get(code, 0) + code_count
+        return dict(sorted(counts.items()))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'directory_renames': len(self.directory_operations),
+            'file_renames': len(self.file_operations),
+            'jpg_renames': len(self.jpg_plan),
+            'skipped': len(self.skipped),
+            'text_files': len(self.text_files),
+            'text_files_changed': len(self.changed_text_files),
+            'lines_changed': sum(len(text_file.changes) for text_file in self.text_files),
+            'code_lines_changed': sum(text_file.code_lines_changed for text_file in self.text_files),
+            'text_errors': sum(1 for text_file in self.text_files if text_file.error is not None),
+            'infraction_counts': self.infraction_counts(),
+        }
+
+    # ------------------------------------------------------------------
+    # Exportação
+    # ------------------------------------------------------------------
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root)
+
+    def _absolute(self, path: str) -> str:
+        return os.path.join(self.root, path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plano serializável em JSON (caminhos relativos à raiz)."""
+        relative = self._relative
+        return {
+            'version': LOT_PLAN_VERSION,
+            'root': self.root,
+            'old_name': self.old_name,
+            'new_name': self.new_name,
+            'year': self.year,
+            'infraction_code': self.infraction_code,
+            'lot_directory': relative(self.lot_directory),
+            'executable': self.executable,
+            'errors': list(self.errors),
+            'summary': self.summary(),
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'directory_operations': [[operation.kind, relative(operation.source), relative(operation.target)]
+                                     for operation in self.directory_operations],
+            'file_operations': [[relative(operation.source), relative(operation.target)]
+                                for operation in self.file_operations],
+            'jpg_stages': [[[relative(operation.source), relative(operation.target), operation.temporary]
+                            for operation in stage] for stage in self.jpg_plan.stages],
+            'skipped': [[relative(source), relative(target), reason] for source, target, reason in self.skipped],
+            'text_files': [{
+                'source': relative(text_file.source),
+                'target': relative(text_file.target),
+                'size': text_file.size,
+                'mtime_ns': text_file.mtime_ns,
+                'lines': text_file.lines,
+                'code_lines_changed': text_file.code_lines_changed,
+                'infraction_counts': dict(sorted(text_file.infraction_counts.items())),
+                'changes': [list(change) for change in text_file.changes],
+                'error': text_file.error,
+            } for text_file in self.text_files],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LotPlan':
+        """
+        Reconstrói um plano exportado por to_dict.
+
+        Raises:
+            PlanError: Se a versão do formato for diferente
+        """
+        if data.get('version') != LOT_PLAN_VERSION:
+            raise PlanError(f"Versão de plano não suportada: {data.get('version')}")
+        plan = cls(data['root'], data['old_name'], data['new_name'], data.get('year'),
+                   data.get('infraction_code'))
+        absolute = plan._absolute
+        plan.lot_directory = absolute(data['lot_directory'])
+        plan.errors = list(data.get('errors', []))
+        plan.directory_operations = [PlanOperation(kind, absolute(source), absolute(target))
+                                     for kind, source, target in data.get('directory_operations', [])]
+        plan.file_operations = [PlanOperation(PLAN_RENAME, absolute(source), absolute(target))
+                                for source, target in data.get('file_operations', [])]
+        plan.jpg_plan.stages = [[RenameOperation(absolute(source), absolute(target), temporary)
+                                 for source, target, temporary in stage]
+                                for stage in data.get('jpg_stages', [])]
+        plan.jpg_plan.mapping = _final_renames(plan.jpg_plan.operations)
+        plan.skipped = [(absolute(source), absolute(target), reason)
+                        for source, target, reason in data.get('skipped', [])]
+        for item in data.get('text_files', []):
+            text_file = TextFileChange(absolute(item['source']), absolute(item['target']),
+                                       item.get('size', 0), item.get('mtime_ns', 0))
+            text_file.lines = item.get('lines', 0)
+            text_file.code_lines_changed = item.get('code_lines_changed', 0)
+            text_file.infraction_counts = dict(item.get('infraction_counts', {}))
+            text_file.changes = [(index, old_line, new_line) for index, old_line, new_line in item.get('changes', [])]
+            text_file.error = item.get('error')
+            plan.text_files.append(text_file)
+        return plan
+
+    def to_diff(self) -> str:
+        """
+        Plano em formato de diff unificado: renomeações como cabeçalhos
+        'rename from/to' e um bloco @@ por linha de texto alterada.
+        """
+        relative = self._relative
+        output = []
+        for operation in self.directory_operations + self.file_operations:
+            output.append(f"diff --operalote a/{relative(operation.source)} b/{relative(operation.target)}\n")
+            output.append(f"{operation.kind} from {relative(operation.source)}\n")
+            output.append(f"{operation.kind} to {relative(operation.target)}\n")
+        for source, target in self.jpg_plan.mapping.items():
+            output.append(f"diff --operalote a/{relative(source)} b/{relative(target)}\n")
+            output.append(f"rename from {relative(source)}\n")
+            output.append(f"rename to {relative(target)}\n")
+        for text_file in self.changed_text_files:
+            output.append(f"--- a/{relative(text_file.source)}\n")
+            output.append(f"+++ b/{relative(text_file.target)}\n")
+            for index, old_line, new_line in text_file.changes:
+                output.append(f"@@ -{index + 1} +{index + 1} @@\n")
+                output.extend(_diff_line('-', old_line))
+                output.extend(_diff_line('+', new_line))
+        return ''.join(output)
+
+
+def _diff_line(prefix: str, line: str) -> List[str]:
+    if line.endswith('\n'):
+        return [prefix + line]
+    return [prefix + line + '\n', "\\ No newline at end of file\n"]
+
+
+def _final_renames(operations: List[RenameOperation]) -> Dict[str, str]:
+    """Origem -> destino final das operações de um plano de JPGs (sem os temporários)."""
+    mapping: Dict[str, str] = {}
+    origins: Dict[str, str] = {}
+    for operation in operations:
+        origin = origins.pop(operation.source, operation.source)
+        if operation.temporary:
+            origins[operation.target] = origin
+        else:
+            mapping[origin] = operation.target
+    return mapping
+
+
+class LotPlanner:
+    """
+    Simula a renomeação de um lote sobre o inventário em memória (mesmas
+    regras de FileRenamer, JpgRenamePlanner e TextFileEditor).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    @traced()
+    def plan(
+        self,
+        old_name: str,
+        new_name: str,
+        year: Optional[str] = None,
+        add_year: bool = True,
+        infraction_code: Optional[str] = None
+    ) -> LotPlan:
+        """
+        Monta o plano de um lote sem alterar o disco.
+
+        Args:
+            old_name (str): Nome atual do lote (diretório)
+            new_name (str): Novo nome do lote
+            year (str): Ano adicionado ao código de infração
+            add_year (bool): Se deve adicionar o ano
+            infraction_code (str): Código para o qual todas as infrações são
+                padronizadas (None mantém os códigos)
+
+        Returns:
+            LotPlan: Plano (com errors preenchido se não for executável)
+
+        Raises:
+            ValueError: Se o ano for inválido
+        """
+        start = time.perf_counter()
+        year = validate_year(add_year, year)
+        plan = LotPlan(self.directory, old_name, new_name, year, infraction_code)
+        self._plan(plan, old_name, new_name, infraction_code)
+        plan.elapsed_seconds = time.perf_counter() - start
+        return plan
+
+    def _plan(self, plan, old_name, new_name, infraction_code):
+        source_directory = os.path.join(self.directory, old_name)
+        target_directory = os.path.join(self.directory, new_name)
+        if not os.path.isdir(source_directory):
+            if old_name.endswith((ZIP_EXTENSION, RAR_EXTENSION)) and os.path.exists(source_directory):
+                plan.errors.append(f"Lote compactado não suportado no plano: {old_name}")
+            else:
+                plan.errors.append(f"Lote não encontrado: {old_name}")
+            return
+        if old_name != new_name and os.path.exists(target_directory):
+            plan.errors.append(f"O diretório já existe: {new_name}")
+            return
+
+        inventory = LotInventory.from_directory(source_directory)
+        archives = inventory.get_files(ZIP_EXTENSION) + inventory.get_files(RAR_EXTENSION)
+        if archives:
+            plan.errors.append(f"O lote contém arquivos compactados: {self._relative(archives[0])}")
+            return
+
+        # Textos: caminho final -> caminho atual (para ler o conteúdo original)
+        origins = {path: path for path in inventory.get_files('.txt')}
+        matcher = LotMatcher(old_name, new_name)
+
+        if old_name == new_name:
+            plan.lot_directory = source_directory
+        else:
+            self._rename_directory(plan, inventory, origins, source_directory, target_directory)
+        self._fix_subdirectories(plan, inventory, origins, matcher, old_name != new_name)
+        listed_files, jpg_candidates = self._rename_files(plan, inventory, origins, matcher)
+        self._plan_jpg_renames(plan, inventory, matcher, jpg_candidates, listed_files)
+        self._plan_text_changes(plan, inventory, origins, old_name, new_name, infraction_code)
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.directory)
+
+    # ------------------------------------------------------------------
+    # Diretórios (FileRenamer.rename_directory e _fix_subdirectories)
+    # ------------------------------------------------------------------
+
+    def _rename_directory(self, plan, inventory, origins, source, target):
+        plan.directory_operations.append(PlanOperation(PLAN_RENAME, source, target))
+        inventory.rename_directory(source, target)
+        _relocate(origins, source, target)
+        plan.lot_directory = target
+
+    def _fix_subdirectories(self, plan, inventory, origins, matcher, renamed):
+        """
+        Subdiretórios numéricos passam para o número novo: primeiro o do
+        número antigo (update_internal_structure), depois os demais.
+        """
+        lot_directory = plan.lot_directory
+        expected_number = matcher.new_padded
+        subdirectories = [name for name in inventory.get_subdirectories(lot_directory)
+                          if name.isdigit() and len(name) >= MIN_DIRECTORY_LENGTH
+                          and name != expected_number]
+        if renamed and matcher.old_padded in subdirectories:
+            subdirectories.remove(matcher.old_padded)
+            subdirectories.insert(0, matcher.old_padded)
+
+        target = os.path.join(lot_directory, expected_number)
+        for name in subdirectories:
+            source = os.path.join(lot_directory, name)
+            if inventory.exists(target):
+                plan.directory_operations.append(PlanOperation(PLAN_MERGE, source, target))
+                for child in inventory.listdir(source):
+                    child_target = os.path.join(target, child)
+                    _discard_tree(origins, child_target)
+                    if inventory.exists(child_target):
+                        inventory.remove(child_target)
+                    self._move(inventory, os.path.join(source, child), child_target)
+                    _relocate(origins, os.path.join(source, child), child_target)
+                inventory.remove(source)
+            else:
+                plan.directory_operations.append(PlanOperation(PLAN_RENAME, source, target))
+                inventory.rename_directory(source, target)
+                _relocate(origins, source, target)
+
+    @staticmethod
+    def _move(inventory, source, target):
+        if inventory.isdir(source):
+            inventory.rename_directory(source, target)
+        else:
+            inventory.rename_file(source, target)
+
+    # ------------------------------------------------------------------
+    # Arquivos (FileRenamer.rename_files)
+    # ------------------------------------------------------------------
+
+    def _rename_files(self, plan, inventory, origins, matcher):
+        listed_files = []
+        jpg_candidates = []
+        for search_dir in inventory.get_directories():
+            directory_files = inventory.get_files_in(search_dir)
+            listed_files.extend(directory_files)
+            for filename in directory_files:
+                new_filename = matcher.match(filename)
+                if new_filename is None:
+                    continue
+                if matcher.is_jpg(filename):
+                    jpg_candidates.append(filename)
+                    continue
+                target = os.path.join(search_dir, new_filename)
+                if target == filename:
+                    continue
+                if inventory.exists(target):
+                    plan.skipped.append((filename, target, 'file_exists'))
+                    continue
+                plan.file_operations.append(PlanOperation(PLAN_RENAME, filename, target))
+                inventory.rename_file(filename, target)
+                if filename in origins:
+                    origins[target] = origins.pop(filename)
+        return listed_files, jpg_candidates
+
+    def _plan_jpg_renames(self, plan, inventory, matcher, jpg_candidates, listed_files):
+        if not jpg_candidates:
+            return
+        plan.jpg_plan = JpgRenamePlanner.plan(jpg_candidates, matcher.old_number, matcher.new_number,
+                                              listed_files)
+        plan.skipped.extend(plan.jpg_plan.skipped)
+        # As etapas garantem que o destino de cada operação já está livre
+        for operation in plan.jpg_plan.operations:
+            inventory.rename_file(operation.source, operation.target)
+
+    # ------------------------------------------------------------------
+    # Textos (TextFileEditor.rewrite_lot_text)
+    # ------------------------------------------------------------------
+
+    def _plan_text_changes(self, plan, inventory, origins, old_name, new_name, infraction_code):
+        editor = TextFileEditor(self.directory)
+        editor.set_year_config(plan.year is not None, plan.year)
+        pipeline = editor.build_lot_pipeline(old_name, new_name, target_code=infraction_code)
+        # Mesmos arquivos de rewrite_lot_text: .txt em qualquer profundidade
+        for filename in inventory.get_files('.txt'):
+            if os.path.basename(filename).lower() == MD5SUM_FILENAME:
+                continue
+            entry = inventory.get_entry(filename)
+            text_file = TextFileChange(origins.get(filename, filename), filename, entry.size, entry.mtime_ns)
+            file_result = TextFileResult(filename)
+            try:
+                for index, line in enumerate(iter_text_lines(text_file.source)):
+                    new_line = pipeline.process_line(line, file_result)
+                    if new_line != line:
+                        text_file.changes.append((index, line, new_line))
+                    text_file.lines += 1
+            except Exception as e:
+                logger.error(f"Erro ao processar arquivo {text_file.source}: {e}")
+                text_file.changes = []
+                text_file.error = str(e)
+            else:
+                text_file.code_lines_changed = file_result.code_lines_changed
+                text_file.infraction_counts = dict(file_result.infraction_counts)
+            plan.text_files.append(text_file)
+
+
+def _relocate(origins: Dict[str, str], source: str, target: str) -> None:
+    """Atualiza os caminhos finais dos textos após mover source para target."""
+    prefix = source + os.sep
+    for path in [path for path in origins if path == source or path.startswith(prefix)]:
+        origins[target + path[len(source):]] = origins.pop(path)
+
+
+def _discard_tree(origins: Dict[str, str], path: str) -> None:
+    prefix = path + os.sep
+    for key in [key for key in origins if key == path or key.startswith(prefix)]:
+        del origins[key]
+
+
+class LotPlanExecutor:
+    """
+    Executa um LotPlan: renomeações na ordem do plano, JPGs em paralelo por
+    etapa e regravação apenas das linhas previstas. Usa o mesmo diário de
+    LotPipeline (retomada e undo).
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, progress=None):
+        self.max_workers = max(1, int(max_workers))
+        self.progress = progress
+        self.journal_enabled = RENAME_JOURNAL_ENABLED
+        self.journal = None
+        self.md5_update = MD5_UPDATE_ENABLED
+        self.instrumentation = None  # Instrumentation opcional (tempo e E/S por etapa)
+        self.stage_counters = None   # StageCounters da última execução (resumos do log)
+
+    def execute(self, plan: LotPlan) -> LotRunResult:
+        """
+        Executa o plano.
+
+        Args:
+            plan (LotPlan): Plano de LotPlanner.plan (ou LotPlan.from_dict)
+
+        Returns:
+            LotRunResult: Resumo da execução
+        """
+        result = LotRunResult(plan.old_name, plan.new_name)
+        start = time.perf_counter()
+        self.stage_counters = StageCounters(f"{plan.old_name} -> {plan.new_name}")
+        with activate(self.instrumentation), self.stage_counters.activate(), \
+                span('LotPlanExecutor.execute', lot=plan.old_name, new_lot=plan.new_name):
+            try:
+                self._execute(plan, result)
+                if self.journal is not None:
+                    self.journal.finish()
+            except OperationCancelled as e:
+                result.cancelled = True
+                result.error = str(e)
+                logger.info(f"Lote {plan.old_name}: {e}")
+            except Exception as e:
+                result.error = str(e)
+                logger.error(f"Erro ao executar o plano do lote {plan.old_name}: {e}")
+            finally:
+                end_stage()
+                if self.journal is not None:
+                    self.journal.close()
+        result.elapsed_seconds = time.perf_counter() - start
+        report_instrumentation(result, self.instrumentation)
+        return result
+
+    def _execute(self, plan, result):
+        if plan.errors:
+            raise PlanError(plan.errors[0])
+        self._check_current(plan)
+        self._start_journal(plan)
+
+        renames = RenameMap()
+        self._set_stage("Renomeando diretório", len(plan.directory_operations))
+        for operation in plan.directory_operations:
+            if operation.kind == PLAN_MERGE:
+                self._merge(operation.source, operation.target)
+            else:
+                self._rename(operation.source, operation.target)
+            renames.add_directory(operation.source, operation.target, merged=operation.kind == PLAN_MERGE)
+            self._advance()
+        self._stage_done(STAGE_DIRECTORY)
+
+        self._set_stage("Renomeando arquivos", len(plan.file_operations))
+        for operation in plan.file_operations:
+            self._rename(operation.source, operation.target)
+            renames.add_file(operation.source, operation.target)
+            self._advance()
+        if plan.jpg_plan.stages:
+            self._set_stage("Renomeando imagens", len(plan.jpg_plan))
+            executor = JpgRenameExecutor(self.max_workers, None, self.progress, self.journal)
+            jpg_renames = executor.execute(plan.jpg_plan)
+            renames.add_files(jpg_renames)
+            result.jpg_renamed = len(jpg_renames)
+        self._check_cancelled()
+        self._stage_done(STAGE_FILES)
+
+        written = self._rewrite_texts(plan, result)
+        self._check_cancelled()
+        self._stage_done(STAGE_TEXT)
+
+        # Os md5sum.txt não fazem parte do plano: seguem as renomeações feitas acima
+        if self.md5_update:
+            self._set_stage("Atualizando md5sum")
+            for manifest_result in update_lot_manifests(plan.lot_directory, plan.old_name, plan.new_name,
+                                                        journal=self.journal, max_workers=self.max_workers,
+                                                        renames=renames, rewritten=written):
+                apply_manifest_result(result, manifest_result)
+        self._stage_done(STAGE_CHECKSUM)
+
+    def _check_current(self, plan):
+        """Confere se o lote ainda está como na simulação."""
+        source = os.path.join(plan.root, plan.old_name)
+        if not os.path.isdir(source):
+            raise PlanError(f"Lote não encontrado: {plan.old_name}")
+        if plan.old_name != plan.new_name and os.path.exists(os.path.join(plan.root, plan.new_name)):
+            raise PlanError(f"O diretório já existe: {plan.new_name}")
+        for text_file in plan.changed_text_files:
+            stat_result = os.stat(text_file.source)
+            if stat_result.st_size != text_file.size or stat_result.st_mtime_ns != text_file.mtime_ns:
+                raise PlanError(f"Plano desatualizado: {text_file.source} foi alterado")
+
+    def _rewrite_texts(self, plan, result):
+        text_files = plan.changed_text_files
+        self._set_stage("Reescrevendo arquivos de texto", len(text_files))
+        journal_operations = []
+        if self.journal is not None:
+            journal_operations = self.journal.backup_texts([text_file.target for text_file in text_files])
+        should_stop = (lambda: self.progress.cancelled) if self.progress is not None else None
+        written = []
+        errors = 0
+        for index, (text_file, _, error) in enumerate(run_bounded(self._apply_text_changes, text_files,
+                                                                  self.max_workers, should_stop=should_stop)):
+            if error is not None:
+                errors += 1
+                logger.error(f"Erro ao processar arquivo {text_file.target}: {error}")
+            else:
+                written.append(text_file.target)
+            self._advance(failed=1 if error is not None else 0)
+        sync_written_files(written)
+        if self.journal is not None:
+            done = set(written)
+            for text_file, operation in zip(text_files, journal_operations):
+                if text_file.target in done:
+                    self.journal.done(operation)
+
+        result.text_files_written = len(written)
+        result.text_errors = errors + sum(1 for text_file in plan.text_files if text_file.error is not None)
+        result.code_lines_changed = sum(text_file.code_lines_changed for text_file in plan.text_files)
+        result.infraction_counts = plan.infraction_counts()
+        result.success = result.text_errors == 0
+        if not result.success:
+            result.error = f"{result.text_errors} arquivo(s) de texto com erro"
+        return written
+
+    @staticmethod
+    def _apply_text_changes(text_file: TextFileChange) -> None:
+        """Regrava um arquivo trocando apenas as linhas previstas no plano."""
+        changes = {index: (old_line, new_line) for index, old_line, new_line in text_file.changes}
+        with SpooledTextWriter(text_file.target) as writer:
+            for index, line in enumerate(iter_text_lines(text_file.target)):
+                change = changes.get(index)
+                if change is None:
+                    writer.write(line)
+                    continue
+                if line != change[0]:
+                    raise PlanError(f"linha {index + 1} diferente da simulada")
+                writer.write(change[1])
+            writer.commit()
+
+    # ------------------------------------------------------------------
+    # Operações no disco
+    # ------------------------------------------------------------------
+
+    def _start_journal(self, plan):
+        if not self.journal_enabled:
+            return
+        journal = RenameJournal(plan.root, plan.old_name, plan.new_name)
+        try:
+            journal.start()
+        except OSError as e:
+            logger.warning(f"Não foi possível criar o diário de renomeação: {e}")
+            return
+        self.journal = journal
+
+    def _stage_done(self, stage):
+        if self.journal is not None:
+            self.journal.stage_done(stage)
+
+    def _rename(self, source, target):
+        if self.journal is not None:
+            self.journal.rename(source, target)
+        else:
+            os.rename(source, target)
+        count(RENAMES)
+
+    def _merge(self, source, target):
+        """Equivalente a FileRenamer._move_directory_content + remoção da origem."""
+        os.makedirs(target, exist_ok=True)
+        for item in os.listdir(source):
+            item_target = os.path.join(target, item)
+            if os.path.isdir(item_target):
+                shutil.rmtree(item_target)
+            elif os.path.exists(item_target):
+                os.remove(item_target)
+            shutil.move(os.path.join(source, item), item_target)
+            count(RENAMES)
+        os.rmdir(source)
+        if self.journal is not None:
+            self.journal.record(OP_MERGE, source, target)
+
+    def _set_stage(self, stage_name, planned=None):
+        self._check_cancelled()
+        stage(stage_name)
+        if self.progress is not None:
+            self.progress.set_stage(stage_name, planned)
+
+    def _advance(self, failed=0):
+        if self.progress is not None:
+            self.progress.advance(failed=failed)
+
+    def _check_cancelled(self):
+        if self.progress is not None:
+            self.progress.check_cancelled()
@@ -0,0 +1,496 @@
+"""
+Monitoramento do diretório de lotes (operalote.py watch).
+
+Os lotes chegam continuamente dos equipamentos de campo. O LotWatcher
+detecta cada lote novo (pasta, .zip ou .rar) no diretório monitorado,
+espera até que seus arquivos parem de mudar (debounce), escolhe o novo
+nome pelas regras (WatchRule) e processa o lote com LotPipeline, com um
+número limitado de lotes ao mesmo tempo.
+
+No Linux as alterações são recebidas por inotify (via ctypes); nos demais
+sistemas, ou se o inotify não estiver disponível, o diretório é varrido
+periodicamente e cada lote pendente é comparado pela assinatura (número
+de arquivos, tamanho total e última modificação).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from config import (
+    DEFAULT_WORKERS, ZIP_EXTENSION, RAR_EXTENSION,
+    WATCH_DEBOUNCE_SECONDS, WATCH_POLL_INTERVAL, WATCH_USE_INOTIFY, WATCH_IGNORED_SUFFIXES
+)
+from lot_pipeline import LotPipeline
+from log_manager import get_logger
+
+logger = get_logger('lot_watcher')
+
+# Eventos do inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+_READ_SIZE = 64 * 1024
+
+
+class WatchRule:
+    """
+    Regra de renomeação de lotes recebidos: o nome do lote (sem .zip/.rar)
+    deve casar por inteiro com pattern; new_lot é montado com str.format a
+    partir dos grupos da expressão ({0}, {1}..., grupos nomeados) e de
+    {name}, o nome do lote.
+
+    Ex.: pattern 'L(?P<numero>\\d{5})' e new_lot 'R{numero}' levam L00125 a R00125.
+    """
+
+    def __init__(self, pattern: str, new_lot: str, year: Optional[str] = None, add_year: bool = True,
+                 infraction_code: Optional[str] = None):
+        self.pattern = re.compile(pattern)
+        self.new_lot = new_lot
+        self.year = year
+        self.add_year = add_year
+        self.infraction_code = infraction_code
+
+    def match(self, lot_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Aplica a regra a um lote.
+
+        Args:
+            lot_name (str): Nome do lote no diretório (com extensão, se houver)
+
+        Returns:
+            Optional[Dict[str, Any]]: Linha no formato do manifesto de
+                'batch' (old_lot, new_lot, year, add_year, infraction_code),
+                ou None se o lote não casar com a regra
+
+        Raises:
+            ValueError: Se new_lot usar um grupo inexistente
+        """
+        stem = _lot_stem(lot_name)
+        match = self.pattern.fullmatch(stem)
+        if match is None:
+            return None
+        try:
+            new_lot = self.new_lot.format(*match.groups(), name=stem, **match.groupdict())
+        except (IndexError, KeyError) as e:
+            raise ValueError(f"new_lot inválido na regra {self.pattern.pattern}: {e}") from e
+        return {
+            'old_lot': lot_name,
+            'new_lot': new_lot,
+            'year': self.year,
+            'add_year': self.add_year,
+            'infraction_code': self.infraction_code,
+        }
+
+
+def _lot_stem(lot_name: str) -> str:
+    if lot_name.lower().endswith((ZIP_EXTENSION, RAR_EXTENSION)):
+        return os.path.splitext(lot_name)[0]
+    return lot_name
+
+
+def lot_signature(path: str) -> Tuple[int, int, int]:
+    """
+    Assinatura de um lote: (arquivos, bytes, última modificação em ns).
+    Muda sempre que um arquivo é criado, removido ou gravado.
+    """
+    if not os.path.isdir(path):
+        stat_result = os.stat(path)
+        return 1, stat_result.st_size, stat_result.st_mtime_ns
+    files = size = latest = 0
+    for root, directories, names in os.walk(path):
+        for name in directories:
+            latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+        for name in names:
+            try:
+                stat_result = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            files += 1
+            size += stat_result.st_size
+            latest = max(latest, stat_result.st_mtime_ns)
+    return files, size, latest
+
+
+class PollingMonitor:
+    """Sem notificações: cada espera termina com 'tudo pode ter mudado'."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def watch_lot(self, lot_name: str) -> None:
+        pass
+
+    def unwatch_lot(self, lot_name: str) -> None:
+        pass
+
+    def wait(self, timeout: float, stop_event: threading.Event) -> Optional[Set[str]]:
+        """
+        Returns:
+            Optional[Set[str]]: Lotes alterados, ou None se é preciso varrer
+                o diretório e conferir as assinaturas
+        """
+        stop_event.wait(timeout)
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyMonitor:
+    """
+    Notificações do inotify (Linux) para o diretório monitorado e para a
+    árvore de cada lote pendente.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise _errno_error("inotify_init1")
+        self._watches: Dict[int, Tuple[Optional[str], str]] = {}  # wd -> (lote, diretório)
+        self._lot_watches: Dict[str, Set[int]] = {}
+        try:
+            self._add_watch(None, self.root)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, lot_name: Optional[str], directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise _errno_error(f"inotify_add_watch({directory})")
+        self._watches[wd] = (lot_name, directory)
+        if lot_name is not None:
+            self._lot_watches.setdefault(lot_name, set()).add(wd)
+
+    def _watch_tree(self, lot_name: str, directory: str) -> None:
+        for root, _, _ in os.walk(directory):
+            try:
+                self._add_watch(lot_name, root)
+            except OSError as e:
+                # Subdiretório removido durante a varredura ou limite de watches
+                logger.debug(f"Não foi possível monitorar {root}: {e}")
+
+    def watch_lot(self, lot_name: str) -> None:
+        """Monitora a árvore de um lote (pastas; .zip/.rar são vistos pela raiz)."""
+        path = os.path.join(self.root, lot_name)
+        if os.path.isdir(path):
+            self._watch_tree(lot_name, path)
+
+    def unwatch_lot(self, lot_name: str) -> None:
+        for wd in self._lot_watches.pop(lot_name, ()):
+            self._watches.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def wait(self, timeout: float, stop_event: threading.Event) -> Optional[Set[str]]:
+        """
+        Returns:
+            Optional[Set[str]]: Nomes alterados na raiz e lotes com alteração
+                na árvore, ou None se houve estouro da fila do inotify
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[str] = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+                                   .rstrip(b'\0'))
+                offset += _EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    watch = self._watches.pop(wd, None)
+                    if watch is not None and watch[0] is not None:
+                        self._lot_watches.get(watch[0], set()).discard(wd)
+                    continue
+                watch = self._watches.get(wd)
+                if watch is None:
+                    continue
+                lot_name, directory = watch
+                if lot_name is None:
+                    if name:
+                        changed.add(name)
+                    continue
+                changed.add(lot_name)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Subdiretório novo: pode já ter conteúdo antes do watch
+                    self._watch_tree(lot_name, os.path.join(directory, name))
+        return None if overflow else changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _load_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _errno_error(function: str) -> OSError:
+    error = ctypes.get_errno()
+    return OSError(error, f"{function}: {os.strerror(error)}")
+
+
+def create_monitor(root: str, use_inotify: bool = WATCH_USE_INOTIFY):
+    """InotifyMonitor quando disponível; caso contrário, PollingMonitor."""
+    if use_inotify and hasattr(select, 'select') and os.name == 'posix':
+        try:
+            return InotifyMonitor(root)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify indisponível, usando varredura periódica: {e}")
+    return PollingMonitor(root)
+
+
+class _PendingLot:
+    """Lote aguardando o fim das alterações."""
+
+    __slots__ = ('name', 'row', 'signature', 'last_change')
+
+    def __init__(self, name: str, row: Dict[str, Any], signature, now: float):
+        self.name = name
+        self.row = row
+        self.signature = signature
+        self.last_change = now
+
+
+class LotWatcher:
+    """
+    Serviço de monitoramento: detecta, aguarda e processa os lotes que
+    chegam ao diretório.
+    """
+
+    def __init__(self, root: str, rules: List[WatchRule], lot_workers: int = 1,
+                 file_workers: int = DEFAULT_WORKERS, debounce: float = WATCH_DEBOUNCE_SECONDS,
+                 poll_interval: float = WATCH_POLL_INTERVAL, use_inotify: bool = WATCH_USE_INOTIFY,
+                 process_existing: bool = False, zip_output: bool = False,
+                 on_result: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.root = root
+        self.rules = rules
+        self.lot_workers = max(lot_workers, 1)
+        self.file_workers = file_workers
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.process_existing = process_existing
+        self.zip_output = zip_output
+        self.on_result = on_result  # Chamado (em outra thread) ao terminar cada lote
+        self.results: List[Dict[str, Any]] = []
+        self.unmatched: List[str] = []
+        self._pending: Dict[str, _PendingLot] = {}
+        self._ignored: Set[str] = set()  # Lotes já vistos: processados, gerados ou sem regra
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Pede o fim do monitoramento (os lotes em andamento terminam)."""
+        self._stop.set()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Monitora o diretório até stop() (ou Ctrl+C).
+
+        Returns:
+            Dict[str, Any]: Resumo no formato de 'batch', mais os lotes sem
+                regra e os que ainda aguardavam o fim das alterações
+        """
+        start = time.perf_counter()
+        monitor = create_monitor(self.root, self.use_inotify)
+        mode = 'inotify' if isinstance(monitor, InotifyMonitor) else 'varredura'
+        logger.info(f"Monitorando {self.root} ({mode}, debounce de {self.debounce:g}s, "
+                    f"{self.lot_workers} lote(s) ao mesmo tempo)")
+        if not self.process_existing:
+            self._ignored.update(self._list_lots())
+        executor = ThreadPoolExecutor(max_workers=self.lot_workers)
+        try:
+            changed: Optional[Set[str]] = None  # Primeira passada: varre tudo
+            while not self._stop.is_set():
+                self._update(monitor, changed)
+                self._dispatch(monitor, executor)
+                changed = monitor.wait(self._next_timeout(), self._stop)
+        except KeyboardInterrupt:
+            logger.info("Monitoramento interrompido")
+        finally:
+            monitor.close()
+            if self._running:
+                logger.info(f"Aguardando {len(self._running)} lote(s) em andamento")
+            executor.shutdown(wait=True)
+
+        with self._lock:
+            lots = list(self.results)
+        succeeded = sum(1 for lot in lots if lot['success'])
+        return {
+            'root': self.root,
+            'total': len(lots),
+            'succeeded': succeeded,
+            'failed': len(lots) - succeeded,
+            'elapsed_seconds': round(time.perf_counter() - start, 3),
+            'lots': lots,
+            'unmatched': list(self.unmatched),
+            'pending': sorted(self._pending),
+        }
+
+    # ------------------------------------------------------------------
+    # Detecção e debounce
+    # ------------------------------------------------------------------
+
+    def _list_lots(self) -> List[str]:
+        """Pastas, .zip e .rar do diretório (ignora ocultos e transferências em curso)."""
+        lots = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.') or name.lower().endswith(WATCH_IGNORED_SUFFIXES):
+                    continue
+                if entry.is_dir() or name.lower().endswith((ZIP_EXTENSION, RAR_EXTENSION)):
+                    lots.append(name)
+        return sorted(lots)
+
+    def _update(self, monitor, changed: Optional[Set[str]]) -> None:
+        """Registra lotes novos e reinicia o debounce dos que mudaram."""
+        now = time.monotonic()
+        with self._lock:
+            known = self._ignored | self._running
+        if changed is None or changed - known:
+            present = set(self._list_lots())
+            for name in sorted(present - known - set(self._pending)):
+                self._add_pending(monitor, name, now)
+            for name in [name for name in self._pending if name not in present]:
+                logger.info(f"Lote {name} removido antes do processamento")
+                monitor.unwatch_lot(name)
+                del self._pending[name]
+
+        for lot in self._pending.values():
+            if changed is None:
+                # Sem notificações: compara a assinatura
+                signature = self._signature(lot.name)
+                if signature != lot.signature:
+                    lot.signature = signature
+                    lot.last_change = now
+            elif lot.name in changed:
+                lot.last_change = now
+                lot.signature = None  # Recalculada quando o debounce terminar
+
+    def _add_pending(self, monitor, name: str, now: float) -> None:
+        try:
+            row = self._match(name)
+        except ValueError as e:
+            logger.error(f"Lote {name}: {e}")
+            row = None
+        if row is None:
+            logger.warning(f"Lote {name} sem regra de renomeação, ignorado")
+            self.unmatched.append(name)
+            with self._lock:
+                self._ignored.add(name)
+            return
+        logger.info(f"Lote {name} detectado -> {row['new_lot']}; aguardando o fim das alterações")
+        monitor.watch_lot(name)
+        self._pending[name] = _PendingLot(name, row, self._signature(name), now)
+
+    def _match(self, name: str) -> Optional[Dict[str, Any]]:
+        for rule in self.rules:
+            row = rule.match(name)
+            if row is not None:
+                return row
+        return None
+
+    def _signature(self, name: str):
+        try:
+            return lot_signature(os.path.join(self.root, name))
+        except OSError:
+            return None
+
+    def _next_timeout(self) -> float:
+        """Espera até o próximo lote completar o debounce (no máximo poll_interval)."""
+        if not self._pending:
+            return self.poll_interval
+        now = time.monotonic()
+        remaining = min(lot.last_change + self.debounce - now for lot in self._pending.values())
+        return min(self.poll_interval, max(remaining, 0.05))
+
+    # ------------------------------------------------------------------
+    # Fila de processamento
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, monitor, executor: ThreadPoolExecutor) -> None:
+        """Envia para o pool os lotes sem alterações há debounce segundos."""
+        now = time.monotonic()
+        for lot in sorted(self._pending.values(), key=lambda lot: lot.last_change):
+            if now - lot.last_change < self.debounce:
+                continue
+            # Sem nenhuma notificação desde a detecção, confere a assinatura:
+            # alterações feitas por outra máquina em um compartilhamento
+            # montado não geram eventos do inotify
+            signature = self._signature(lot.name)
+            if lot.signature is not None and signature != lot.signature:
+                lot.signature = signature
+                lot.last_change = now
+                continue
+            monitor.unwatch_lot(lot.name)
+            del self._pending[lot.name]
+            new_lot = lot.row['new_lot']
+            with self._lock:
+                self._running.add(lot.name)
+                # O lote renomeado aparece no diretório: não deve ser processado de novo
+                self._ignored.update((lot.name, new_lot, new_lot + ZIP_EXTENSION))
+            logger.info(f"Lote {lot.name} estável, processando -> {new_lot}")
+            executor.submit(self._process, lot.row)
+
+    def _process(self, row: Dict[str, Any]) -> None:
+        try:
+            pipeline = LotPipeline(self.root, max_workers=self.file_workers)
+            pipeline.zip_output = self.zip_output
+            lot_result = pipeline.run(row['old_lot'], row['new_lot'], row['year'],
+                                      row['add_year'], row['infraction_code']).to_dict()
+        except Exception as e:
+            lot_result = {'old_name': row['old_lot'], 'new_name': row['new_lot'],
+                          'success': False, 'error': str(e)}
+        if lot_result['success']:
+            logger.info(f"Lote {row['old_lot']} -> {row['new_lot']} concluído")
+        else:
+            logger.error(f"Lote {row['old_lot']} falhou: {lot_result.get('error')}")
+        with self._lock:
+            self._running.discard(row['old_lot'])
+            self.results.append(lot_result)
+        if self.on_result is not None:
+            self.on_result(lot_result)
@@ -1,14 +1,29 @@
-from gui import Application
+import time
+STARTUP_ORIGIN = time.perf_counter()  # Antes das importações, para medi-las
+
+import multiprocessing
+from instrumentation import StartupTimer
+from log_manager import setup_logging
+# Importações marcadas uma a uma: o resumo separa customtkinter (e PIL, que ele
+# importa) dos módulos da interface
+STARTUP = StartupTimer(STARTUP_ORIGIN)
+STARTUP.mark("importações base")
 import customtkinter as tk
+STARTUP.mark("customtkinter")
+from gui import Application
+STARTUP.mark("gui")
 
 def main():
+    # Necessário para o pool de processos opcional no executável (PyInstaller)
+    multiprocessing.freeze_support()
+    setup_logging()
+    STARTUP.mark("log")
     janela = tk.CTk()
     janela.title("Renomeia Lote BRC v4.3")  # Define o título da janela
     janela.geometry("850x740")
-    app=Application(master=janela)
+    STARTUP.mark("janela")
+    app=Application(master=janela, startup=STARTUP)
     janela.mainloop()  # Inicia a GUI
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,401 @@
+"""
+Verificação e atualização dos arquivos md5sum.txt de um lote.
+
+O md5sum.txt lista o MD5 de cada arquivo do lote ("<md5>  <nome>", formato
+do md5sum do GNU, ou "MD5 (<nome>) = <md5>", formato BSD). Depois da
+renomeação os nomes listados deixam de existir. Com o mapa das renomeações
+feitas (RenameMap), cada entrada passa direto para o nome final com o MD5
+registrado: só os arquivos regravados (textos) são lidos. Sem o mapa, ou
+para entradas fora dele, a entrada é localizada pelo novo nome (mesmas
+regras de LotMatcher) e o arquivo é lido em um pool de threads com buffer
+grande (hashlib libera o GIL); o MD5 registrado é mantido quando o
+conteúdo não mudou. A linha muda apenas no nome, com a mesma formatação.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set
+from config import DEFAULT_WORKERS, MD5SUM_FILENAME, MD5_READ_BUFFER_SIZE, STAGE_CHECKSUM
+from utils import LotMatcher, LoggingUtils
+from text_stream import get_durability, fsync_directory, sync_written_files, DURABILITY_FULL
+from worker_pool import run_bounded
+from instrumentation import traced, count, current, BYTES_READ, BYTES_WRITTEN, STAT_CALLS, RENAMES
+from log_manager import get_logger
+
+logger = get_logger('md5_manifest')
+
+MANIFEST_ENCODING = 'utf-8'
+
+_GNU_LINE = re.compile(r'^(?P<digest>[0-9a-fA-F]{32}) (?P<mode>[ *])(?P<name>.+?)(?P<end>\r?\n?)$')
+_BSD_LINE = re.compile(r'^MD5 ?\((?P<name>.+)\) ?= ?(?P<digest>[0-9a-fA-F]{32})(?P<end>\r?\n?)$')
+
+
+class Md5Entry:
+    """Linha do md5sum.txt (linhas que não são entradas ficam só em raw)."""
+
+    __slots__ = ('raw', 'digest', 'name', 'match')
+
+    def __init__(self, raw: str, match=None):
+        self.raw = raw
+        self.match = match
+        self.digest = match.group('digest').lower() if match else None
+        self.name = match.group('name') if match else None
+
+    @property
+    def is_entry(self) -> bool:
+        return self.match is not None
+
+    def with_name(self, name: str) -> str:
+        """A mesma linha com outro nome de arquivo (formatação preservada)."""
+        start, end = self.match.span('name')
+        return self.raw[:start] + name + self.raw[end:]
+
+
+class Md5Manifest:
+    """Conteúdo de um md5sum.txt."""
+
+    def __init__(self, path: str, entries: List[Md5Entry]):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.entries = entries
+
+    @classmethod
+    def load(cls, path: str) -> 'Md5Manifest':
+        with open(path, 'r', encoding=MANIFEST_ENCODING, errors='surrogateescape', newline='') as file:
+            lines = file.read().splitlines(keepends=True)
+        entries = []
+        for line in lines:
+            match = _GNU_LINE.match(line) or _BSD_LINE.match(line)
+            entries.append(Md5Entry(line, match))
+        return cls(path, entries)
+
+    def file_path(self, name: str) -> str:
+        """Caminho do arquivo de uma entrada (nomes relativos ao md5sum.txt)."""
+        return os.path.normpath(os.path.join(self.directory, name.replace('\\', os.sep).replace('/', os.sep)))
+
+    def save(self, lines: Iterable[str]) -> None:
+        """Grava o novo conteúdo (temporário + os.replace)."""
+        fd, temp_path = tempfile.mkstemp(prefix='.' + MD5SUM_FILENAME + '.', suffix='.tmp',
+                                         dir=self.directory)
+        try:
+            with os.fdopen(fd, 'w', encoding=MANIFEST_ENCODING, errors='surrogateescape', newline='') as file:
+                file.writelines(lines)
+                if get_durability() == DURABILITY_FULL:
+                    file.flush()
+                    os.fsync(file.fileno())
+                if current() is not None:
+                    count(BYTES_WRITTEN, file.tell())
+            os.replace(temp_path, self.path)
+            count(RENAMES)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if get_durability() == DURABILITY_FULL:
+            fsync_directory(self.directory)
+
+
+class Md5ManifestResult:
+    """Resultado da verificação/atualização de um md5sum.txt."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = 0
+        self.verified = 0     # MD5 conferido e igual ao registrado
+        self.renamed = 0      # Entradas atualizadas para o novo nome
+        self.reused = 0       # MD5 mantido sem reler o arquivo (mapa de renomeações)
+        self.updated: List[str] = []    # Conteúdo mudou: MD5 substituído
+        self.mismatched: List[str] = []  # Verificação: MD5 diferente do registrado
+        self.missing: List[str] = []    # Arquivo não encontrado
+        self.errors: List[str] = []
+        self.written = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.mismatched and not self.missing and not self.errors
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'entries': self.entries,
+            'verified': self.verified,
+            'renamed': self.renamed,
+            'reused': self.reused,
+            'updated': self.updated,
+            'mismatched': self.mismatched,
+            'missing': self.missing,
+            'errors': self.errors,
+            'written': self.written,
+        }
+
+
+def md5_file(path: str, buffer_size: int = MD5_READ_BUFFER_SIZE) -> str:
+    """
+    Calcula o MD5 de um arquivo com um buffer reutilizado (readinto).
+
+    Args:
+        path (str): Caminho do arquivo
+        buffer_size (int): Tamanho do buffer de leitura
+
+    Returns:
+        str: MD5 em hexadecimal (minúsculas)
+    """
+    digest = hashlib.md5()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    total = 0
+    with open(path, 'rb', buffering=0) as file:
+        while True:
+            size = file.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+            total += size
+    count(BYTES_READ, total)
+    return digest.hexdigest()
+
+
+def hash_files(paths: Iterable[str], max_workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """
+    Calcula o MD5 de vários arquivos em um pool de threads.
+
+    Returns:
+        Dict[str, Any]: Caminho -> MD5, ou a exceção se o arquivo não pôde ser lido
+    """
+    digests: Dict[str, Any] = {}
+    for path, digest, error in run_bounded(md5_file, list(dict.fromkeys(paths)), max_workers):
+        digests[path] = error if error is not None else digest
+    return digests
+
+
+def find_manifests(lot_directory: str, inventory=None) -> List[str]:
+    """Lista os md5sum.txt de um lote (pelo inventário, se houver)."""
+    if inventory is not None:
+        return [path for path in inventory.get_files('.txt')
+                if os.path.basename(path).lower() == MD5SUM_FILENAME]
+    manifests = []
+    for root, _, files in os.walk(lot_directory):
+        manifests.extend(os.path.join(root, name) for name in files if name.lower() == MD5SUM_FILENAME)
+    return sorted(manifests)
+
+
+@traced()
+def verify_manifest(path: str, max_workers: int = DEFAULT_WORKERS) -> Md5ManifestResult:
+    """
+    Confere o MD5 de todos os arquivos listados em um md5sum.txt.
+
+    Args:
+        path (str): Caminho do md5sum.txt
+        max_workers (int): Arquivos lidos em paralelo
+
+    Returns:
+        Md5ManifestResult: verified, mismatched e missing preenchidos
+    """
+    result = Md5ManifestResult(path)
+    manifest = Md5Manifest.load(path)
+    entries = [entry for entry in manifest.entries if entry.is_entry]
+    result.entries = len(entries)
+    digests = hash_files((manifest.file_path(entry.name) for entry in entries), max_workers)
+    for entry in entries:
+        digest = digests[manifest.file_path(entry.name)]
+        if isinstance(digest, FileNotFoundError):
+            result.missing.append(entry.name)
+        elif isinstance(digest, BaseException):
+            result.errors.append(f"{entry.name}: {digest}")
+        elif digest != entry.digest:
+            result.mismatched.append(entry.name)
+        else:
+            result.verified += 1
+    return result
+
+
+@traced()
+def update_manifest(path: str, old_name: str, new_name: str,
+                    max_workers: int = DEFAULT_WORKERS, renames=None,
+                    rewritten: Optional[Iterable[str]] = None, inventory=None) -> Md5ManifestResult:
+    """
+    Atualiza um md5sum.txt após a renomeação do lote, em uma passada.
+
+    Com renames, o caminho final de cada entrada vem do mapa e o MD5
+    registrado é mantido sem ler o arquivo; apenas os arquivos em rewritten
+    (e os de diretórios mesclados, que podem ter sido substituídos) têm o
+    MD5 recalculado. Sem o mapa (ou se o caminho resolvido não
+    existir), entradas cujo arquivo não existe mais passam para o novo nome
+    (regras de LotMatcher) e o arquivo é relido. O MD5 registrado só é
+    substituído para arquivos em rewritten; nos demais, um MD5 diferente
+    é uma divergência (mismatched) e o registrado é mantido, para não
+    validar um arquivo corrompido. O arquivo só é regravado se alguma
+    linha mudar.
+
+    Args:
+        path (str): Caminho do md5sum.txt
+        old_name (str): Nome antigo do lote
+        new_name (str): Nome novo do lote
+        max_workers (int): Arquivos lidos em paralelo
+        renames (RenameMap): Renomeações feitas no lote (opcional)
+        rewritten (Iterable[str]): Arquivos cujo conteúdo foi regravado
+            (os únicos com MD5 substituído)
+        inventory (LotInventory): Inventário do lote, para conferir a
+            existência dos caminhos resolvidos sem consultar o disco
+
+    Returns:
+        Md5ManifestResult: Resultado da atualização
+    """
+    result = Md5ManifestResult(path)
+    manifest = Md5Manifest.load(path)
+    matcher = LotMatcher(old_name, new_name)
+    rewritten_paths: Set[str] = {os.path.abspath(name) for name in rewritten or ()}
+
+    # 1. Localiza o arquivo de cada entrada: pelo mapa de renomeações (MD5
+    #    mantido) ou pelo nome atual/novo nome (MD5 relido)
+    targets: Dict[int, Optional[str]] = {}
+    reused: Dict[int, str] = {}
+    for index, entry in enumerate(manifest.entries):
+        if not entry.is_entry:
+            continue
+        result.entries += 1
+        file_path = manifest.file_path(entry.name)
+        if renames is not None:
+            renamed_path = renames.resolve(file_path)
+            if _exists(renamed_path, inventory):
+                if renamed_path in rewritten_paths or renames.in_merged_directory(renamed_path):
+                    targets[index] = renamed_path
+                else:
+                    reused[index] = renamed_path
+                continue
+        count(STAT_CALLS)
+        if not os.path.exists(file_path):
+            new_filename = matcher.match(file_path)
+            renamed_path = os.path.join(os.path.dirname(file_path), new_filename) if new_filename else None
+            file_path = renamed_path if renamed_path and os.path.exists(renamed_path) else None
+        targets[index] = file_path
+
+    # 2. MD5 apenas dos arquivos sem MD5 reaproveitável, em paralelo
+    digests = hash_files((target for target in targets.values() if target is not None), max_workers)
+
+    # 3. Novas linhas: mesmo MD5 com o novo nome, ou MD5 recalculado
+    lines = []
+    for index, entry in enumerate(manifest.entries):
+        if index in reused:
+            result.reused += 1
+            lines.append(_renamed_line(manifest, entry, reused[index], result))
+            continue
+        target = targets.get(index)
+        if not entry.is_entry or target is None:
+            if entry.is_entry:
+                result.missing.append(entry.name)
+            lines.append(entry.raw)
+            continue
+        digest = digests[target]
+        if isinstance(digest, BaseException):
+            result.errors.append(f"{entry.name}: {digest}")
+            lines.append(entry.raw)
+            continue
+
+        line = _renamed_line(manifest, entry, target, result)
+        if digest == entry.digest:
+            result.verified += 1
+        elif os.path.abspath(target) in rewritten_paths:
+            start, end = entry.match.span('digest')
+            line = line[:start] + digest + line[end:]
+            result.updated.append(entry.name)
+        else:
+            result.mismatched.append(entry.name)
+        lines.append(line)
+
+    if any(line != entry.raw for line, entry in zip(lines, manifest.entries)):
+        manifest.save(lines)
+        sync_written_files([path])
+        result.written = True
+    _count(result)
+    return result
+
+
+def _exists(path: str, inventory=None) -> bool:
+    """os.path.exists consultando o inventário quando disponível."""
+    if inventory is not None and inventory.contains(path):
+        return inventory.exists(path)
+    count(STAT_CALLS)
+    return os.path.exists(path)
+
+
+def _renamed_line(manifest: Md5Manifest, entry: Md5Entry, target: str,
+                  result: Md5ManifestResult) -> str:
+    """Linha da entrada com o nome de target (a própria linha se o arquivo não mudou de nome)."""
+    target = os.path.abspath(target)
+    file_path = os.path.abspath(manifest.file_path(entry.name))
+    if target == file_path:
+        return entry.raw
+    result.renamed += 1
+    if os.path.dirname(target) == os.path.dirname(file_path):
+        return entry.with_name(_renamed_entry_name(entry.name, os.path.basename(target)))
+    # Subdiretório renomeado: novo caminho relativo, com o separador da entrada
+    separator = '\\' if '\\' in entry.name else '/'
+    relative = os.path.relpath(target, os.path.abspath(manifest.directory))
+    return entry.with_name(relative.replace(os.sep, separator))
+
+
+def _renamed_entry_name(name: str, new_basename: str) -> str:
+    """Troca apenas o nome do arquivo, mantendo o diretório e o separador da entrada."""
+    separator = max(name.rfind('/'), name.rfind('\\'))
+    return name[:separator + 1] + new_basename
+
+
+def _count(result: Md5ManifestResult) -> None:
+    LoggingUtils.count(STAGE_CHECKSUM, 'entradas', result.entries)
+    LoggingUtils.count(STAGE_CHECKSUM, 'renomeadas', result.renamed)
+    LoggingUtils.count(STAGE_CHECKSUM, 'md5_reaproveitados', result.reused)
+    LoggingUtils.count(STAGE_CHECKSUM, 'md5_recalculados', len(result.updated))
+    LoggingUtils.count(STAGE_CHECKSUM, 'ausentes', len(result.missing))
+    LoggingUtils.count(STAGE_CHECKSUM, 'divergentes', len(result.mismatched))
+    for name in result.missing:
+        logger.warning(f"md5sum: arquivo não encontrado: {name} ({result.path})")
+    for name in result.updated:
+        logger.info(f"md5sum: conteúdo alterado, MD5 atualizado: {name}")
+    for name in result.mismatched:
+        logger.error(f"md5sum: MD5 diferente do registrado em arquivo não regravado: {name} ({result.path})")
+
+
+def update_lot_manifests(lot_directory: str, old_name: str, new_name: str, inventory=None,
+                         journal=None, max_workers: int = DEFAULT_WORKERS, renames=None,
+                         rewritten: Optional[Iterable[str]] = None) -> List[Md5ManifestResult]:
+    """
+    Atualiza todos os md5sum.txt de um lote renomeado (etapa final de
+    LotPipeline e LotPlanExecutor). Com diário, cada md5sum.txt é copiado
+    antes da regravação, como os demais textos. Com renames, apenas os
+    arquivos em rewritten são relidos (ver update_manifest).
+
+    Args:
+        lot_directory (str): Diretório do lote já renomeado
+        old_name (str): Nome antigo do lote
+        new_name (str): Nome novo do lote
+        inventory (LotInventory): Inventário do lote (opcional)
+        journal (RenameJournal): Diário da execução (opcional)
+        max_workers (int): Arquivos lidos em paralelo
+        renames (RenameMap): Renomeações feitas no lote (opcional)
+        rewritten (Iterable[str]): Arquivos cujo conteúdo foi regravado
+
+    Returns:
+        List[Md5ManifestResult]: Um resultado por md5sum.txt
+    """
+    manifests = find_manifests(lot_directory, inventory)
+    journal_operations = journal.backup_texts(manifests) if journal is not None else []
+    rewritten = list(rewritten or ())
+    results = []
+    for index, path in enumerate(manifests):
+        try:
+            result = update_manifest(path, old_name, new_name, max_workers, renames, rewritten, inventory)
+        except (OSError, UnicodeError) as e:
+            logger.error(f"Erro ao atualizar {path}: {e}")
+            result = Md5ManifestResult(path)
+            result.errors.append(str(e))
+        else:
+            if journal is not None:
+                journal.done(journal_operations[index])
+            if result.written and inventory is not None:
+                inventory.update_file(path)
+        results.append(result)
+    LoggingUtils.log_stage_summary(STAGE_CHECKSUM)
+    return results
@@ -0,0 +1,146 @@
+"""
+Perfil de execução de um lote (operalote.py rename --profile).
+
+Dois perfis da mesma execução:
+
+- cProfile: tempo e número de chamadas de cada função, gravado em .prof
+  (pstats, snakeviz) e resumido nas funções com mais tempo próprio;
+- amostragem de pilhas (StackSampler): a cada intervalo a pilha de cada
+  thread é registrada e o total é gravado como pilhas colapsadas, uma
+  linha "thread;f1;f2;f3 N" por pilha (formato do flamegraph.pl, do
+  speedscope e do py-spy --format raw).
+
+O cProfile mede só a thread que o ativou; a amostragem cobre também os
+workers de arquivos. Threads paradas à espera de trabalho não entram nas
+amostras.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from config import PROFILE_SAMPLE_INTERVAL, PROFILE_TOP_FUNCTIONS
+
+# Funções em que uma thread está apenas esperando (módulo, função): pilhas
+# terminadas nelas são descartadas
+IDLE_FRAMES = {
+    ('threading', 'wait'),
+    ('threading', '_wait_for_tstate_lock'),
+    ('queue', 'get'),
+    ('thread', '_worker'),  # concurrent.futures: worker sem tarefa
+}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(code) -> bool:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return (module, code.co_name) in IDLE_FRAMES
+
+
+class StackSampler:
+    """Amostra periodicamente as pilhas de todas as threads (exceto a sua)."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()  # Pilha colapsada -> amostras
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or _is_idle(frame.f_code):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack.reverse()
+                self.samples[';'.join(stack)] += 1
+            self.ticks += 1
+
+    def collapsed(self) -> List[str]:
+        """Linhas "pilha amostras", da pilha mais frequente para a menos."""
+        return [f"{stack} {samples}" for stack, samples in self.samples.most_common()]
+
+
+class Profiler:
+    """
+    cProfile e amostragem de pilhas de um mesmo trecho.
+
+    Uso:
+        with Profiler() as profiler:
+            pipeline.run(...)
+        paths = profiler.write(logs_path, 'perfil_L00125')
+        print(profiler.format_top())
+    """
+
+    def __init__(self, sample_interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(sample_interval) if sample_interval > 0 else None
+        self.elapsed_seconds = 0.0
+        self._start = 0.0
+
+    def __enter__(self) -> 'Profiler':
+        if self.sampler is not None:
+            self.sampler.start()
+        self._start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.profile.disable()
+        self.elapsed_seconds = time.perf_counter() - self._start
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def write(self, directory: str, name: str) -> Dict[str, str]:
+        """
+        Grava o perfil em directory.
+
+        Args:
+            directory (str): Pasta de destino (criada se necessário)
+            name (str): Nome dos arquivos, sem extensão
+
+        Returns:
+            Dict[str, str]: Caminhos gravados ('profile' e, com amostragem,
+            'collapsed')
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = {'profile': os.path.join(directory, name + '.prof')}
+        self.profile.dump_stats(paths['profile'])
+        if self.sampler is not None:
+            paths['collapsed'] = os.path.join(directory, name + '.folded')
+            with open(paths['collapsed'], 'w', encoding='utf-8', newline='\n') as file:
+                file.writelines(line + '\n' for line in self.sampler.collapsed())
+        return paths
+
+    def format_top(self, limit: int = PROFILE_TOP_FUNCTIONS) -> str:
+        """Funções com mais tempo próprio (tabela do pstats)."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.strip_dirs().sort_stats(pstats.SortKey.TIME, pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return stream.getvalue().strip('\n')
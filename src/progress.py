@@ -0,0 +1,117 @@
+"""
+Modelo de progresso e cancelamento para execuções longas.
+
+O processamento roda em uma thread de trabalho e atualiza um
+ProgressTracker; a interface lê snapshots periodicamente (via after()) sem
+acessar os widgets a partir da thread de trabalho.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class OperationCancelled(Exception):
+    """Execução interrompida a pedido do usuário."""
+
+
+class ProgressTracker:
+    """
+    Progresso thread-safe: etapa atual, itens planejados/concluídos/com
+    falha, vazão e tempo estimado. Também carrega o pedido de cancelamento.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self.stage = ''
+        self.planned = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._stage_started_at = self.started_at
+        self._stage_done = 0
+
+    # Cancelamento -------------------------------------------------------
+
+    def cancel(self) -> None:
+        """Solicita o cancelamento (atendido entre um arquivo e outro)."""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self) -> None:
+        """Levanta OperationCancelled se o cancelamento foi solicitado."""
+        if self._cancel_event.is_set():
+            raise OperationCancelled("Operação cancelada pelo usuário")
+
+    # Atualizações (thread de trabalho) ------------------------------------
+
+    def set_stage(self, stage: str, planned: Optional[int] = None) -> None:
+        """
+        Inicia uma nova etapa.
+
+        Args:
+            stage (str): Descrição da etapa
+            planned (int): Itens a processar na etapa (somados ao total)
+        """
+        with self._lock:
+            self.stage = stage
+            self._stage_started_at = time.monotonic()
+            self._stage_done = 0
+            if planned:
+                self.planned += planned
+
+    def add_planned(self, count: int) -> None:
+        with self._lock:
+            self.planned += count
+
+    def advance(self, count: int = 1, failed: int = 0) -> None:
+        """Registra itens concluídos (e quantos deles falharam)."""
+        with self._lock:
+            self.done += count
+            self.failed += failed
+            self._stage_done += count
+
+    # Leitura (thread da interface) -----------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna uma cópia consistente do progresso.
+
+        Returns:
+            Dict[str, Any]: stage, planned, done, failed, fraction,
+                throughput (itens/s na etapa), eta_seconds (None se
+                desconhecido), elapsed_seconds e cancelled
+        """
+        with self._lock:
+            now = time.monotonic()
+            stage_elapsed = now - self._stage_started_at
+            throughput = self._stage_done / stage_elapsed if stage_elapsed > 0 else 0.0
+            remaining = max(self.planned - self.done, 0)
+            eta = remaining / throughput if throughput > 0 else None
+            return {
+                'stage': self.stage,
+                'planned': self.planned,
+                'done': self.done,
+                'failed': self.failed,
+                'fraction': min(self.done / self.planned, 1.0) if self.planned else 0.0,
+                'throughput': throughput,
+                'eta_seconds': eta,
+                'elapsed_seconds': now - self.started_at,
+                'cancelled': self._cancel_event.is_set(),
+            }
+
+    @staticmethod
+    def format_snapshot(snapshot: Dict[str, Any]) -> str:
+        """Texto curto para exibição (ex: barra de status)."""
+        text = f"{snapshot['stage']} - {snapshot['done']}/{snapshot['planned']}"
+        if snapshot['failed']:
+            text += f" ({snapshot['failed']} falha(s))"
+        if snapshot['throughput']:
+            text += f" - {snapshot['throughput']:.0f} arq/s"
+        if snapshot['eta_seconds'] is not None:
+            text += f" - restam ~{int(snapshot['eta_seconds'])}s"
+        return text
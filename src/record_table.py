@@ -0,0 +1,377 @@
+"""
+Tabela colunar dos registros de infração de um lote.
+
+As linhas dos arquivos .txt são lidas uma vez e guardadas em arrays NumPy,
+uma coluna por campo: campos numéricos (lote, data, hora) como inteiros e
+campos de texto (equipamento, ano, imagem, local, código) como colunas
+categóricas (índice inteiro + lista de valores distintos). Agrupamentos,
+filtros e contagens são feitos sobre os arrays, sem reler os textos.
+
+NumPy é opcional: só é importado quando uma tabela é carregada.
+"""
+
+import os
+import sys
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from config import (
+    TEXT_SEPARATOR,
+    MD5SUM_FILENAME,
+    RECORD_FIELD_LOT,
+    RECORD_FIELD_EQUIPMENT,
+    RECORD_FIELD_DATE,
+    RECORD_FIELD_TIME,
+    RECORD_FIELD_IMAGE,
+    RECORD_FIELD_LOCATION,
+    RECORD_MIN_FIELDS
+)
+from log_manager import get_logger
+
+logger = get_logger('record_table')
+
+MISSING = -1  # Valor de campos numéricos ausentes ou inválidos
+
+NUMERIC_COLUMNS = ('lot', 'date', 'time')
+CATEGORICAL_COLUMNS = ('equipment', 'year', 'image', 'location', 'code', 'source')
+DEFAULT_DUPLICATE_KEY = ('equipment', 'date', 'time', 'image')
+
+
+def _require_numpy():
+    """Importa o NumPy sob demanda (dependência opcional)."""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("A tabela de registros requer o NumPy (pip install numpy)")
+    return numpy
+
+
+def _parse_int(value: str) -> int:
+    value = value.strip()
+    return int(value) if value.isdigit() else MISSING
+
+
+def _parse_time(value: str) -> int:
+    """HH:MM:SS -> HHMMSS (inteiro)."""
+    parts = value.strip().split(':')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return MISSING
+    return int(parts[0]) * 10000 + int(parts[1]) * 100 + int(parts[2])
+
+
+class CategoricalColumn:
+    """
+    Coluna de texto codificada: codes[i] é o índice de categories do
+    registro i. Cada valor distinto é guardado uma única vez.
+    """
+
+    def __init__(self, codes, categories: List[str]):
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def index_of(self, value: str) -> int:
+        """Índice de um valor (MISSING se não existir na coluna)."""
+        try:
+            return self.categories.index(value)
+        except ValueError:
+            return MISSING
+
+    def take(self, selector) -> 'CategoricalColumn':
+        """Nova coluna com os registros selecionados (mesmas categorias)."""
+        return CategoricalColumn(self.codes[selector], self.categories)
+
+    def values(self) -> List[str]:
+        return [self.categories[code] for code in self.codes.tolist()]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + sum(sys.getsizeof(value) for value in self.categories)
+
+
+class _ColumnBuilder:
+    """Acumula os valores durante a leitura (arrays da biblioteca padrão)."""
+
+    def __init__(self):
+        self.numeric = {name: array('q') for name in NUMERIC_COLUMNS}
+        self.codes = {name: array('i') for name in CATEGORICAL_COLUMNS}
+        self.categories: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL_COLUMNS}
+
+    def add_category(self, column: str, value: str) -> None:
+        categories = self.categories[column]
+        code = categories.get(value)
+        if code is None:
+            code = categories[value] = len(categories)
+        self.codes[column].append(code)
+
+    def add_line(self, line: str, source: str) -> bool:
+        fields = line.strip().split(TEXT_SEPARATOR)
+        if len(fields) < RECORD_MIN_FIELDS:
+            return False
+        equipment = fields[RECORD_FIELD_EQUIPMENT].strip()
+        year = ''
+        if '/' in equipment:
+            equipment, year = equipment.split('/', 1)
+        self.numeric['lot'].append(_parse_int(fields[RECORD_FIELD_LOT]))
+        self.numeric['date'].append(_parse_int(fields[RECORD_FIELD_DATE]))
+        self.numeric['time'].append(_parse_time(fields[RECORD_FIELD_TIME]))
+        self.add_category('equipment', equipment)
+        self.add_category('year', year)
+        self.add_category('image', fields[RECORD_FIELD_IMAGE].strip() if len(fields) > RECORD_FIELD_IMAGE else '')
+        self.add_category('location',
+                          fields[RECORD_FIELD_LOCATION].strip() if len(fields) > RECORD_FIELD_LOCATION + 1 else '')
+        self.add_category('code', fields[-1].strip())
+        self.add_category('source', source)
+        return True
+
+    def build(self) -> Dict[str, Any]:
+        np = _require_numpy()
+        columns: Dict[str, Any] = {}
+        for name, values in self.numeric.items():
+            # AAAAMMDD e HHMMSS cabem em int32; o lote tem no máximo 7 dígitos
+            columns[name] = np.frombuffer(values, dtype=np.int64).astype(np.int32)
+        for name, codes in self.codes.items():
+            categories = list(self.categories[name])
+            dtype = np.uint8 if len(categories) <= 0xFF else np.uint16 if len(categories) <= 0xFFFF else np.int32
+            columns[name] = CategoricalColumn(np.frombuffer(codes, dtype=np.int32).astype(dtype), categories)
+        return columns
+
+
+class RecordTable:
+    """
+    Registros de infração em colunas: lot, date (AAAAMMDD) e time (HHMMSS)
+    são inteiros (MISSING quando ausentes); equipment, year (sufixo do
+    equipamento, '' se não houver), image, location, code e source (arquivo
+    de origem) são categóricas.
+    """
+
+    def __init__(self, columns: Dict[str, Any], skipped_lines: int = 0, errors: Optional[List[str]] = None):
+        self.columns = columns
+        self.skipped_lines = skipped_lines
+        self.errors = errors or []
+
+    # Carga ----------------------------------------------------------------
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], source: str = '') -> 'RecordTable':
+        """
+        Monta a tabela a partir de linhas de texto.
+
+        Args:
+            lines (Iterable[str]): Linhas no formato dos arquivos do lote
+            source (str): Nome do arquivo de origem das linhas
+
+        Returns:
+            RecordTable: Tabela com os registros válidos
+        """
+        builder = _ColumnBuilder()
+        skipped = sum(1 for line in lines if not builder.add_line(line, source))
+        return cls(builder.build(), skipped)
+
+    @classmethod
+    def from_files(cls, filenames: Iterable[str]) -> 'RecordTable':
+        """
+        Monta a tabela a partir de arquivos .txt (o md5sum.txt é ignorado).
+        Arquivos com erro de leitura são registrados em errors.
+
+        Args:
+            filenames (Iterable[str]): Caminhos dos arquivos
+
+        Returns:
+            RecordTable: Registros de todos os arquivos
+        """
+        builder = _ColumnBuilder()
+        skipped = 0
+        errors = []
+        for filename in filenames:
+            if os.path.basename(filename).lower() == MD5SUM_FILENAME:
+                continue
+            try:
+                # Lê o arquivo inteiro antes de incluir: um erro não deixa registros pela metade
+                with open(filename, 'r', encoding='utf-8') as file:
+                    lines = file.readlines()
+            except (OSError, UnicodeDecodeError) as e:
+                logger.error(f"Erro ao processar arquivo {filename}: {e}")
+                errors.append(filename)
+                continue
+            for line in lines:
+                if not builder.add_line(line, filename):
+                    skipped += 1
+        return cls(builder.build(), skipped, errors)
+
+    @classmethod
+    def from_lot(cls, directory: str, lote_name: str) -> 'RecordTable':
+        """
+        Monta a tabela com os arquivos de texto de um lote (mesma seleção de
+        arquivos da análise de infrações).
+
+        Args:
+            directory (str): Diretório raiz dos lotes
+            lote_name (str): Nome do lote
+
+        Returns:
+            RecordTable: Registros do lote
+        """
+        from infraction_analyzer import InfractionAnalyzer
+        return cls.from_files(InfractionAnalyzer(directory).get_text_files(lote_name))
+
+    # Consulta -------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.columns['lot'])
+
+    def column(self, name: str):
+        """Array de uma coluna numérica ou CategoricalColumn de uma coluna de texto."""
+        return self.columns[name]
+
+    def _codes(self, name: str):
+        column = self.columns[name]
+        return column.codes if isinstance(column, CategoricalColumn) else column
+
+    def mask(self, **conditions):
+        """
+        Máscara booleana dos registros que atendem a todas as condições.
+
+        Args:
+            **conditions: coluna=valor ou coluna=(valor1, valor2, ...),
+                ex: mask(code='6050', date=20250905)
+
+        Returns:
+            numpy.ndarray: Máscara booleana com um item por registro
+        """
+        np = _require_numpy()
+        result = np.ones(len(self), dtype=bool)
+        for name, value in conditions.items():
+            column = self.columns[name]
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+            if isinstance(column, CategoricalColumn):
+                indexes = [column.index_of(str(item)) for item in values]
+                result &= np.isin(column.codes, [index for index in indexes if index != MISSING])
+            else:
+                result &= np.isin(column, [int(item) for item in values])
+        return result
+
+    def filter(self, mask=None, **conditions) -> 'RecordTable':
+        """
+        Nova tabela com os registros selecionados por uma máscara e/ou
+        pelas condições de mask().
+        """
+        if conditions:
+            condition_mask = self.mask(**conditions)
+            mask = condition_mask if mask is None else mask & condition_mask
+        if mask is None:
+            return self
+        columns = {name: column.take(mask) if isinstance(column, CategoricalColumn) else column[mask]
+                   for name, column in self.columns.items()}
+        return RecordTable(columns, self.skipped_lines, self.errors)
+
+    def count_by(self, name: str) -> Dict[Any, int]:
+        """
+        Conta os registros por valor de uma coluna.
+
+        Args:
+            name (str): Coluna (ex: 'code', 'equipment', 'date')
+
+        Returns:
+            Dict[Any, int]: Valor -> quantidade (apenas valores presentes)
+        """
+        np = _require_numpy()
+        column = self.columns[name]
+        if isinstance(column, CategoricalColumn):
+            counts = np.bincount(column.codes, minlength=len(column.categories))
+            return {column.categories[index]: int(count)
+                    for index, count in enumerate(counts.tolist()) if count}
+        values, counts = np.unique(column, return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def count_by_many(self, names: Sequence[str]) -> Dict[Tuple[Any, ...], int]:
+        """
+        Conta os registros por combinação de valores de várias colunas.
+
+        Args:
+            names (Sequence[str]): Colunas (ex: ('equipment', 'code'))
+
+        Returns:
+            Dict[Tuple, int]: (valor1, valor2, ...) -> quantidade
+        """
+        np = _require_numpy()
+        if not len(self):
+            return {}
+        keys, inverse = self._group_keys(names)
+        counts = np.bincount(inverse)
+        return {self._decode_key(names, key): int(count) for key, count in zip(keys.tolist(), counts.tolist())}
+
+    def histogram(self, name: str = 'date') -> Dict[Any, int]:
+        """Contagem por valor de uma coluna, em ordem crescente de valor."""
+        return dict(sorted(self.count_by(name).items()))
+
+    def duplicates(self, names: Sequence[str] = DEFAULT_DUPLICATE_KEY):
+        """
+        Máscara dos registros cuja combinação de colunas se repete (todas as
+        ocorrências são marcadas). Por padrão: mesmo equipamento, data, hora
+        e imagem, ou seja, o mesmo AIT registrado mais de uma vez.
+
+        Args:
+            names (Sequence[str]): Colunas que identificam um registro
+
+        Returns:
+            numpy.ndarray: Máscara booleana; use filter(mask) para obter os
+                registros duplicados
+        """
+        np = _require_numpy()
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        _, inverse = self._group_keys(names)
+        return np.bincount(inverse)[inverse] > 1
+
+    def _group_keys(self, names: Sequence[str]):
+        """Linhas distintas das colunas indicadas e o grupo de cada registro."""
+        np = _require_numpy()
+        # Desloca em 1 para que MISSING (-1) também seja um dígito válido
+        columns = [self._codes(name).astype(np.int64) + 1 for name in names]
+        radices = [int(column.max()) + 1 for column in columns]
+        capacity = 1
+        for radix in radices:
+            capacity *= radix
+        if capacity >= 2 ** 62:
+            stacked = np.column_stack(columns)
+            keys, inverse = np.unique(stacked, axis=0, return_inverse=True)
+            return keys - 1, inverse.reshape(-1)
+
+        # Chave única por registro (número misto com um dígito por coluna)
+        combined = np.zeros(len(self), dtype=np.int64)
+        for column, radix in zip(columns, radices):
+            combined = combined * radix + column
+        unique, inverse = np.unique(combined, return_inverse=True)
+        keys = np.empty((len(unique), len(columns)), dtype=np.int64)
+        for position in range(len(columns) - 1, -1, -1):
+            unique, keys[:, position] = np.divmod(unique, radices[position])
+        return keys - 1, inverse.reshape(-1)
+
+    def _decode_key(self, names: Sequence[str], key: Sequence[int]) -> Tuple[Any, ...]:
+        decoded = []
+        for name, value in zip(names, key):
+            column = self.columns[name]
+            decoded.append(column.categories[value] if isinstance(column, CategoricalColumn) else value)
+        return tuple(decoded)
+
+    # Memória --------------------------------------------------------------
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """
+        Memória ocupada pelas colunas.
+
+        Returns:
+            Dict[str, Any]: bytes por coluna, total em bytes e bytes por
+                milhão de registros
+        """
+        by_column = {name: int(column.nbytes) for name, column in self.columns.items()}
+        total = sum(by_column.values())
+        records = len(self)
+        return {
+            'records': records,
+            'columns': by_column,
+            'total_bytes': total,
+            'bytes_per_million': int(total * 1_000_000 / records) if records else 0,
+        }
@@ -0,0 +1,476 @@
+"""
+Diário (journal) das operações de renomeação de um lote.
+
+Cada execução grava, em modo append, um arquivo JSON Lines fora do lote
+(cache/journals/) com as operações planejadas e concluídas: renomeações de
+diretórios e arquivos, regravações de texto (com cópia do original) e
+diretórios/arquivos criados a partir de lotes compactados.
+
+Com o diário, uma execução interrompida é retomada a partir da última
+operação confirmada (sem reprocessar o que já foi feito) e uma execução
+concluída pode ser desfeita em ordem inversa, sem varrer o lote. Os
+diários concluídos são mantidos conforme JOURNAL_RETENTION_COUNT e
+JOURNAL_RETENTION_DAYS (prune_journals).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from config import JOURNAL_DIRECTORY_NAME, JOURNAL_RETENTION_COUNT, JOURNAL_RETENTION_DAYS
+from analysis_cache import get_cache_path
+from text_stream import get_durability, fsync_directory, DURABILITY_NONE, DURABILITY_FULL
+from log_manager import get_logger
+
+logger = get_logger('rename_journal')
+
+# Tipos de operação
+OP_RENAME = 'rename'    # os.rename(source, target); desfeito com o caminho inverso
+OP_TEXT = 'text'        # Regravação de texto; desfeita restaurando a cópia
+OP_CREATE = 'create'    # Diretório/arquivo criado (extração); desfeito removendo
+OP_MERGE = 'merge'      # Conteúdo mesclado em diretório existente (irreversível)
+
+# Etapas da execução
+STAGE_DIRECTORY = 'directory'
+STAGE_FILES = 'files'
+STAGE_TEXT = 'text'
+STAGE_CHECKSUM = 'checksum'
+
+JOURNAL_FILENAME = 'journal.jsonl'
+BACKUP_DIRECTORY = 'text-backup'
+
+
+class JournalOperation:
+    """Operação registrada no diário."""
+
+    __slots__ = ('op_id', 'kind', 'source', 'target', 'backup', 'done')
+
+    def __init__(self, op_id: int, kind: str, source: str, target: Optional[str] = None,
+                 backup: Optional[str] = None):
+        self.op_id = op_id
+        self.kind = kind
+        self.source = source
+        self.target = target
+        self.backup = backup
+        self.done = False
+
+    def __repr__(self) -> str:
+        return f"JournalOperation({self.op_id}, {self.kind!r}, {self.source!r} -> {self.target!r})"
+
+
+class JournalError(Exception):
+    """Diário inconsistente com o estado do lote."""
+
+
+class RenameJournal:
+    """
+    Diário de um lote (raiz, nome antigo, nome novo).
+
+    Registros (um objeto JSON por linha):
+        begin  - início da execução
+        plan   - operação planejada (id, kind, source, target, backup)
+        done   - operação concluída (id)
+        stage  - etapa concluída (directory, files, text, checksum)
+        jpg_plan - todas as renomeações de JPG já foram planejadas
+        discard - operação pendente descartada na retomada (refeita depois)
+        end    - execução concluída
+        undone - execução desfeita
+    """
+
+    def __init__(self, directory: str, old_name: str, new_name: str,
+                 journal_root: Optional[str] = None):
+        self.directory = os.path.normpath(os.path.abspath(directory))
+        self.old_name = old_name
+        self.new_name = new_name
+        root_key = hashlib.sha1(os.path.normcase(self.directory).encode('utf-8', 'surrogateescape'))
+        self.journal_root = journal_root or os.path.join(get_cache_path(), JOURNAL_DIRECTORY_NAME)
+        self.path = os.path.join(self.journal_root, root_key.hexdigest()[:16], f"{old_name}__{new_name}")
+        self._lock = threading.Lock()
+        self._file = None
+        self.operations: List[JournalOperation] = []
+        self.stages_done: Set[str] = set()
+        self.jpg_planned = False
+        self.finished = False
+        self.undone = False
+        self._done_targets: Set[str] = set()
+        self._done_texts: Set[str] = set()
+        self._next_id = 1
+
+    @property
+    def journal_file(self) -> str:
+        return os.path.join(self.path, JOURNAL_FILENAME)
+
+    # Leitura --------------------------------------------------------------
+
+    def exists(self) -> bool:
+        return os.path.exists(self.journal_file)
+
+    def load(self) -> 'RenameJournal':
+        """Reconstrói o estado a partir do arquivo (linhas truncadas são ignoradas)."""
+        self.operations = []
+        self.stages_done = set()
+        self.jpg_planned = self.finished = self.undone = False
+        self._done_targets = set()
+        self._done_texts = set()
+        by_id: Dict[int, JournalOperation] = {}
+        discarded: Set[int] = set()
+        with open(self.journal_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última linha incompleta (interrupção durante a escrita)
+                    continue
+                op = record.get('op')
+                if op == 'plan':
+                    operation = JournalOperation(record['id'], record['kind'], record['source'],
+                                                 record.get('target'), record.get('backup'))
+                    by_id[operation.op_id] = operation
+                    self.operations.append(operation)
+                    self._next_id = max(self._next_id, operation.op_id + 1)
+                elif op == 'done' and record.get('id') in by_id:
+                    self._mark_done(by_id[record['id']])
+                elif op == 'discard':
+                    discarded.add(record.get('id'))
+                elif op == 'stage':
+                    self.stages_done.add(record['name'])
+                elif op == 'jpg_plan':
+                    self.jpg_planned = True
+                elif op == 'end':
+                    self.finished = True
+                elif op == 'undone':
+                    self.undone = True
+        if discarded:
+            self.operations = [operation for operation in self.operations
+                               if operation.op_id not in discarded]
+        return self
+
+    @property
+    def interrupted(self) -> bool:
+        """True se há uma execução iniciada e não concluída."""
+        return self.exists() and not self.finished and not self.undone
+
+    def pending(self) -> List[JournalOperation]:
+        return [operation for operation in self.operations if not operation.done]
+
+    def completed(self) -> List[JournalOperation]:
+        return [operation for operation in self.operations if operation.done]
+
+    def completed_renames(self) -> Dict[str, str]:
+        """
+        Renomeações concluídas, da origem ao destino final (encadeamentos,
+        como os nomes temporários de ciclos, são resolvidos).
+        """
+        renames: Dict[str, str] = {}
+        origins: Dict[str, str] = {}  # destino intermediário -> origem
+        for operation in self.completed():
+            if operation.kind != OP_RENAME:
+                continue
+            origin = origins.pop(operation.source, operation.source)
+            renames.pop(origin, None)
+            renames[origin] = operation.target
+            origins[operation.target] = origin
+        for origin, target in list(renames.items()):
+            if origin == target:
+                del renames[origin]
+        return renames
+
+    def is_done_target(self, path: str) -> bool:
+        """True se o caminho é o destino de uma renomeação já concluída."""
+        return os.path.abspath(path) in self._done_targets
+
+    def is_text_done(self, path: str) -> bool:
+        return os.path.abspath(path) in self._done_texts
+
+    def rewritten_texts(self) -> List[str]:
+        """Textos com regravação confirmada (podem ter conteúdo novo)."""
+        return sorted(self._done_texts)
+
+    def _mark_done(self, operation: JournalOperation) -> None:
+        operation.done = True
+        if operation.kind == OP_RENAME and operation.target:
+            self._done_targets.add(operation.target)
+        elif operation.kind == OP_TEXT:
+            self._done_texts.add(operation.source)
+
+    # Escrita --------------------------------------------------------------
+
+    def start(self) -> None:
+        """Inicia um diário novo (substitui um diário concluído ou desfeito)."""
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        self.operations = []
+        self.stages_done = set()
+        self.jpg_planned = self.finished = self.undone = False
+        self._done_targets = set()
+        self._done_texts = set()
+        self._next_id = 1
+        self._append([{'op': 'begin', 'root': self.directory, 'old_name': self.old_name,
+                       'new_name': self.new_name, 'time': time.time()}])
+
+    def _append(self, records: Iterable[Dict[str, Any]], sync: bool = False) -> None:
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.journal_file, 'a', encoding='utf-8')
+            self._file.write(data)
+            self._file.flush()
+            durability = get_durability()
+            if durability == DURABILITY_FULL or (sync and durability != DURABILITY_NONE):
+                os.fsync(self._file.fileno())
+
+    def plan(self, kind: str, source: str, target: Optional[str] = None,
+             backup: Optional[str] = None) -> JournalOperation:
+        """Registra uma operação antes de executá-la."""
+        return self.plan_many([(kind, source, target, backup)])[0]
+
+    def plan_many(self, entries: Iterable[Tuple[str, str, Optional[str], Optional[str]]]) -> List[JournalOperation]:
+        """Registra várias operações em uma única escrita."""
+        with self._lock:
+            new_operations = []
+            for kind, source, target, backup in entries:
+                # Caminhos absolutos: o undo pode rodar de outro diretório de trabalho
+                new_operations.append(JournalOperation(
+                    self._next_id, kind, os.path.abspath(source),
+                    os.path.abspath(target) if target is not None else None, backup
+                ))
+                self._next_id += 1
+            self.operations.extend(new_operations)
+        records = []
+        for operation in new_operations:
+            record = {'op': 'plan', 'id': operation.op_id, 'kind': operation.kind, 'source': operation.source}
+            if operation.target is not None:
+                record['target'] = operation.target
+            if operation.backup is not None:
+                record['backup'] = operation.backup
+            records.append(record)
+        # O plano precisa estar no disco antes de qualquer operação
+        self._append(records, sync=True)
+        return new_operations
+
+    def done(self, operation: JournalOperation) -> None:
+        """Confirma uma operação já executada."""
+        self._mark_done(operation)
+        self._append([{'op': 'done', 'id': operation.op_id}])
+
+    def discard(self, operation: JournalOperation) -> None:
+        """Descarta uma operação planejada que falhou (nada foi alterado)."""
+        with self._lock:
+            self.operations = [item for item in self.operations if item is not operation]
+        self._append([{'op': 'discard', 'id': operation.op_id}])
+
+    def record(self, kind: str, source: str, target: Optional[str] = None) -> None:
+        """Registra uma operação já executada (plan + done)."""
+        self.done(self.plan(kind, source, target))
+
+    def mark_jpg_planned(self) -> None:
+        self.jpg_planned = True
+        self._append([{'op': 'jpg_plan'}], sync=True)
+
+    def stage_done(self, name: str) -> None:
+        self.stages_done.add(name)
+        self._append([{'op': 'stage', 'name': name}], sync=True)
+
+    def finish(self) -> None:
+        self.finished = True
+        self._append([{'op': 'end', 'time': time.time()}], sync=True)
+        self.close()
+        prune_journals(self.journal_root, exclude=self.path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # Operações com registro ---------------------------------------------------
+
+    def rename(self, source: str, target: str) -> None:
+        """os.rename registrado no diário (planejado antes, confirmado depois)."""
+        operation = self.plan(OP_RENAME, source, target)
+        try:
+            os.rename(source, target)
+        except OSError:
+            self.discard(operation)
+            raise
+        self.done(operation)
+
+    def backup_texts(self, filenames: List[str]) -> List[JournalOperation]:
+        """
+        Copia os arquivos de texto antes da regravação e registra as
+        regravações em uma única escrita.
+
+        Returns:
+            List[JournalOperation]: Uma operação por arquivo, na mesma ordem
+        """
+        backup_directory = os.path.join(self.path, BACKUP_DIRECTORY)
+        os.makedirs(backup_directory, exist_ok=True)
+        entries = []
+        for index, filename in enumerate(filenames, self._next_id):
+            backup = os.path.join(backup_directory, f"{index}-{os.path.basename(filename)}")
+            shutil.copy2(filename, backup)
+            entries.append((OP_TEXT, filename, None, backup))
+        return self.plan_many(entries)
+
+    # Retomada e desfazer ------------------------------------------------------
+
+    def complete_pending(self) -> int:
+        """
+        Conclui as operações planejadas e não confirmadas de uma execução
+        interrompida, verificando apenas os caminhos dessas operações.
+
+        - rename: executa se a origem ainda existe; confirma se só o destino existe
+        - text: restaura a cópia do original (a regravação é refeita depois)
+        - create: remove o que foi criado pela metade (a etapa é refeita depois)
+
+        Returns:
+            int: Número de operações tratadas
+
+        Raises:
+            JournalError: Se origem e destino de uma renomeação existirem
+                (ou nenhum dos dois)
+        """
+        handled = 0
+        for operation in self.pending():
+            if operation.kind == OP_RENAME:
+                source_exists = os.path.lexists(operation.source)
+                target_exists = os.path.lexists(operation.target)
+                if source_exists and not target_exists:
+                    os.rename(operation.source, operation.target)
+                elif not (target_exists and not source_exists):
+                    raise JournalError(f"Não é possível retomar {operation.source} -> {operation.target}")
+                self.done(operation)
+            elif operation.kind == OP_TEXT:
+                if operation.backup and os.path.exists(operation.backup):
+                    shutil.copy2(operation.backup, operation.source)
+                self._append([{'op': 'discard', 'id': operation.op_id}])
+            elif operation.kind == OP_CREATE:
+                _remove_path(operation.source)
+                self._append([{'op': 'discard', 'id': operation.op_id}])
+            handled += 1
+        self.operations = [operation for operation in self.operations
+                           if operation.done or operation.kind == OP_RENAME]
+        return handled
+
+    def undo(self) -> Dict[str, int]:
+        """
+        Desfaz as operações concluídas em ordem inversa.
+
+        Returns:
+            Dict[str, int]: Operações desfeitas, ignoradas (caminho já
+                alterado) e irreversíveis (mesclas de diretórios)
+        """
+        summary = {'undone': 0, 'skipped': 0, 'irreversible': 0}
+        for operation in reversed(self.completed()):
+            if operation.kind == OP_RENAME:
+                if os.path.lexists(operation.target) and not os.path.lexists(operation.source):
+                    os.rename(operation.target, operation.source)
+                    summary['undone'] += 1
+                else:
+                    logger.warning(f"Não desfeito (caminho alterado): {operation.target} -> {operation.source}")
+                    summary['skipped'] += 1
+            elif operation.kind == OP_TEXT:
+                if operation.backup and os.path.exists(operation.backup):
+                    shutil.copy2(operation.backup, operation.source)
+                    summary['undone'] += 1
+                else:
+                    summary['skipped'] += 1
+            elif operation.kind == OP_CREATE:
+                _remove_path(operation.source)
+                summary['undone'] += 1
+            else:
+                logger.warning(f"Operação irreversível: {operation.kind} {operation.source} -> {operation.target}")
+                summary['irreversible'] += 1
+        if get_durability() != DURABILITY_NONE:
+            fsync_directory(self.directory)
+        self._append([{'op': 'undone', 'time': time.time(), **summary}], sync=True)
+        self.undone = True
+        self.close()
+        prune_journals(self.journal_root)
+        return summary
+
+
+def prune_journals(journal_root: str, keep: int = JOURNAL_RETENTION_COUNT,
+                   max_age_days: float = JOURNAL_RETENTION_DAYS, exclude: Optional[str] = None) -> int:
+    """
+    Remove os diários concluídos ou desfeitos (com as cópias dos textos)
+    além dos keep mais recentes ou com mais de max_age_days dias. Diários
+    de execuções interrompidas ou em andamento são mantidos.
+
+    Args:
+        journal_root (str): Pasta dos diários (cache/journals)
+        keep (int): Diários concluídos mantidos
+        max_age_days (float): Idade máxima de um diário concluído
+        exclude (str): Diário que nunca é removido (o da execução atual)
+
+    Returns:
+        int: Diários removidos
+    """
+    closed = []
+    try:
+        root_keys = os.listdir(journal_root)
+    except OSError:
+        return 0
+    for root_key in root_keys:
+        root_path = os.path.join(journal_root, root_key)
+        try:
+            names = os.listdir(root_path)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(root_path, name)
+            if exclude is not None and os.path.normcase(path) == os.path.normcase(exclude):
+                continue
+            journal_file = os.path.join(path, JOURNAL_FILENAME)
+            try:
+                modified = os.path.getmtime(journal_file)
+            except OSError:
+                continue
+            if _last_record(journal_file) in ('end', 'undone'):
+                closed.append((modified, path))
+
+    closed.sort(reverse=True)
+    oldest = time.time() - max_age_days * 86400
+    kept = 1 if exclude is not None else 0
+    removed = 0
+    for modified, path in closed:
+        if kept < keep and modified >= oldest:
+            kept += 1
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+        try:
+            os.rmdir(os.path.dirname(path))  # Raiz sem outros diários
+        except OSError:
+            pass
+    if removed:
+        logger.info(f"{removed} diário(s) de renomeação antigo(s) removido(s)")
+    return removed
+
+
+def _last_record(journal_file: str) -> Optional[str]:
+    """Campo 'op' do último registro do diário (lê apenas o final do arquivo)."""
+    try:
+        with open(journal_file, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(file.tell() - 4096, 0))
+            lines = file.read().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        try:
+            return json.loads(line).get('op')
+        except ValueError:
+            continue
+    return None
+
+
+def _remove_path(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    elif os.path.lexists(path):
+        os.remove(path)
@@ -0,0 +1,314 @@
+"""
+Planejamento e execução de renomeações de arquivos JPG em lote.
+
+Todos os nomes de destino são calculados antes de qualquer renomeação
+(via JpgFilenameProcessor), colisões e ciclos são resolvidos em memória e as
+chamadas os.rename são executadas em paralelo, sem verificações de
+existência arquivo a arquivo. RenameMap reúne as renomeações feitas em um
+lote (diretórios e arquivos) para quem precisa dos nomes finais depois.
+"""
+
+import os
+from typing import Dict, Iterable, List, Set, Tuple
+from config import DEFAULT_WORKERS, LOG_MESSAGES, LOG_ERROR, LOG_WARNING, LOG_INFO, STAGE_FILE_RENAME
+from utils import JpgFilenameProcessor, LoggingUtils
+from worker_pool import run_bounded
+from rename_journal import OP_RENAME
+from instrumentation import traced, count, RENAMES
+from log_manager import get_logger
+
+logger = get_logger('rename_planner')
+
+TEMP_SUFFIX = '.operalote-tmp'
+
+
+class RenameOperation:
+    """Renomeação de um arquivo (caminhos completos)."""
+
+    __slots__ = ('source', 'target', 'temporary')
+
+    def __init__(self, source: str, target: str, temporary: bool = False):
+        self.source = source
+        self.target = target
+        self.temporary = temporary  # Etapa intermediária para quebrar um ciclo
+
+    def __repr__(self) -> str:
+        return f"RenameOperation({self.source!r} -> {self.target!r})"
+
+
+class RenameMap:
+    """
+    Todas as renomeações de um lote (diretórios e arquivos), na ordem em
+    que foram feitas. resolve() leva um caminho anterior às renomeações ao
+    caminho final, sem consultar o disco: os diretórios são aplicados como
+    prefixo, em ordem, e os arquivos por correspondência exata.
+
+    Diretórios mesclados (conteúdo movido sobre um destino existente) podem
+    ter arquivos substituídos: o que estiver neles não tem conteúdo garantido.
+    """
+
+    def __init__(self):
+        self.directories: List[Tuple[str, str]] = []  # (origem, destino), na ordem
+        self.files: Dict[str, str] = {}               # origem -> destino final
+        self.merged: List[str] = []                   # Destinos de mesclas
+        self._origins: Dict[str, str] = {}            # destino -> origem (renomeações em cadeia)
+
+    def add_directory(self, source: str, target: str, merged: bool = False) -> None:
+        """Diretório renomeado ou, com merged, com o conteúdo movido para target."""
+        source, target = os.path.abspath(source), os.path.abspath(target)
+        if source != target:
+            self.directories.append((source, target))
+            if merged:
+                self.merged.append(target)
+
+    def add_file(self, source: str, target: str) -> None:
+        source, target = os.path.abspath(source), os.path.abspath(target)
+        origin = self._origins.pop(source, source)
+        self.files[origin] = target
+        self._origins[target] = origin
+
+    def add_files(self, mapping: Dict[str, str]) -> None:
+        for source, target in mapping.items():
+            self.add_file(source, target)
+
+    def resolve(self, path: str) -> str:
+        """
+        Caminho final de um arquivo.
+
+        Args:
+            path (str): Caminho anterior às renomeações (ou já no diretório
+                final, com o nome antigo do arquivo)
+
+        Returns:
+            str: Caminho após as renomeações (o próprio caminho se nada mudou)
+        """
+        path = os.path.abspath(path)
+        for source, target in self.directories:
+            if path == source or path.startswith(source + os.sep):
+                path = target + path[len(source):]
+        return self.files.get(path, path)
+
+    def in_merged_directory(self, path: str) -> bool:
+        """True se o caminho (final) está em um diretório mesclado."""
+        path = os.path.abspath(path)
+        return any(path.startswith(directory + os.sep) for directory in self.merged)
+
+    def __len__(self) -> int:
+        return len(self.directories) + len(self.files)
+
+
+class JpgRenamePlan:
+    """
+    Plano de renomeação: operações agrupadas em etapas. Operações de uma
+    mesma etapa são independentes entre si e podem ser executadas em
+    paralelo; as etapas são executadas em ordem.
+    """
+
+    def __init__(self):
+        self.stages: List[List[RenameOperation]] = []
+        self.skipped: List[Tuple[str, str, str]] = []  # (origem, destino, chave de LOG_MESSAGES)
+        self.mapping: Dict[str, str] = {}  # origem -> destino final
+
+    @property
+    def operations(self) -> List[RenameOperation]:
+        return [operation for stage in self.stages for operation in stage]
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+
+class JpgRenamePlanner:
+    """Calcula o plano de renomeação de um conjunto de arquivos JPG."""
+
+    @staticmethod
+    @traced('JpgRenamePlanner.plan')
+    def plan(
+        jpg_paths: Iterable[str],
+        old_name_number: str,
+        new_name_number: str,
+        existing_paths: Iterable[str]
+    ) -> JpgRenamePlan:
+        """
+        Monta o plano de renomeação.
+
+        Args:
+            jpg_paths: Caminhos dos JPGs candidatos à renomeação
+            old_name_number (str): Número antigo do lote
+            new_name_number (str): Número novo do lote
+            existing_paths: Todos os arquivos existentes nos diretórios
+                envolvidos (usado para detectar colisões sem consultar o disco)
+
+        Returns:
+            JpgRenamePlan: Plano com etapas ordenadas e operações ignoradas
+        """
+        plan = JpgRenamePlan()
+        existing: Set[str] = set(existing_paths)
+
+        # 1. Calcula todos os destinos
+        targets: Dict[str, str] = {}
+        for source in sorted(set(jpg_paths)):
+            new_filename = JpgFilenameProcessor.update_jpg_filename(
+                os.path.basename(source), old_name_number, new_name_number
+            )
+            target = os.path.join(os.path.dirname(source), new_filename)
+            if target == source:
+                plan.skipped.append((source, target, 'not_renaming'))
+                continue
+            targets[source] = target
+
+        # 2. Colisões: dois arquivos para o mesmo destino, ou destino ocupado
+        #    por um arquivo que não será renomeado
+        claimed: Dict[str, str] = {}
+        for source, target in list(targets.items()):
+            if target in claimed:
+                plan.skipped.append((source, target, 'file_exists'))
+                del targets[source]
+            else:
+                claimed[target] = source
+
+        changed = True
+        while changed:
+            changed = False
+            for source, target in list(targets.items()):
+                if target in existing and target not in targets:
+                    plan.skipped.append((source, target, 'file_exists'))
+                    del targets[source]
+                    changed = True
+
+        # 3. Ordena em etapas: uma operação só executa depois que o arquivo
+        #    que ocupa seu destino tiver sido renomeado. Ciclos são quebrados
+        #    com um nome temporário.
+        remaining = dict(targets)
+        while remaining:
+            stage = [RenameOperation(source, target) for source, target in remaining.items()
+                     if target not in remaining]
+            if not stage:
+                source = next(iter(remaining))
+                temp = JpgRenamePlanner._temp_name(source, existing, remaining)
+                plan.stages.append([RenameOperation(source, temp, temporary=True)])
+                remaining[temp] = remaining.pop(source)
+                continue
+            plan.stages.append(stage)
+            for operation in stage:
+                del remaining[operation.source]
+
+        plan.mapping = targets
+        return plan
+
+    @staticmethod
+    def _temp_name(source: str, existing: Set[str], remaining: Dict[str, str]) -> str:
+        """Gera um nome temporário livre no mesmo diretório."""
+        index = 0
+        while True:
+            temp = f"{source}{TEMP_SUFFIX}{index}"
+            if temp not in existing and temp not in remaining:
+                return temp
+            index += 1
+
+
+class JpgRenameExecutor:
+    """Executa um JpgRenamePlan com um pool de workers."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, inventory=None, progress=None,
+                 journal=None):
+        self.max_workers = max_workers
+        self.inventory = inventory
+        self.progress = progress
+        self.journal = journal  # RenameJournal opcional
+
+    @traced()
+    def execute(self, plan: JpgRenamePlan) -> Dict[str, str]:
+        """
+        Executa as etapas do plano em ordem; dentro de cada etapa as
+        renomeações são feitas em paralelo. Erros são isolados por arquivo:
+        operações que dependem de uma renomeação que falhou são canceladas,
+        para nunca sobrescrever um arquivo que continua no lugar.
+        
+        Um pedido de cancelamento (progress.cancel()) interrompe a execução
+        entre arquivos, exceto quando há arquivos com nome temporário de
+        ciclo pendentes: nesse caso o ciclo é concluído antes de parar.
+        
+        Com um diário, o plano inteiro é registrado (uma única escrita)
+        antes da primeira renomeação e cada renomeação é confirmada ao
+        terminar; uma retomada conclui apenas as operações pendentes.
+
+        Args:
+            plan (JpgRenamePlan): Plano a executar
+
+        Returns:
+            Dict[str, str]: Renomeações concluídas (origem -> destino final)
+        """
+        debug = LoggingUtils.is_debug_enabled()
+        for source, target, reason in plan.skipped:
+            if reason == 'file_exists':
+                LoggingUtils.count(STAGE_FILE_RENAME, 'destino_existente')
+                if debug:
+                    logger.debug(f"    {LOG_WARNING}  {LOG_MESSAGES['file_exists'].format(target)}")
+                    logger.debug(f"    {LOG_INFO}  {LOG_MESSAGES['file_exists_info']}")
+            elif debug:
+                logger.debug(f"    {LOG_INFO}  {LOG_MESSAGES['not_renaming'].format(source, target)}")
+
+        journal_operations = {}
+        if self.journal is not None:
+            operations = [operation for stage in plan.stages for operation in stage]
+            planned = self.journal.plan_many(
+                (OP_RENAME, operation.source, operation.target, None) for operation in operations
+            )
+            journal_operations = dict(zip(map(id, operations), planned))
+            self.journal.mark_jpg_planned()
+
+        completed: Dict[str, str] = {}
+        origins: Dict[str, str] = {}  # nome temporário -> origem real
+        failed: Set[str] = set()      # caminhos que continuam ocupados/indisponíveis
+        for stage in plan.stages:
+            if self._should_stop(origins):
+                break
+            runnable = []
+            for operation in stage:
+                if operation.source in failed or operation.target in failed:
+                    failed.add(operation.source)
+                    self._discard(journal_operations, operation)
+                    LoggingUtils.count(STAGE_FILE_RENAME, 'falhas')
+                    logger.error(f"    {LOG_ERROR} {LOG_MESSAGES['file_rename_error'].format(operation.source, 'operação dependente cancelada')}")
+                else:
+                    runnable.append(operation)
+
+            for operation, _, error in run_bounded(_rename, runnable, self.max_workers,
+                                                   should_stop=lambda: self._should_stop(origins)):
+                if self.progress is not None and not operation.temporary:
+                    self.progress.advance(failed=1 if error is not None else 0)
+                if error is not None:
+                    failed.add(operation.source)
+                    failed.add(operation.target)
+                    self._discard(journal_operations, operation)
+                    LoggingUtils.count(STAGE_FILE_RENAME, 'falhas')
+                    logger.error(f"    {LOG_ERROR} {LOG_MESSAGES['file_rename_error'].format(operation.source, error)}")
+                    continue
+
+                if id(operation) in journal_operations:
+                    self.journal.done(journal_operations[id(operation)])
+                if self.inventory is not None and self.inventory.contains(operation.source):
+                    self.inventory.rename_file(operation.source, operation.target)
+                origin = origins.pop(operation.source, operation.source)
+                if operation.temporary:
+                    origins[operation.target] = origin
+                else:
+                    completed[origin] = operation.target
+                    LoggingUtils.log_file_rename(origin, operation.target, True)
+        return completed
+
+    def _discard(self, journal_operations, operation: RenameOperation) -> None:
+        """Operação que falhou não fica pendente para a retomada."""
+        journal_operation = journal_operations.get(id(operation))
+        if journal_operation is not None:
+            self.journal.discard(journal_operation)
+
+    def _should_stop(self, origins: Dict[str, str]) -> bool:
+        """Cancelamento só é atendido sem arquivos em nome temporário."""
+        return self.progress is not None and self.progress.cancelled and not origins
+
+
+def _rename(operation: RenameOperation) -> None:
+    """Renomeia um arquivo (executado pelos workers)."""
+    os.rename(operation.source, operation.target)
+    count(RENAMES)
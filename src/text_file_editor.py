@@ -1,19 +1,37 @@
 import os
 import glob
-import re
 from utils import (
     LotNumberUtils, 
     DirectoryUtils, 
     JpgFilenameProcessor, 
-    TextLineProcessor,
     LoggingUtils
 )
+from text_pipeline import (
+    TextPipeline,
+    InfractionCodeTransform,
+    InfractionTargetTransform,
+    InfractionCountTransform,
+    build_rename_transforms
+)
+from worker_pool import run_bounded
+from text_stream import iter_text_lines, SpooledTextWriter, sync_written_files
+from config import DEFAULT_WORKERS, TEXT_EXECUTOR, STAGE_TEXT_FILES, MD5SUM_FILENAME
+from instrumentation import traced
+from log_manager import get_logger
+
+logger = get_logger('text_file_editor')
+
 
 class TextFileEditor:
     def __init__(self, directory):
         self.directory = directory
         self.add_year = True  # Default: adicionar ano
         self.year = "2023"    # Default: ano 2023
+        self.inventory = None  # LotInventory compartilhado entre as etapas
+        self.max_workers = DEFAULT_WORKERS  # Arquivos reescritos em paralelo
+        self.executor_type = TEXT_EXECUTOR  # 'thread' ou 'process'
+        self.progress = None  # ProgressTracker opcional (execução em segundo plano)
+        self.journal = None  # RenameJournal opcional (retomada e undo)
 
     def _extract_numbers_from_name(self, name):
         """Delega para LotNumberUtils."""
@@ -23,9 +41,24 @@ class TextFileEditor:
         """Delega para LotNumberUtils."""
         return LotNumberUtils.create_padded_number(number, padding)
 
-    def _get_search_directories(self):
-        """Delega para DirectoryUtils."""
-        return DirectoryUtils.get_text_search_directories(self.directory)
+    def _get_search_directories(self, lot_directory):
+        """
+        Delega para o inventário do lote ou para DirectoryUtils. Inclui todos
+        os subdiretórios do lote, em qualquer profundidade, como fazia o
+        rename_text_content; os demais lotes da raiz nunca são percorridos.
+
+        Args:
+            lot_directory (str): Diretório do lote renomeado
+        """
+        if self.inventory is not None:
+            return self.inventory.get_directories()
+        return DirectoryUtils.get_search_directories(lot_directory)
+
+    def _get_text_files(self, search_dir):
+        """Lista os arquivos .txt de um diretório de busca."""
+        if self.inventory is not None:
+            return self.inventory.get_files_in(search_dir, '.txt')
+        return glob.glob(os.path.join(search_dir, '*.txt'))
 
     def _update_jpg_filename(self, filename, old_name_number, new_name_number):
         """Delega para JpgFilenameProcessor."""
@@ -41,6 +74,50 @@ class TextFileEditor:
         """
         self.add_year = add_year
         self.year = year if add_year else None
+
+    def set_inventory(self, inventory):
+        """
+        Define o inventário do lote. Com inventário, a busca de arquivos de
+        texto fica restrita ao lote e não consulta o disco.
+
+        Args:
+            inventory (LotInventory): Inventário do lote, ou None
+        """
+        self.inventory = inventory
+
+    def set_progress(self, progress):
+        """
+        Define o ProgressTracker que recebe o progresso por arquivo e
+        transmite pedidos de cancelamento.
+
+        Args:
+            progress (ProgressTracker): Progresso, ou None
+        """
+        self.progress = progress
+
+    def set_journal(self, journal):
+        """
+        Define o diário de renomeação. Com diário, rewrite_lot_text copia
+        cada arquivo antes de regravá-lo e ignora os já regravados em uma
+        execução anterior interrompida.
+
+        Args:
+            journal (RenameJournal): Diário do lote, ou None
+        """
+        self.journal = journal
+
+    def set_parallelism(self, max_workers, executor_type=TEXT_EXECUTOR):
+        """
+        Configura o pool de reescrita de arquivos de texto.
+
+        Args:
+            max_workers (int): Número de arquivos processados ao mesmo tempo
+                (1 desativa o paralelismo)
+            executor_type (str): 'thread' (padrão, ideal para E/S em rede)
+                ou 'process'
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.executor_type = executor_type
     
     def _process_text_line_with_year_config(self, line, old_name_number, new_name_number):
         """
@@ -111,52 +188,185 @@ class TextFileEditor:
             )
         return field
 
+    @traced()
     def edit_text_content(self, old_name, new_name):
         old_name_number = self._extract_numbers_from_name(old_name)
         new_name_number = self._extract_numbers_from_name(new_name)
 
         # Padroniza o novo número com 7 dígitos
         new_name_number = self._create_padded_number(new_name_number)
-        print(f'Text Content: {new_name_number} ')
-        print(f'Text Old Number: {old_name_number}')
-        print(f'Processando arquivos de texto para renomeação de {old_name} para {new_name}')
+        logger.debug(f'Text Content: {new_name_number} ')
+        logger.debug(f'Text Old Number: {old_name_number}')
+        logger.info(f'Processando arquivos de texto para renomeação de {old_name} para {new_name}')
 
-        # Define os diretórios onde procurar arquivos de texto
-        search_directories = self._get_search_directories()
-        
-        # Processa arquivos .txt em todos os diretórios relevantes
-        for search_dir in search_directories:
-            if not os.path.exists(search_dir):
+        # Arquivos .txt de todos os diretórios relevantes
+        # IMPORTANTE: Nunca alterar o conteúdo do arquivo md5sum.txt
+        filenames = []
+        for filename in self._get_lot_text_files(old_name, new_name):
+            if os.path.basename(filename).lower() == 'md5sum.txt':
+                LoggingUtils.log_skip_md5sum(filename)
+            else:
+                filenames.append(filename)
+
+        # Arquivos reescritos em paralelo; resultados na ordem de entrada
+        # e erros isolados por arquivo
+        task = _EditTextFileTask(self, old_name_number, new_name_number)
+        progress = self.progress
+        if progress is not None:
+            progress.set_stage("Editando arquivos de texto", len(filenames))
+        should_stop = (lambda: progress.cancelled) if progress is not None else None
+        written = []
+        for filename, processed_lines, error in run_bounded(
+                task, filenames, self.max_workers, executor_type=self.executor_type,
+                should_stop=should_stop):
+            if progress is not None:
+                progress.advance(failed=1 if error is not None else 0)
+            if error is not None:
+                LoggingUtils.count(STAGE_TEXT_FILES, 'falhas')
+                logger.error(f"Erro ao processar arquivo {filename}: {error}")
                 continue
-                
-            for filename in glob.glob(os.path.join(search_dir, '*.txt')):
-                # IMPORTANTE: Nunca alterar o conteúdo do arquivo md5sum.txt
-                if os.path.basename(filename).lower() == 'md5sum.txt':
-                    LoggingUtils.log_skip_md5sum(filename)
-                    continue
-                    
-                try:
-                    with open(filename, 'r', encoding='utf-8') as file:
-                        filedata = file.readlines()
-
-                    new_filedata = []
-                    for line in filedata:
-                        # Usa o processador de linha customizado com configuração de ano
-                        processed_line = self._process_text_line_with_year_config(
-                            line, old_name_number, new_name_number
-                        )
-                        
-                        # Log da linha processada
-                        print(f"Linha processada: {processed_line.strip()}")
-                        new_filedata.append(processed_line)
-                        
-                    # Salva o arquivo atualizado
-                    with open(filename, 'w', encoding='utf-8') as file:
-                        file.writelines(new_filedata)
-                        
-                    LoggingUtils.log_text_file_update(filename)
-                    
-                except Exception as e:
-                    print(f"Erro ao processar arquivo {filename}: {e}")
-                    import traceback
-                    traceback.print_exc()
\ No newline at end of file
+
+            # Linhas processadas: contador de resumo (texto de cada linha só em DEBUG)
+            LoggingUtils.log_lines_processed(processed_lines)
+
+            written.append(filename)
+            if self.inventory is not None:
+                self.inventory.update_file(filename)
+
+            LoggingUtils.log_text_file_update(filename)
+        sync_written_files(written)
+        LoggingUtils.log_stage_summary(STAGE_TEXT_FILES)
+
+    def _edit_text_file(self, filename, old_name_number, new_name_number):
+        """
+        Reescreve um arquivo de texto com a configuração de ano.
+
+        Args:
+            filename (str): Caminho do arquivo .txt
+            old_name_number (str): Número antigo do lote
+            new_name_number (str): Número novo do lote (7 dígitos)
+
+        Returns:
+            int: Número de linhas processadas (para o log)
+        """
+        debug = LoggingUtils.is_debug_enabled()
+        processed_lines = 0
+        with SpooledTextWriter(filename) as writer:
+            for line in iter_text_lines(filename):
+                # Usa o processador de linha customizado com configuração de ano
+                new_line = self._process_text_line_with_year_config(
+                    line, old_name_number, new_name_number
+                )
+                writer.write(new_line)
+                processed_lines += 1
+                if debug:
+                    LoggingUtils.log_line_processed(new_line)
+
+            # Salva o arquivo atualizado
+            writer.commit()
+
+        return processed_lines
+
+    def _get_lot_text_files(self, old_name, new_name):
+        """Lista todos os arquivos .txt do lote, em qualquer profundidade."""
+        lot_directory = DirectoryUtils.get_lot_directory(self.directory, old_name, new_name)
+        filenames = []
+        for search_dir in self._get_search_directories(lot_directory):
+            if self.inventory is None and not os.path.exists(search_dir):
+                continue
+            filenames.extend(self._get_text_files(search_dir))
+        return filenames
+
+    def build_lot_pipeline(self, old_name, new_name, code_map=None, count_infractions=True,
+                           target_code=None):
+        """
+        Monta o TextPipeline de renomeação do lote com a configuração de ano
+        do editor (usado por rewrite_lot_text e pela ingestão de .zip).
+
+        Args:
+            old_name (str): Nome antigo do lote
+            new_name (str): Nome novo do lote
+            code_map (dict): Mapeamento código antigo -> código novo (opcional)
+            count_infractions (bool): Se deve contar os códigos de infração
+            target_code (str): Padroniza todos os códigos para este (opcional)
+
+        Returns:
+            TextPipeline: Pipeline pronto para processar os arquivos
+        """
+        old_name_number = self._extract_numbers_from_name(old_name)
+        new_name_number = self._create_padded_number(self._extract_numbers_from_name(new_name))
+
+        transforms = build_rename_transforms(
+            old_name_number, new_name_number, self.year if self.add_year else None
+        )
+        if code_map:
+            transforms.append(InfractionCodeTransform(code_map))
+        if target_code:
+            transforms.append(InfractionTargetTransform(target_code))
+        if count_infractions:
+            transforms.append(InfractionCountTransform())
+        return TextPipeline(transforms)
+
+    @traced()
+    def rewrite_lot_text(self, old_name, new_name, code_map=None, count_infractions=True,
+                         target_code=None):
+        """
+        Reescreve os arquivos de texto do lote em passada única: número do
+        lote, sufixo de ano, referências JPG e, opcionalmente, substituição
+        de códigos de infração. Substitui a sequência rename_text_content +
+        edit_text_content + analyze_infractions (uma leitura e no máximo uma
+        escrita por arquivo).
+
+        Args:
+            old_name (str): Nome antigo do lote
+            new_name (str): Nome novo do lote
+            code_map (dict): Mapeamento código antigo -> código novo (opcional)
+            count_infractions (bool): Se deve contar os códigos de infração
+            target_code (str): Padroniza todos os códigos para este (opcional)
+
+        Returns:
+            TextPipelineResult: Resultados por arquivo e contagem de infrações
+        """
+        logger.info(f'Processando arquivos de texto para renomeação de {old_name} para {new_name}')
+        pipeline = self.build_lot_pipeline(old_name, new_name, code_map, count_infractions, target_code)
+
+        # md5sum.txt não é alterado aqui (tem cópia própria em update_lot_manifests)
+        filenames = [filename for filename in self._get_lot_text_files(old_name, new_name)
+                     if os.path.basename(filename).lower() != MD5SUM_FILENAME]
+        journal_operations = {}
+        if self.journal is not None:
+            filenames = [filename for filename in filenames if not self.journal.is_text_done(filename)]
+            journal_operations = dict(zip(filenames, self.journal.backup_texts(filenames)))
+        if self.progress is not None:
+            self.progress.set_stage("Reescrevendo arquivos de texto", len(filenames))
+        result = pipeline.process_files(
+            filenames, self.max_workers, self.executor_type, self.progress
+        )
+        for file_result in result.files:
+            if file_result.filename in journal_operations and file_result.error is None:
+                self.journal.done(journal_operations[file_result.filename])
+            if file_result.written:
+                if self.inventory is not None:
+                    self.inventory.update_file(file_result.filename)
+                LoggingUtils.log_text_file_update(file_result.filename)
+        LoggingUtils.log_stage_summary(STAGE_TEXT_FILES)
+        return result
+
+
+class _EditTextFileTask:
+    """
+    Tarefa de reescrita de um arquivo. Guarda apenas a configuração de ano,
+    de modo que pode ser enviada tanto a threads quanto a processos.
+    """
+
+    def __init__(self, editor, old_name_number, new_name_number):
+        self.add_year = editor.add_year
+        self.year = editor.year
+        self.old_name_number = old_name_number
+        self.new_name_number = new_name_number
+
+    def __call__(self, filename):
+        editor = TextFileEditor(os.path.dirname(filename))
+        editor.add_year = self.add_year
+        editor.year = self.year
+        return editor._edit_text_file(filename, self.old_name_number, self.new_name_number)
@@ -0,0 +1,389 @@
+"""
+Pipeline de processamento de arquivos de texto em passada única.
+
+Cada arquivo .txt do lote é lido uma vez, cada linha passa por uma sequência
+de transformações (número do lote, sufixo de ano, referências a JPG,
+substituição e contagem de códigos de infração) e o arquivo é gravado no
+máximo uma vez. As contagens de infrações são obtidas como subproduto.
+"""
+
+import os
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from config import TEXT_SEPARATOR, JPG_EXTENSION, MD5SUM_FILENAME
+from utils import LotNumberUtils, JpgFilenameProcessor
+from worker_pool import run_bounded, EXECUTOR_THREAD
+from text_stream import iter_text_lines, SpooledTextWriter, sync_written_files
+from log_manager import get_logger
+
+logger = get_logger('text_pipeline')
+
+
+class LineTransform:
+    """
+    Transformação aplicada a uma linha já separada em campos.
+
+    Subclasses implementam apply(), que altera a lista de campos no lugar e
+    retorna True se a linha deve ser regravada. As transformações não guardam
+    estado: contadores são acumulados no TextFileResult do arquivo, o que
+    permite processar arquivos em paralelo com o mesmo pipeline.
+    Transformações que apenas contam definem modifies_lines = False.
+    """
+
+    modifies_lines = True
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        raise NotImplementedError
+
+
+class YearSuffixTransform(LineTransform):
+    """Adiciona o sufixo de ano ao segundo campo das linhas do lote antigo."""
+
+    def __init__(self, old_name_number: str, year: str):
+        self.old_name_number = old_name_number
+        self.suffix = f'/{year}'
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        if (self.old_name_number in raw_line and len(fields) > 1 and
+                not fields[1].endswith(self.suffix)):
+            fields[1] = fields[1] + self.suffix
+            return True
+        return False
+
+
+class LotNumberTransform(LineTransform):
+    """
+    Atualiza o número do lote: o primeiro campo passa a ser o novo número
+    (7 dígitos) e, nas linhas do lote antigo, campos não-JPG que contêm o
+    número antigo são atualizados.
+    """
+
+    def __init__(self, old_name_number: str, new_name_number: str):
+        self.old_name_number = old_name_number
+        self.new_number_padded = LotNumberUtils.create_padded_number(new_name_number)
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        fields[0] = self.new_number_padded
+        if self.old_name_number in raw_line:
+            for i in range(1, len(fields)):
+                field = fields[i]
+                if field and not field.endswith(JPG_EXTENSION) and self.old_name_number in field:
+                    fields[i] = field.replace(self.old_name_number, self.new_number_padded)
+        # Linhas do lote são sempre regravadas (comportamento do editor de texto)
+        return True
+
+
+class JpgReferenceTransform(LineTransform):
+    """Atualiza referências a arquivos JPG que contêm o número antigo."""
+
+    def __init__(self, old_name_number: str, new_name_number: str):
+        self.old_name_number = old_name_number
+        self.new_name_number = new_name_number
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        if self.old_name_number not in raw_line:
+            return False
+        changed = False
+        for i in range(1, len(fields)):
+            field = fields[i]
+            if field and field.endswith(JPG_EXTENSION) and self.old_name_number in field:
+                updated = JpgFilenameProcessor.update_jpg_filename(
+                    field, self.old_name_number, self.new_name_number
+                )
+                if updated != field:
+                    fields[i] = updated
+                    changed = True
+        return changed
+
+
+class InfractionCodeTransform(LineTransform):
+    """Substitui códigos de infração (último campo) conforme um mapeamento."""
+
+    def __init__(self, code_map: Dict[str, str]):
+        self.code_map = {old: new for old, new in code_map.items() if old != new}
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        new_code = self.code_map.get(fields[-1].strip())
+        if new_code is None:
+            return False
+        fields[-1] = new_code
+        result.code_lines_changed += 1
+        return True
+
+
+class InfractionTargetTransform(LineTransform):
+    """
+    Padroniza todos os códigos de infração numéricos para um único código
+    (equivale a um mapeamento de cada código encontrado para o código alvo).
+    """
+
+    def __init__(self, target_code: str):
+        self.target_code = target_code
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        code = fields[-1].strip()
+        if not code or not code.isdigit() or code == self.target_code:
+            return False
+        fields[-1] = self.target_code
+        result.code_lines_changed += 1
+        return True
+
+
+class InfractionCountTransform(LineTransform):
+    """Conta códigos de infração (último campo numérico) sem alterar a linha."""
+
+    modifies_lines = False
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        code = fields[-1].strip()
+        if code and code.isdigit():
+            result.infraction_counts[code] += 1
+        return False
+
+
+class InfractionYearCountTransform(LineTransform):
+    """
+    Conta códigos de infração por sufixo de ano do segundo campo (ex:
+    BRI1132/2023 -> '2023'; sem sufixo -> ''), sem alterar a linha.
+    """
+
+    modifies_lines = False
+
+    def apply(self, fields: List[str], raw_line: str, result: 'TextFileResult') -> bool:
+        code = fields[-1].strip()
+        if code and code.isdigit():
+            year = ''
+            if len(fields) > 1 and '/' in fields[1]:
+                suffix = fields[1].rsplit('/', 1)[1].strip()
+                if suffix.isdigit():
+                    year = suffix
+            result.code_year_counts[(code, year)] += 1
+        return False
+
+
+class TextFileResult:
+    """Resultado do processamento de um arquivo."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lines = 0
+        self.lines_changed = 0
+        self.code_lines_changed = 0
+        self.infraction_counts: Dict[str, int] = defaultdict(int)
+        self.code_year_counts: Dict[Tuple[str, str], int] = defaultdict(int)  # (código, ano)
+        self.written = False
+        self.error: Optional[Exception] = None
+
+
+class TextPipelineResult:
+    """Resultado agregado do processamento de vários arquivos."""
+
+    def __init__(self):
+        self.files: List[TextFileResult] = []
+        self.infraction_counts: Dict[str, int] = {}
+        self.code_year_counts: Dict[Tuple[str, str], int] = {}
+        self.code_lines_changed = 0
+
+    def add(self, file_result: TextFileResult) -> None:
+        """Acrescenta o resultado de um arquivo e soma seus contadores."""
+        self.files.append(file_result)
+        self.code_lines_changed += file_result.code_lines_changed
+        for code, count in file_result.infraction_counts.items():
+            self.infraction_counts[code] = self.infraction_counts.get(code, 0) + count
+        for key, count in file_result.code_year_counts.items():
+            self.code_year_counts[key] = self.code_year_counts.get(key, 0) + count
+
+    @property
+    def files_written(self) -> int:
+        return sum(1 for result in self.files if result.written)
+
+    @property
+    def lines_changed(self) -> int:
+        return sum(result.lines_changed for result in self.files)
+
+    @property
+    def errors(self) -> List[TextFileResult]:
+        return [result for result in self.files if result.error is not None]
+
+
+class TextPipeline:
+    """
+    Aplica uma sequência de LineTransform a cada linha de cada arquivo,
+    com uma leitura e no máximo uma escrita por arquivo.
+    """
+
+    def __init__(self, transforms: Iterable[LineTransform]):
+        self.transforms = list(transforms)
+
+    @property
+    def read_only(self) -> bool:
+        """Nenhuma transformação altera linhas (apenas contagens)."""
+        return not any(transform.modifies_lines for transform in self.transforms)
+
+    def process_line(self, line: str, result: TextFileResult) -> str:
+        """
+        Processa uma linha. Linhas que nenhuma transformação alterou são
+        devolvidas sem modificação (preservando espaços e quebra de linha).
+
+        Args:
+            line (str): Linha original (com quebra de linha)
+            result (TextFileResult): Acumulador de contadores do arquivo
+
+        Returns:
+            str: Linha resultante
+        """
+        fields = line.strip().split(TEXT_SEPARATOR)
+        changed = False
+        for transform in self.transforms:
+            if transform.apply(fields, line, result):
+                changed = True
+        if not changed:
+            return line
+        return TEXT_SEPARATOR.join(fields) + '\n'
+
+    def process_lines(self, lines: Iterable[str], result: TextFileResult) -> List[str]:
+        """
+        Processa as linhas de um arquivo, acumulando os contadores em result.
+
+        Args:
+            lines (Iterable[str]): Linhas do arquivo (com quebra de linha)
+            result (TextFileResult): Acumulador do arquivo
+
+        Returns:
+            List[str]: Linhas resultantes
+        """
+        return list(self.iter_process_lines(lines, result))
+
+    def iter_process_lines(self, lines: Iterable[str], result: TextFileResult) -> Iterator[str]:
+        """Como process_lines, mas entrega as linhas uma a uma (memória constante)."""
+        for line in lines:
+            new_line = self.process_line(line, result)
+            result.lines += 1
+            if new_line != line:
+                result.lines_changed += 1
+            yield new_line
+
+    def process_file(self, filename: str) -> TextFileResult:
+        """
+        Processa um arquivo em passada única, linha a linha, e o substitui
+        (temporário + os.replace) apenas se houver alteração no conteúdo.
+        Pipelines somente de leitura não criam temporário; nos demais, o
+        temporário só é aberto na primeira linha alterada (as linhas
+        anteriores são copiadas relendo o início do arquivo).
+
+        Args:
+            filename (str): Caminho do arquivo .txt
+
+        Returns:
+            TextFileResult: Linhas processadas/alteradas e se houve escrita
+        """
+        result = TextFileResult(filename)
+        if self.read_only:
+            for _ in self.iter_process_lines(iter_text_lines(filename), result):
+                pass
+            return result
+
+        writer = None
+        try:
+            for line in iter_text_lines(filename):
+                new_line = self.process_line(line, result)
+                result.lines += 1
+                if new_line != line:
+                    result.lines_changed += 1
+                    if writer is None:
+                        writer = self._open_writer(filename, result.lines - 1)
+                if writer is not None:
+                    writer.write(new_line)
+            if writer is not None:
+                writer.commit()
+                result.written = True
+        finally:
+            if writer is not None:
+                writer.discard()
+        return result
+
+    @staticmethod
+    def _open_writer(filename: str, unchanged: int) -> SpooledTextWriter:
+        """SpooledTextWriter já com as primeiras linhas (inalteradas) do arquivo."""
+        writer = SpooledTextWriter(filename)
+        prefix = iter_text_lines(filename)
+        try:
+            writer.writelines(islice(prefix, unchanged))
+        except BaseException:
+            writer.discard()
+            raise
+        finally:
+            prefix.close()
+        return writer
+
+    def process_files(
+        self,
+        filenames: Iterable[str],
+        max_workers: int = 1,
+        executor_type: str = EXECUTOR_THREAD,
+        progress=None
+    ) -> TextPipelineResult:
+        """
+        Processa vários arquivos, isolando erros por arquivo. O md5sum.txt
+        nunca é alterado. Os arquivos regravados são sincronizados em disco
+        ao final, conforme o nível de durabilidade.
+
+        Args:
+            filenames (Iterable[str]): Caminhos dos arquivos .txt
+            max_workers (int): Arquivos processados em paralelo (1 = em série)
+            executor_type (str): 'thread' ou 'process'
+            progress (ProgressTracker): Progresso por arquivo; se o
+                cancelamento for solicitado, nenhum arquivo novo é iniciado
+
+        Returns:
+            TextPipelineResult: Resultados por arquivo (na ordem de entrada)
+                e contagens agregadas
+        """
+        pipeline_result = TextPipelineResult()
+        filenames = [filename for filename in filenames
+                     if os.path.basename(filename).lower() != MD5SUM_FILENAME]
+        should_stop = (lambda: progress.cancelled) if progress is not None else None
+        for _, file_result, _ in run_bounded(self.process_file_safe, filenames, max_workers,
+                                             executor_type=executor_type, should_stop=should_stop):
+            pipeline_result.add(file_result)
+            if progress is not None:
+                progress.advance(failed=1 if file_result.error is not None else 0)
+        sync_written_files(file_result.filename for file_result in pipeline_result.files
+                           if file_result.written)
+        return pipeline_result
+
+    def process_file_safe(self, filename: str) -> TextFileResult:
+        """Como process_file, mas registra a exceção no resultado."""
+        try:
+            return self.process_file(filename)
+        except Exception as e:
+            logger.error(f"Erro ao processar arquivo {filename}: {e}")
+            file_result = TextFileResult(filename)
+            file_result.error = e
+            return file_result
+
+
+def build_rename_transforms(
+    old_name_number: str,
+    new_name_number: str,
+    year: Optional[str] = None
+) -> List[LineTransform]:
+    """
+    Monta as transformações de renomeação de lote na ordem do editor de
+    texto: sufixo de ano, número do lote e referências JPG.
+
+    Args:
+        old_name_number (str): Número antigo do lote
+        new_name_number (str): Número novo do lote
+        year (str): Ano a adicionar (None para não adicionar)
+
+    Returns:
+        List[LineTransform]: Transformações prontas para o TextPipeline
+    """
+    transforms: List[LineTransform] = []
+    if year:
+        transforms.append(YearSuffixTransform(old_name_number, year))
+    transforms.append(LotNumberTransform(old_name_number, new_name_number))
+    transforms.append(JpgReferenceTransform(old_name_number, new_name_number))
+    return transforms
@@ -0,0 +1,233 @@
+"""
+Leitura e escrita de arquivos de texto grandes com memória constante.
+
+Os arquivos são lidos linha a linha (buffer de tamanho fixo) e as linhas
+resultantes vão para um SpooledTextWriter: arquivos pequenos ficam em
+memória, os maiores que TEXT_SPOOL_MAX_MEMORY são despejados em um arquivo
+temporário no mesmo diretório. Ao confirmar, o original é substituído de
+uma vez (os.replace); se houver erro, o original fica intacto.
+
+O nível de durabilidade (TEXT_DURABILITY) define quando há fsync: nunca,
+uma vez por etapa para todos os arquivos gravados (sync_written_files) ou
+a cada arquivo.
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator, List, Optional
+from config import TEXT_READ_BUFFER_SIZE, TEXT_SPOOL_MAX_MEMORY, TEXT_DURABILITY
+from instrumentation import count, current, BYTES_READ, BYTES_WRITTEN, RENAMES
+from log_manager import get_logger
+
+logger = get_logger('text_stream')
+
+TEXT_ENCODING = 'utf-8'
+
+DURABILITY_NONE = 'none'
+DURABILITY_BATCH = 'batch'
+DURABILITY_FULL = 'full'
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_BATCH, DURABILITY_FULL)
+
+_durability = TEXT_DURABILITY
+
+
+def set_durability(level: str) -> None:
+    """
+    Define o nível de durabilidade padrão das regravações.
+
+    Args:
+        level (str): 'none', 'batch' ou 'full'
+
+    Raises:
+        ValueError: Se o nível for desconhecido
+    """
+    global _durability
+    if level not in DURABILITY_LEVELS:
+        raise ValueError(f"Nível de durabilidade inválido: {level}")
+    _durability = level
+
+
+def get_durability() -> str:
+    return _durability
+
+
+def fsync_file(path: str) -> None:
+    """Força a gravação em disco do conteúdo de um arquivo já fechado."""
+    # No Windows o fsync (_commit) exige o arquivo aberto para escrita
+    flags = os.O_RDWR if os.name == 'nt' else os.O_RDONLY
+    fd = os.open(path, flags | getattr(os, 'O_BINARY', 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(path: str) -> None:
+    """
+    Força a gravação das entradas de um diretório (os.replace). Não é
+    suportado no Windows, onde a operação é ignorada.
+    """
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_written_files(paths: Iterable[str], durability: Optional[str] = None) -> int:
+    """
+    No nível 'batch', faz o fsync dos arquivos regravados em uma etapa e,
+    em seguida, uma única vez de cada diretório que os contém.
+
+    Args:
+        paths (Iterable[str]): Arquivos regravados
+        durability (str): Nível (padrão: o definido em set_durability)
+
+    Returns:
+        int: Número de arquivos sincronizados
+    """
+    if (durability or _durability) != DURABILITY_BATCH:
+        return 0
+    directories = []
+    synced = 0
+    for path in paths:
+        try:
+            fsync_file(path)
+            synced += 1
+        except OSError as e:
+            logger.warning(f"Não foi possível sincronizar {path}: {e}")
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in directories:
+            directories.append(directory)
+    for directory in directories:
+        try:
+            fsync_directory(directory)
+        except OSError as e:
+            logger.warning(f"Não foi possível sincronizar o diretório {directory}: {e}")
+    return synced
+
+
+def iter_text_lines(filename: str, encoding: str = TEXT_ENCODING) -> Iterator[str]:
+    """
+    Lê um arquivo de texto linha a linha (mesmas quebras de linha de
+    open() em modo texto), sem carregar o arquivo inteiro.
+
+    Args:
+        filename (str): Caminho do arquivo
+        encoding (str): Codificação do arquivo
+
+    Yields:
+        str: Linhas com a quebra de linha
+    """
+    with open(filename, 'r', encoding=encoding, buffering=TEXT_READ_BUFFER_SIZE) as file:
+        yield from file
+        if current() is not None:
+            count(BYTES_READ, os.fstat(file.fileno()).st_size)
+
+
+class SpooledTextWriter:
+    """
+    Acumula o novo conteúdo de um arquivo e o grava no lugar do original
+    com commit(). Sem commit() (ou com exceção dentro do with), nada é
+    gravado e o temporário é removido.
+
+    Uso:
+        with SpooledTextWriter(filename) as writer:
+            for line in iter_text_lines(filename):
+                writer.write(transform(line))
+            writer.commit()
+    """
+
+    def __init__(self, filename: str, max_memory: int = TEXT_SPOOL_MAX_MEMORY,
+                 encoding: str = TEXT_ENCODING, durability: Optional[str] = None):
+        self.filename = filename
+        self.max_memory = max_memory
+        self.encoding = encoding
+        self.durability = durability or _durability
+        self._lines: List[str] = []
+        self._buffered = 0
+        self._temp_file = None
+        self._temp_path = None
+        self.committed = False
+
+    def __enter__(self) -> 'SpooledTextWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if not self.committed:
+            self.discard()
+
+    @property
+    def spilled(self) -> bool:
+        """True se o conteúdo passou do limite e está no arquivo temporário."""
+        return self._temp_file is not None
+
+    def write(self, text: str) -> None:
+        if self._temp_file is not None:
+            self._temp_file.write(text)
+            return
+        self._lines.append(text)
+        self._buffered += len(text)
+        if self._buffered > self.max_memory:
+            self._spill()
+
+    def writelines(self, lines) -> None:
+        for line in lines:
+            self.write(line)
+
+    def _open_temp(self):
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, self._temp_path = tempfile.mkstemp(
+            prefix='.' + os.path.basename(self.filename) + '.', suffix='.tmp', dir=directory
+        )
+        # Mesmo modo texto do open(filename, 'w'): '\n' vira os.linesep
+        self._temp_file = os.fdopen(fd, 'w', encoding=self.encoding, buffering=TEXT_READ_BUFFER_SIZE)
+
+    def _spill(self) -> None:
+        self._open_temp()
+        self._temp_file.writelines(self._lines)
+        self._lines = []
+        self._buffered = 0
+
+    def commit(self) -> None:
+        """
+        Substitui o arquivo original pelo novo conteúdo. O leitor do
+        original deve estar fechado (exigência do Windows para os.replace).
+        No nível 'batch' o fsync fica para sync_written_files.
+        """
+        if self._temp_file is None:
+            self._spill()
+        try:
+            if self.durability == DURABILITY_FULL:
+                self._temp_file.flush()
+                os.fsync(self._temp_file.fileno())
+            if current() is not None:
+                count(BYTES_WRITTEN, self._temp_file.tell())
+            self._temp_file.close()
+            if os.path.exists(self.filename):
+                shutil.copymode(self.filename, self._temp_path)
+            os.replace(self._temp_path, self.filename)
+            count(RENAMES)
+        except BaseException:
+            self.discard()
+            raise
+        self._temp_file = None
+        self._temp_path = None
+        self.committed = True
+        if self.durability == DURABILITY_FULL:
+            fsync_directory(os.path.dirname(os.path.abspath(self.filename)))
+
+    def discard(self) -> None:
+        """Descarta o conteúdo acumulado e remove o temporário."""
+        self._lines = []
+        self._buffered = 0
+        if self._temp_file is not None:
+            self._temp_file.close()
+            self._temp_file = None
+        if self._temp_path is not None:
+            if os.path.exists(self._temp_path):
+                os.remove(self._temp_path)
+            self._temp_path = None
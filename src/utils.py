@@ -3,14 +3,18 @@ Utilitários comuns para o sistema OperaLote.
 Contém funções compartilhadas entre FileRenamer e TextFileEditor.
 """
 
+import logging
 import os
 import re
 from typing import List, Tuple, Optional
 from config import (
     DEFAULT_PADDING, MIN_DIRECTORY_LENGTH, JPG_EXTENSION, TXT_EXTENSION,
-    MD5SUM_FILENAME, L_PREFIX_PATTERN, L00125_PATTERN, AITS_DIRECTORY,
-    TEXT_SEPARATOR, YEAR_SUFFIX, LOG_MESSAGES
+    ZIP_EXTENSION, RAR_EXTENSION, L_PREFIX_PATTERN, L00125_PATTERN, AITS_DIRECTORY,
+    TEXT_SEPARATOR, YEAR_SUFFIX, LOG_MESSAGES, STAGE_FILE_RENAME, STAGE_TEXT_FILES
 )
+from log_manager import get_logger, current_stage_counters
+
+_logger = get_logger('utils')
 
 
 class LotNumberUtils:
@@ -29,6 +33,20 @@ class LotNumberUtils:
         """
         return name[1:] if name.startswith('L') else name
     
+    @staticmethod
+    def strip_archive_extension(name: str) -> str:
+        """
+        Remove a extensão de lotes compactados (.zip/.rar) do nome do lote.
+        
+        Args:
+            name (str): Nome do lote (ex: "L00125.zip" ou "L00125")
+            
+        Returns:
+            str: Nome do lote sem a extensão (ex: "L00125")
+        """
+        stem, ext = os.path.splitext(name)
+        return stem if ext.lower() in (ZIP_EXTENSION, RAR_EXTENSION) else name
+    
     @staticmethod
     def create_padded_number(number: str, padding: int = DEFAULT_PADDING) -> str:
         """
@@ -74,14 +92,34 @@ class DirectoryUtils:
         search_directories = [directory]
         
         # Percorre todos os subdiretórios recursivamente
+        # (os.walk nunca repete um caminho, então não é preciso deduplicar)
         for root, dirs, files in os.walk(directory):
             for dir_name in dirs:
-                dir_path = os.path.join(root, dir_name)
-                if dir_path not in search_directories:
-                    search_directories.append(dir_path)
+                search_directories.append(os.path.join(root, dir_name))
                     
         return search_directories
     
+    @staticmethod
+    def get_lot_directory(directory: str, old_name: str, new_name: str) -> str:
+        """
+        Obtém o diretório do lote após a renomeação.
+        
+        Usa o diretório com o novo nome se ele existir; caso contrário,
+        o diretório com o nome antigo (ex: lote com mesmo nome).
+        
+        Args:
+            directory (str): Diretório raiz que contém os lotes
+            old_name (str): Nome antigo do lote
+            new_name (str): Novo nome do lote
+            
+        Returns:
+            str: Caminho do diretório do lote
+        """
+        new_dir_path = os.path.join(directory, new_name)
+        if os.path.isdir(new_dir_path):
+            return new_dir_path
+        return os.path.join(directory, old_name)
+    
     @staticmethod
     def get_text_search_directories(directory: str) -> List[str]:
         """
@@ -275,6 +313,133 @@ class FileValidationUtils:
         return False
 
 
+class LotMatcher:
+    """
+    Classificador de nomes de arquivos para um par de lotes (antigo, novo).
+    
+    Montado uma vez por renomeação: todas as variantes do número antigo
+    (com e sem zeros à esquerda, com prefixo L) e a expressão regular das
+    sequências numéricas são preparadas no construtor, de modo que cada
+    arquivo é classificado e tem o novo nome calculado em uma única chamada.
+    Equivalente a FileValidationUtils.should_rename_file seguido das regras
+    de nome de FileRenamer.rename_files e JpgFilenameProcessor.
+    """
+    
+    def __init__(self, old_name: str, new_name: str):
+        self.old_name = old_name
+        self.new_name = new_name
+        self.old_number = LotNumberUtils.extract_numbers_from_name(old_name)
+        self.new_number = LotNumberUtils.extract_numbers_from_name(new_name)
+        
+        self.old_trimmed = LotNumberUtils.get_trimmed_number(self.old_number)
+        self.new_trimmed = LotNumberUtils.get_trimmed_number(self.new_number)
+        self.old_padded = LotNumberUtils.create_padded_number(self.old_number)
+        self.new_padded = LotNumberUtils.create_padded_number(self.new_number)
+        
+        # Sequência numérica (com 5+ dígitos) que, sem os zeros à esquerda,
+        # começa pelo número antigo
+        self._numeric_pattern = re.compile(r'(?<!\d)(?=\d{5})0*' + re.escape(self.old_trimmed))
+        
+        # Variantes com prefixo L (ex: "L00125" quando o número é "0000125")
+        self._l_variants: Tuple[str, ...] = ()
+        if len(self.old_number) >= MIN_DIRECTORY_LENGTH and self.old_number.startswith('00'):
+            self._l_variants = (f"L{self.old_trimmed.zfill(5)}", f"L{L_PREFIX_PATTERN[1:]}{self.old_trimmed}")
+        
+        # Arquivo .txt sem o L do novo nome (ex: "08786.txt" para "L08786")
+        self._new_name_without_l = new_name[1:] if new_name.startswith('L') else None
+        # Duplicação dos 2 últimos dígitos do lote no nome de JPG
+        self._jpg_duplicated = self.old_trimmed[-2:] if len(self.old_trimmed) >= 2 else None
+    
+    def should_rename(self, filename: str) -> bool:
+        """Equivalente a FileValidationUtils.should_rename_file."""
+        base_filename = os.path.basename(filename)
+        stem, ext = os.path.splitext(base_filename)
+        return self._should_rename(base_filename, stem, ext)
+    
+    def _should_rename(self, base_filename: str, stem: str, ext: str) -> bool:
+        if self.old_number in stem:
+            return True
+        if self.old_trimmed in stem:
+            return self._numeric_pattern.search(stem) is not None
+        for variant in self._l_variants:
+            if variant in base_filename:
+                return True
+        if self.old_number.startswith('L'):
+            return self.old_number in base_filename
+        # O teste específico de JPG de FileValidationUtils só aceita nomes
+        # que contêm o número sem zeros, já tratados acima
+        return stem == L00125_PATTERN and ext.lower() == TXT_EXTENSION
+    
+    def match(self, filename: str) -> Optional[str]:
+        """
+        Classifica um arquivo e calcula seu novo nome.
+        
+        Args:
+            filename (str): Nome ou caminho do arquivo
+            
+        Returns:
+            Optional[str]: Novo nome (sem diretório) se o arquivo pertence ao
+                lote antigo e deve ser renomeado (pode ser igual ao atual),
+                None caso contrário
+        """
+        base_filename = os.path.basename(filename)
+        stem, ext = os.path.splitext(base_filename)
+        if not self._should_rename(base_filename, stem, ext):
+            return None
+        return self._target(stem, ext)
+    
+    def is_jpg(self, filename: str) -> bool:
+        """
+        Indica se o arquivo é renomeado pelas regras de JPG (planejador de
+        renomeação em bloco) e não pelas regras gerais.
+        """
+        stem, ext = os.path.splitext(os.path.basename(filename))
+        return ext.lower() == JPG_EXTENSION and not (stem.startswith(L_PREFIX_PATTERN) and len(stem) >= 6)
+    
+    def _target(self, stem: str, ext: str) -> str:
+        """Regras gerais de nome (arquivos que não são JPG)."""
+        new_stem = stem
+        if stem.startswith(L_PREFIX_PATTERN) and len(stem) >= 6:
+            # L00125 -> L + novo número
+            new_stem = f"L{self.new_number}"
+        elif ext == TXT_EXTENSION and self._new_name_without_l is not None and \
+                not stem.startswith('L') and stem == self._new_name_without_l:
+            new_stem = self.new_name
+        elif ext.lower() == JPG_EXTENSION:
+            return self.jpg_target(stem + ext)
+        elif self.old_number in stem:
+            new_stem = stem.replace(self.old_number, self.new_padded)
+        elif self.old_trimmed in stem:
+            new_stem = stem.replace(self.old_trimmed, self.new_trimmed)
+        
+        # Fallback: .txt sem prefixo L recebe o novo nome completo
+        if (ext == TXT_EXTENSION and self._new_name_without_l is not None and
+                not new_stem.startswith('L') and stem == new_stem):
+            new_stem = self.new_name
+        return new_stem + ext
+    
+    def jpg_target(self, base_filename: str) -> str:
+        """Equivalente a JpgFilenameProcessor.update_jpg_filename."""
+        if base_filename.endswith(JPG_EXTENSION):
+            name_without_ext = base_filename[:-len(JPG_EXTENSION)]
+            file_ext = JPG_EXTENSION
+        else:
+            name_without_ext = base_filename
+            file_ext = ''
+        
+        if name_without_ext.startswith(self.old_padded):
+            rest_part = name_without_ext[len(self.old_padded):]
+            if (self._jpg_duplicated is not None and len(rest_part) >= 2 and
+                    rest_part[:2] == self._jpg_duplicated):
+                rest_part = rest_part[2:]
+            return self.new_padded + rest_part + file_ext
+        
+        if self.old_padded in name_without_ext:
+            return name_without_ext.replace(self.old_padded, self.new_padded, 1) + file_ext
+        
+        return base_filename
+
+
 class TextLineProcessor:
     """Processador para linhas de texto em arquivos."""
     
@@ -368,28 +533,72 @@ class TextLineProcessor:
 
 
 class LoggingUtils:
-    """Utilitários para logging e mensagens."""
+    """
+    Utilitários para logging e mensagens.
+    
+    Mensagens por arquivo/linha são registradas em DEBUG e somadas aos
+    contadores da etapa; log_stage_summary registra o resumo em INFO.
+    """
+    
+    @staticmethod
+    def is_debug_enabled() -> bool:
+        """Permite evitar a formatação de mensagens por linha quando desligadas."""
+        return _logger.isEnabledFor(logging.DEBUG)
+    
+    @staticmethod
+    def count(stage: str, key: str, count: int = 1) -> None:
+        """Soma um contador de resumo da etapa."""
+        current_stage_counters().increment(stage, key, count)
+    
+    @staticmethod
+    def log_stage_summary(stage: str) -> None:
+        """Registra (INFO) e zera os contadores de uma etapa da execução atual."""
+        stage_counters = current_stage_counters()
+        counters = stage_counters.pop(stage)
+        if counters:
+            details = ", ".join(f"{key}={value}" for key, value in sorted(counters.items()))
+            if stage_counters.label:
+                _logger.info(LOG_MESSAGES['stage_summary_lot'].format(stage_counters.label, stage, details))
+            else:
+                _logger.info(LOG_MESSAGES['stage_summary'].format(stage, details))
     
     @staticmethod
     def log_file_rename(old_filename: str, new_filename: str, success: bool) -> None:
         """Log de renomeação de arquivo."""
         if success:
-            print(f"    {LOG_MESSAGES['file_renamed'].format(old_filename, new_filename)}")
+            current_stage_counters().increment(STAGE_FILE_RENAME, 'renomeados')
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(f"    {LOG_MESSAGES['file_renamed'].format(old_filename, new_filename)}")
         else:
-            print(f"    {LOG_MESSAGES['file_rename_error'].format(old_filename, '')}")
+            current_stage_counters().increment(STAGE_FILE_RENAME, 'falhas')
+            _logger.warning(f"    {LOG_MESSAGES['file_rename_error'].format(old_filename, '')}")
     
     @staticmethod
     def log_jpg_update(original: str, updated: str) -> None:
         """Log de atualização de JPG."""
-        if original != updated:
-            print(f"  {LOG_MESSAGES['jpg_updated'].format(original, updated)}")
+        if original != updated and _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug(f"  {LOG_MESSAGES['jpg_updated'].format(original, updated)}")
     
     @staticmethod
     def log_text_file_update(filename: str) -> None:
         """Log de atualização de arquivo de texto."""
-        print(LOG_MESSAGES['text_file_updated'].format(filename))
+        current_stage_counters().increment(STAGE_TEXT_FILES, 'gravados')
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug(LOG_MESSAGES['text_file_updated'].format(filename))
     
     @staticmethod
     def log_skip_md5sum(filename: str) -> None:
         """Log de pulo do arquivo md5sum."""
-        print(LOG_MESSAGES['skip_md5sum'].format(filename))
+        current_stage_counters().increment(STAGE_TEXT_FILES, 'md5sum_preservados')
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug(LOG_MESSAGES['skip_md5sum'].format(filename))
+    
+    @staticmethod
+    def log_lines_processed(count: int) -> None:
+        """Contabiliza as linhas reescritas de um arquivo de texto."""
+        current_stage_counters().increment(STAGE_TEXT_FILES, 'linhas', count)
+
+    @staticmethod
+    def log_line_processed(line: str) -> None:
+        """Log de uma linha reescrita (nível DEBUG)."""
+        _logger.debug(LOG_MESSAGES['line_processed'].format(line.strip()))
@@ -0,0 +1,88 @@
+"""
+Execução concorrente com número limitado de tarefas em andamento.
+
+Usado para processar arquivos de lotes em compartilhamentos de rede, onde o
+custo de cada arquivo é dominado pela latência de E/S e não pela CPU.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+from config import DEFAULT_WORKERS, MAX_IN_FLIGHT_PER_WORKER
+from instrumentation import propagate
+from log_manager import propagate_stage_counters
+
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+
+
+def run_bounded(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int = DEFAULT_WORKERS,
+    max_in_flight: Optional[int] = None,
+    executor_type: str = EXECUTOR_THREAD,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Aplica func a cada item com um pool de workers.
+
+    Os resultados são entregues na mesma ordem dos itens (ordem determinística
+    para o log), no máximo max_in_flight tarefas ficam pendentes ao mesmo
+    tempo e uma exceção em um item não interrompe os demais. No modo
+    'thread', os workers usam a instrumentação e os StageCounters ativos
+    de quem chamou.
+
+    Args:
+        func: Função aplicada a cada item (deve ser serializável no modo
+            'process': função de módulo ou método de objeto simples)
+        items: Itens a processar
+        max_workers (int): Número de workers; 1 executa em série, sem pool
+        max_in_flight (int): Máximo de tarefas pendentes (padrão:
+            max_workers * MAX_IN_FLIGHT_PER_WORKER)
+        executor_type (str): 'thread' (padrão) ou 'process'
+        should_stop: Se informado e retornar True, nenhum item novo é
+            iniciado; as tarefas já em andamento terminam normalmente
+
+    Yields:
+        Tuple: (item, resultado, exceção) — resultado é None se houve exceção
+    """
+    if max_workers <= 1:
+        for item in items:
+            if should_stop is not None and should_stop():
+                return
+            try:
+                yield item, func(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    if max_in_flight is None:
+        max_in_flight = max_workers * MAX_IN_FLIGHT_PER_WORKER
+    max_in_flight = max(max_in_flight, 1)
+
+    if executor_type == EXECUTOR_PROCESS:
+        executor_class = ProcessPoolExecutor
+    else:
+        # Os workers contam na instrumentação (e no intervalo) e nos
+        # contadores de resumo de quem chamou
+        executor_class = ThreadPoolExecutor
+        func = propagate_stage_counters(propagate(func))
+    with executor_class(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            if should_stop is not None and should_stop():
+                break
+            pending.append((item, executor.submit(func, item)))
+            if len(pending) >= max_in_flight:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
+
+
+def _collect(item: Any, future) -> Tuple[Any, Any, Optional[BaseException]]:
+    """Aguarda uma tarefa e devolve (item, resultado, exceção)."""
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
@@ -0,0 +1,608 @@
+"""
+Ingestão de lotes .zip em passada única.
+
+O fluxo tradicional extrai o arquivo inteiro (extractall) e só então
+renomeia subdiretórios, arquivos e reescreve os textos no disco: cada imagem
+é gravada duas vezes e o lote ocupa o dobro do espaço durante a operação.
+
+Aqui os caminhos finais de todos os membros são calculados em memória a
+partir do índice do .zip (mesmas regras de FileRenamer e JpgRenamePlanner) e
+cada membro é lido uma única vez e gravado direto no destino, com os
+arquivos de texto já reescritos pelo TextPipeline.
+
+O mesmo plano também gera um novo .zip do lote renomeado (ZipLotRepacker),
+copiando os dados já compactados das imagens sem recompressão.
+"""
+
+import io
+import os
+import shutil
+import struct
+import sys
+import zipfile
+from typing import Dict, List, Optional, Set, Tuple
+from config import (
+    ZIP_READ_BUFFER_SIZE,
+    ZIP_EXTENSION,
+    RAR_EXTENSION,
+    TXT_EXTENSION,
+    MD5SUM_FILENAME,
+    MIN_DIRECTORY_LENGTH,
+    STAGE_FILE_RENAME,
+    STAGE_TEXT_FILES
+)
+from utils import LotNumberUtils, LotMatcher, LoggingUtils
+from rename_planner import JpgRenamePlanner, RenameMap
+from text_pipeline import TextPipeline, TextFileResult, TextPipelineResult
+from instrumentation import traced, count, current, BYTES_READ, BYTES_WRITTEN, RENAMES
+from log_manager import get_logger
+
+logger = get_logger('zip_ingest')
+
+# Campos do cabeçalho local (mesmos índices de zipfile._FH_*)
+_FH_FILENAME_LENGTH = 10
+_FH_EXTRA_FIELD_LENGTH = 11
+_MASK_USE_DATA_DESCRIPTOR = 0x08
+_ZIP64_EXTRA_ID = 0x0001
+
+# A cópia sem recompressão (ZipLotRepacker._copy_raw) grava pelo mesmo caminho
+# interno de ZipFile.mkdir/writestr: atributos privados do ZipFile, que podem
+# mudar entre versões do CPython sem aviso. Só é usada nas versões verificadas
+# e se todos os atributos existirem; caso contrário os membros são
+# descompactados e recompactados com zip_out.writestr (mais lento, mesmo
+# conteúdo)
+_RAW_COPY_PYTHON_VERSIONS = ((3, 8), (3, 13))  # Primeira e última verificadas
+_RAW_COPY_ZIPFILE_ATTRIBUTES = ('_lock', '_seekable', 'start_dir', '_writecheck', '_didModify',
+                                'fp', 'filelist', 'NameToInfo')
+_RAW_COPY_MODULE_ATTRIBUTES = ('structFileHeader', 'sizeFileHeader', 'stringFileHeader', 'ZIP64_LIMIT')
+
+
+class ZipMember:
+    """Membro do .zip e seu caminho final no lote."""
+
+    __slots__ = ('info', 'target', 'rewrite_text')
+
+    def __init__(self, info: zipfile.ZipInfo, target: str, rewrite_text: bool = False):
+        self.info = info
+        self.target = target
+        self.rewrite_text = rewrite_text  # Arquivo de texto do lote (passa pelo TextPipeline)
+
+    def __repr__(self) -> str:
+        return f"ZipMember({self.info.filename!r} -> {self.target!r})"
+
+
+class ZipIngestPlan:
+    """Caminhos finais dos membros de um lote .zip."""
+
+    def __init__(self, lot_directory: str):
+        self.lot_directory = lot_directory
+        self.members: List[ZipMember] = []     # Na ordem do arquivo (leitura sequencial)
+        self.directories: List[str] = []       # Diretórios finais, inclusive vazios
+        self.empty_directories: List[str] = []
+        self.jpg_renames: Dict[str, str] = {}  # Caminho extraído -> caminho final
+        self.renames = RenameMap()             # Todas as renomeações (md5sum.txt)
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+
+class ZipIngestResult:
+    """Resultado da ingestão de um lote .zip."""
+
+    def __init__(self, plan: ZipIngestPlan):
+        self.plan = plan
+        self.lot_directory = plan.lot_directory
+        self.jpg_renames = plan.jpg_renames
+        self.renames = plan.renames
+        self.text_result = TextPipelineResult()
+        self.files_written = 0
+        self.bytes_written = 0
+        self.output_path: Optional[str] = None  # .zip gerado (ZipLotRepacker)
+
+
+def member_path(lot_directory: str, member_name: str) -> Optional[str]:
+    """
+    Caminho de extração de um membro, com a mesma sanitização de
+    ZipFile.extract (sem unidade, raiz absoluta, '.' ou '..').
+
+    Returns:
+        Optional[str]: Caminho absoluto, ou None se o membro for a própria raiz
+    """
+    arcname = os.path.splitdrive(member_name.replace('/', os.sep))[1]
+    parts = [part for part in arcname.split(os.sep) if part not in ('', os.curdir, os.pardir)]
+    if not parts:
+        return None
+    return os.path.join(lot_directory, *parts)
+
+
+def rewrite_text_data(data: bytes, filename: str,
+                      text_pipeline: TextPipeline) -> Tuple[TextFileResult, Optional[str]]:
+    """
+    Reescreve em memória o conteúdo de um arquivo de texto do lote.
+
+    Args:
+        data (bytes): Conteúdo original
+        filename (str): Caminho final do arquivo (para o resultado e o log)
+        text_pipeline (TextPipeline): Transformações a aplicar
+
+    Returns:
+        Tuple[TextFileResult, Optional[str]]: Resultado e novo texto; o texto
+            é None quando nenhuma linha muda ou o arquivo não pode ser lido
+            (o conteúdo original deve ser mantido byte a byte, como em
+            TextPipeline.process_file)
+    """
+    result = TextFileResult(filename)
+    try:
+        lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8')
+        new_lines = text_pipeline.process_lines(lines, result)
+    except Exception as e:
+        logger.error(f"Erro ao processar arquivo {filename}: {e}")
+        result = TextFileResult(filename)
+        result.error = e
+        return result, None
+
+    if not result.lines_changed:
+        return result, None
+    return result, ''.join(new_lines)
+
+
+class ZipLotPlanner:
+    """
+    Calcula os caminhos finais dos membros reproduzindo, em memória, o que
+    FileRenamer faz no disco após a extração: correção dos subdiretórios
+    numéricos, renomeação dos arquivos e plano de renomeação dos JPGs.
+    """
+
+    def __init__(self, lot_directory: str):
+        self.lot_directory = lot_directory
+        self.files: Dict[str, zipfile.ZipInfo] = {}
+        self.directories: Set[str] = {lot_directory}
+        self.renames = RenameMap()
+
+    @staticmethod
+    def plan(
+        zip_file: zipfile.ZipFile,
+        old_name: str,
+        new_name: str,
+        lot_directory: str
+    ) -> Optional[ZipIngestPlan]:
+        """
+        Monta o plano de ingestão.
+
+        Args:
+            zip_file (ZipFile): Arquivo .zip do lote
+            old_name (str): Nome antigo do lote
+            new_name (str): Nome novo do lote
+            lot_directory (str): Diretório final do lote
+
+        Returns:
+            Optional[ZipIngestPlan]: Plano, ou None se o .zip contiver outros
+                arquivos compactados (nesse caso vale o fluxo tradicional)
+        """
+        planner = ZipLotPlanner(os.path.normpath(lot_directory))
+        if not planner._load(zip_file):
+            return None
+
+        matcher = LotMatcher(old_name, new_name)
+        planner._fix_subdirectories(matcher.new_number)
+        jpg_renames = planner._rename_files(matcher)
+        return planner._build_plan(jpg_renames)
+
+    # ------------------------------------------------------------------
+    # Árvore em memória
+    # ------------------------------------------------------------------
+
+    def _load(self, zip_file: zipfile.ZipFile) -> bool:
+        """Lê o índice do .zip (nenhum dado é descompactado)."""
+        for info in zip_file.infolist():
+            path = member_path(self.lot_directory, info.filename)
+            if path is None:
+                continue
+            if info.is_dir():
+                self._add_directory(path)
+                continue
+            if path.endswith(ZIP_EXTENSION) or path.endswith(RAR_EXTENSION):
+                return False
+            self._add_directory(os.path.dirname(path))
+            self.files[path] = info  # Membros repetidos: o último prevalece, como no extractall
+        return True
+
+    def _add_directory(self, path: str) -> None:
+        while path not in self.directories and path.startswith(self.lot_directory):
+            self.directories.add(path)
+            path = os.path.dirname(path)
+
+    def _children(self, directory: str) -> List[str]:
+        names = {os.path.basename(path) for path in self.files if os.path.dirname(path) == directory}
+        names.update(os.path.basename(path) for path in self.directories
+                     if os.path.dirname(path) == directory and path != directory)
+        return sorted(names)
+
+    def _subdirectories(self, directory: str) -> List[str]:
+        return [name for name in self._children(directory)
+                if os.path.join(directory, name) in self.directories]
+
+    def _exists(self, path: str) -> bool:
+        return path in self.files or path in self.directories
+
+    def _in_tree(self, path: str, root: str) -> bool:
+        return path == root or path.startswith(root + os.sep)
+
+    def _move(self, source: str, target: str) -> None:
+        """Move um arquivo ou subárvore."""
+        for path in [path for path in self.files if self._in_tree(path, source)]:
+            self.files[target + path[len(source):]] = self.files.pop(path)
+        for path in [path for path in self.directories if self._in_tree(path, source)]:
+            self.directories.discard(path)
+            self.directories.add(target + path[len(source):])
+
+    def _remove(self, path: str) -> None:
+        """Remove um arquivo ou subárvore."""
+        for file_path in [file_path for file_path in self.files if self._in_tree(file_path, path)]:
+            del self.files[file_path]
+        self.directories.difference_update(
+            [directory for directory in self.directories if self._in_tree(directory, path)]
+        )
+
+    # ------------------------------------------------------------------
+    # Regras de renomeação (espelham FileRenamer)
+    # ------------------------------------------------------------------
+
+    def _fix_subdirectories(self, new_name_number: str) -> None:
+        """Equivalente a FileRenamer._fix_subdirectories."""
+        expected_number = LotNumberUtils.create_padded_number(new_name_number)
+        subdirs_to_fix = [name for name in self._subdirectories(self.lot_directory)
+                          if name.isdigit() and len(name) >= MIN_DIRECTORY_LENGTH
+                          and name != expected_number]
+
+        for old_subdir in subdirs_to_fix:
+            old_subdir_path = os.path.join(self.lot_directory, old_subdir)
+            new_subdir_path = os.path.join(self.lot_directory, expected_number)
+            logger.info(f"Subdiretório {old_subdir} -> {expected_number}")
+            if self._exists(new_subdir_path):
+                # Destino existe: o conteúdo movido substitui o existente
+                for name in self._children(old_subdir_path):
+                    target = os.path.join(new_subdir_path, name)
+                    self._remove(target)
+                    self._move(os.path.join(old_subdir_path, name), target)
+                self.directories.discard(old_subdir_path)
+                self.renames.add_directory(old_subdir_path, new_subdir_path, merged=True)
+            else:
+                self._move(old_subdir_path, new_subdir_path)
+                self.renames.add_directory(old_subdir_path, new_subdir_path)
+
+    def _rename_files(self, matcher: LotMatcher) -> Dict[str, str]:
+        """
+        Equivalente a FileRenamer.rename_files: diretórios em largura a
+        partir da raiz, arquivos em ordem alfabética, JPGs em bloco.
+
+        Returns:
+            Dict[str, str]: Renomeações de JPG (caminho extraído -> final)
+        """
+        search_directories = []
+        pending = [self.lot_directory]
+        while pending:
+            current = pending.pop(0)
+            search_directories.append(current)
+            pending.extend(os.path.join(current, name) for name in self._subdirectories(current))
+
+        files_by_directory: Dict[str, List[str]] = {}
+        for path in self.files:
+            files_by_directory.setdefault(os.path.dirname(path), []).append(path)
+
+        jpg_candidates = []
+        listed_files = []
+        for search_dir in search_directories:
+            directory_files = sorted(files_by_directory.get(search_dir, ()))
+            listed_files.extend(directory_files)
+            for filename in directory_files:
+                new_filename = matcher.match(filename)
+                if new_filename is None:
+                    continue
+                if matcher.is_jpg(filename):
+                    jpg_candidates.append(filename)
+                    continue
+                target = os.path.join(search_dir, new_filename)
+                if target != filename and not self._exists(target):
+                    self.files[target] = self.files.pop(filename)
+                    self.renames.add_file(filename, target)
+                    LoggingUtils.log_file_rename(filename, target, True)
+
+        if not jpg_candidates:
+            return {}
+        plan = JpgRenamePlanner.plan(jpg_candidates, matcher.old_number, matcher.new_number, listed_files)
+        logger.info(f"Plano de renomeação de JPGs: {len(plan)} arquivo(s), {len(plan.skipped)} ignorado(s)")
+        moved = {source: self.files.pop(source) for source in plan.mapping}
+        for source, target in plan.mapping.items():
+            self.files[target] = moved[source]
+        self.renames.add_files(plan.mapping)
+        return dict(plan.mapping)
+
+    def _build_plan(self, jpg_renames: Dict[str, str]) -> ZipIngestPlan:
+        plan = ZipIngestPlan(self.lot_directory)
+        plan.jpg_renames = jpg_renames
+        plan.renames = self.renames
+        plan.directories = sorted(self.directories)
+        parents = {os.path.dirname(path) for path in self.files}
+        parents.update(os.path.dirname(path) for path in self.directories)
+        plan.empty_directories = [path for path in plan.directories
+                                  if path not in parents and path != self.lot_directory]
+        for target, info in sorted(self.files.items(), key=lambda item: item[1].header_offset):
+            plan.members.append(ZipMember(info, target, self._is_lot_text_file(target)))
+        return plan
+
+    def _is_lot_text_file(self, path: str) -> bool:
+        """
+        Arquivos de texto processados por TextFileEditor.rewrite_lot_text:
+        todos os .txt do lote, em qualquer profundidade (exceto md5sum.txt).
+        """
+        name = os.path.basename(path)
+        return os.path.splitext(name)[1].lower() == TXT_EXTENSION and name.lower() != MD5SUM_FILENAME
+
+
+class ZipLotIngestor:
+    """Grava os membros de um lote .zip direto nos caminhos finais."""
+
+    def __init__(self, buffer_size: int = ZIP_READ_BUFFER_SIZE, progress=None):
+        self.buffer_size = buffer_size
+        self.progress = progress
+
+    @traced()
+    def ingest(
+        self,
+        zip_path: str,
+        old_name: str,
+        new_name: str,
+        lot_directory: str,
+        text_pipeline: TextPipeline
+    ) -> Optional[ZipIngestResult]:
+        """
+        Planeja e grava o lote em uma única leitura do .zip.
+
+        Args:
+            zip_path (str): Caminho do arquivo .zip
+            old_name (str): Nome antigo do lote
+            new_name (str): Nome novo do lote
+            lot_directory (str): Diretório final do lote (não deve existir)
+            text_pipeline (TextPipeline): Reescrita dos arquivos de texto
+
+        Returns:
+            Optional[ZipIngestResult]: Resultado, ou None se o .zip não puder
+                ser ingerido em passada única (nada é gravado nesse caso)
+        """
+        with open(zip_path, 'rb', buffering=self.buffer_size) as raw_file:
+            with zipfile.ZipFile(raw_file) as zip_file:
+                plan = ZipLotPlanner.plan(zip_file, old_name, new_name, lot_directory)
+                if plan is None:
+                    logger.info(f"{zip_path} contém arquivos compactados; usando extração completa")
+                    return None
+
+                logger.info(f"Ingerindo {zip_path} -> {plan.lot_directory}: {len(plan)} arquivo(s)")
+                if self.progress is not None:
+                    self.progress.set_stage("Extraindo lote", len(plan))
+
+                result = ZipIngestResult(plan)
+                for directory in plan.directories:
+                    os.makedirs(directory, exist_ok=True)
+                for member in plan.members:
+                    if self.progress is not None:
+                        self.progress.check_cancelled()
+                    if member.rewrite_text:
+                        file_result = self._write_text_member(zip_file, member, text_pipeline)
+                        result.text_result.add(file_result)
+                        failed = 1 if file_result.error is not None else 0
+                    else:
+                        self._copy_member(zip_file, member)
+                        failed = 0
+                    result.files_written += 1
+                    result.bytes_written += member.info.file_size
+                    if self.progress is not None:
+                        self.progress.advance(failed=failed)
+        count(BYTES_READ, sum(member.info.compress_size for member in plan.members))
+        count(BYTES_WRITTEN, result.bytes_written)
+        LoggingUtils.log_stage_summary(STAGE_FILE_RENAME)
+        LoggingUtils.log_stage_summary(STAGE_TEXT_FILES)
+        return result
+
+    def _copy_member(self, zip_file: zipfile.ZipFile, member: ZipMember) -> None:
+        with zip_file.open(member.info) as source, open(member.target, 'wb') as target:
+            shutil.copyfileobj(source, target, self.buffer_size)
+
+    def _write_text_member(self, zip_file: zipfile.ZipFile, member: ZipMember,
+                           text_pipeline: TextPipeline) -> TextFileResult:
+        data = zip_file.read(member.info)
+        result, text = rewrite_text_data(data, member.target, text_pipeline)
+        if text is not None:
+            with open(member.target, 'w', encoding='utf-8') as file:
+                file.write(text)
+            result.written = True
+            LoggingUtils.log_text_file_update(member.target)
+        else:
+            with open(member.target, 'wb') as file:
+                file.write(data)
+        return result
+
+
+class ZipLotRepacker:
+    """
+    Gera o lote renomeado como um novo .zip, sem gravar a árvore no disco.
+
+    Membros que não mudam de conteúdo (imagens e textos sem alteração) têm os
+    dados compactados copiados diretamente do arquivo de origem, sem
+    descompactar nem recompactar: apenas o nome no cabeçalho muda.
+    """
+
+    def __init__(self, buffer_size: int = ZIP_READ_BUFFER_SIZE, progress=None):
+        self.buffer_size = buffer_size
+        self.progress = progress
+
+    @traced()
+    def repack(
+        self,
+        zip_path: str,
+        output_path: str,
+        old_name: str,
+        new_name: str,
+        text_pipeline: TextPipeline
+    ) -> Optional[ZipIngestResult]:
+        """
+        Gera output_path a partir de zip_path com os membros renomeados.
+
+        Args:
+            zip_path (str): Arquivo .zip de origem
+            output_path (str): Arquivo .zip de destino (não deve existir)
+            old_name (str): Nome antigo do lote
+            new_name (str): Nome novo do lote
+            text_pipeline (TextPipeline): Reescrita dos arquivos de texto
+
+        Returns:
+            Optional[ZipIngestResult]: Resultado, ou None se o .zip contiver
+                outros arquivos compactados (nada é gravado nesse caso)
+        """
+        # Diretório apenas de referência para os caminhos do plano
+        lot_directory = os.path.join(os.path.dirname(os.path.abspath(zip_path)), new_name)
+        temp_path = output_path + '.tmp'
+        with open(zip_path, 'rb', buffering=self.buffer_size) as raw_file:
+            with zipfile.ZipFile(raw_file) as zip_file:
+                plan = ZipLotPlanner.plan(zip_file, old_name, new_name, lot_directory)
+                if plan is None:
+                    logger.info(f"{zip_path} contém arquivos compactados; não é possível gerar o .zip direto")
+                    return None
+
+                logger.info(f"Gerando {output_path} a partir de {zip_path}: {len(plan)} arquivo(s)")
+                if self.progress is not None:
+                    self.progress.set_stage("Gerando lote .zip", len(plan))
+
+                result = ZipIngestResult(plan)
+                try:
+                    with zipfile.ZipFile(temp_path, 'w') as zip_out:
+                        for directory in plan.empty_directories:
+                            zip_out.writestr(self._arcname(plan, directory) + '/', b'')
+                        for member in plan.members:
+                            if self.progress is not None:
+                                self.progress.check_cancelled()
+                            failed = self._write_member(raw_file, zip_file, zip_out, plan,
+                                                        member, text_pipeline, result)
+                            result.files_written += 1
+                            result.bytes_written += member.info.file_size
+                            if self.progress is not None:
+                                self.progress.advance(failed=failed)
+                    os.replace(temp_path, output_path)
+                    count(RENAMES)
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+        count(BYTES_READ, sum(member.info.compress_size for member in plan.members))
+        if current() is not None:
+            count(BYTES_WRITTEN, os.path.getsize(output_path))
+        result.output_path = output_path
+        LoggingUtils.log_stage_summary(STAGE_FILE_RENAME)
+        LoggingUtils.log_stage_summary(STAGE_TEXT_FILES)
+        return result
+
+    def _write_member(self, raw_file, zip_file, zip_out, plan, member, text_pipeline, result) -> int:
+        """Grava um membro no .zip de destino; retorna 1 se houve falha."""
+        arcname = self._arcname(plan, member.target)
+        if not member.rewrite_text:
+            self._copy_raw(raw_file, zip_file, zip_out, member.info, arcname)
+            return 0
+
+        data = zip_file.read(member.info)
+        file_result, text = rewrite_text_data(data, member.target, text_pipeline)
+        result.text_result.add(file_result)
+        if text is None:
+            self._copy_raw(raw_file, zip_file, zip_out, member.info, arcname)
+        else:
+            # Mesma conversão de quebras de linha de um arquivo gravado em modo texto
+            data = text.replace('\n', os.linesep).encode('utf-8')
+            info = zipfile.ZipInfo(arcname, date_time=member.info.date_time)
+            info.external_attr = member.info.external_attr
+            zip_out.writestr(info, data, compress_type=member.info.compress_type)
+            file_result.written = True
+            LoggingUtils.log_text_file_update(arcname)
+        return 1 if file_result.error is not None else 0
+
+    @staticmethod
+    def _arcname(plan: ZipIngestPlan, path: str) -> str:
+        return os.path.relpath(path, plan.lot_directory).replace(os.sep, '/')
+
+    def _copy_raw(self, raw_file, zip_file: zipfile.ZipFile, zip_out: zipfile.ZipFile,
+                  source: zipfile.ZipInfo, arcname: str) -> None:
+        """
+        Copia os dados compactados de um membro para o .zip de destino com um
+        novo nome. O cabeçalho local é gravado com CRC e tamanhos já
+        conhecidos (sem descritor de dados), seguindo o que ZipFile.mkdir faz
+        para registrar uma entrada. Sem suporte aos internos do zipfile (ver
+        supports_raw_copy), o membro é recompactado com writestr.
+        """
+        if not supports_raw_copy(zip_out):
+            info = zipfile.ZipInfo(arcname, date_time=source.date_time)
+            info.external_attr = source.external_attr
+            info.comment = source.comment
+            zip_out.writestr(info, zip_file.read(source), compress_type=source.compress_type)
+            return
+
+        raw_file.seek(source.header_offset)
+        header = struct.unpack(zipfile.structFileHeader, raw_file.read(zipfile.sizeFileHeader))
+        if header[0] != zipfile.stringFileHeader:
+            raise zipfile.BadZipFile(f"Cabeçalho inválido no membro {source.filename}")
+        raw_file.seek(header[_FH_FILENAME_LENGTH] + header[_FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+
+        info = zipfile.ZipInfo(arcname, date_time=source.date_time)
+        info.compress_type = source.compress_type
+        info.CRC = source.CRC
+        info.compress_size = source.compress_size
+        info.file_size = source.file_size
+        info.flag_bits = source.flag_bits & ~_MASK_USE_DATA_DESCRIPTOR
+        info.external_attr = source.external_attr
+        info.internal_attr = source.internal_attr
+        info.create_system = source.create_system
+        info.create_version = source.create_version
+        info.extract_version = source.extract_version
+        info.comment = source.comment
+        info.extra = _strip_zip64_extra(source.extra)
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+
+        with zip_out._lock:
+            if zip_out._seekable:
+                zip_out.fp.seek(zip_out.start_dir)
+            info.header_offset = zip_out.fp.tell()
+            zip_out._writecheck(info)
+            zip_out._didModify = True
+            zip_out.fp.write(info.FileHeader(zip64))
+            remaining = source.compress_size
+            while remaining > 0:
+                chunk = raw_file.read(min(self.buffer_size, remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"Dados truncados no membro {source.filename}")
+                zip_out.fp.write(chunk)
+                remaining -= len(chunk)
+            zip_out.filelist.append(info)
+            zip_out.NameToInfo[info.filename] = info
+            zip_out.start_dir = zip_out.fp.tell()
+
+
+def supports_raw_copy(zip_out: zipfile.ZipFile) -> bool:
+    """
+    Indica se a cópia sem recompressão pode gravar em zip_out: versão do
+    Python dentro das verificadas e atributos internos do zipfile presentes.
+    """
+    first, last = _RAW_COPY_PYTHON_VERSIONS
+    if not first <= sys.version_info[:2] <= last:
+        return False
+    return (all(hasattr(zipfile, name) for name in _RAW_COPY_MODULE_ATTRIBUTES)
+            and hasattr(zipfile.ZipInfo, 'FileHeader')
+            and all(hasattr(zip_out, name) for name in _RAW_COPY_ZIPFILE_ATTRIBUTES))
+
+
+def _strip_zip64_extra(extra: bytes) -> bytes:
+    """Remove o registro Zip64 do campo extra (FileHeader o recria se necessário)."""
+    kept = []
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack('<HH', extra[offset:offset + 4])
+        if header_id != _ZIP64_EXTRA_ID:
+            kept.append(extra[offset:offset + 4 + size])
+        offset += 4 + size
+    return b''.join(kept)